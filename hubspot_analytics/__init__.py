@@ -0,0 +1,21 @@
+"""
+Streamlit-free core of the HubSpot analytics dashboard.
+
+Fetching, processing, metrics, reports and exports live here with explicit
+inputs, so they import quickly and run the same in the dashboard, the
+headless CLI (python -m hubspot_analytics), background workers and tests.
+"""
+import pandas as pd
+
+# [OK] NEW: Copy-on-write - filtered frames, column selections and shallow copies share data
+# until one side is modified, so shared datasets need no defensive .copy() calls
+pd.set_option("mode.copy_on_write", True)
+
+from .metrics import calculate_kpis
+from .pipeline import PIPELINE_STATE_KEYS, compute_dashboard_metrics, run_dashboard_pipeline
+from .reporting import ConsoleReporter, get_reporter, set_reporter
+
+__all__ = [
+    "ConsoleReporter", "PIPELINE_STATE_KEYS", "calculate_kpis", "compute_dashboard_metrics",
+    "get_reporter", "run_dashboard_pipeline", "set_reporter",
+]
@@ -0,0 +1,118 @@
+"""On-disk checkpoints of paged HubSpot searches, so an interrupted fetch resumes where it stopped.
+
+Each search (portal, endpoint and request body without the paging cursor) gets a
+JSON-lines file with one line per received page: the page's records and the
+cursor of the next page. A rerun of the same search replays the stored pages and
+continues from the last cursor; a search that reaches its last page deletes its file.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .config import get_env_checkpoint_dir
+from .fastjson import dumps, loads
+
+CHECKPOINT_MAX_AGE_SECONDS = 60 * 60   # older checkpoints are discarded instead of resumed
+
+class SearchCheckpoint:
+    """Pages received so far by one search and the cursor to continue from."""
+
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+
+    def load(self):
+        """([page, ...], next cursor) saved by an interrupted run, or ([], None)."""
+        try:
+            if time.time() - os.path.getmtime(self.path) > self._store.max_age:
+                os.remove(self.path)
+                return [], None
+            pages, after = [], None
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = loads(line)
+                    except ValueError:
+                        break   # last line cut short by a crash
+                    pages.append(entry['results'])
+                    after = entry['after']
+            return (pages, after) if after else ([], None)
+        except OSError:
+            return [], None
+
+    def save_page(self, page, after):
+        with open(self.path, 'a') as f:
+            f.write(dumps({'after': after, 'results': page}) + "\n")
+
+    def complete(self):
+        """The search reached its last page - nothing to resume."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def release(self):
+        self._store._release(self.path)
+
+class _NoCheckpoint:
+    """Stand-in while the same search is already running (and checkpointing) in this process."""
+
+    def load(self):
+        return [], None
+
+    def save_page(self, page, after):
+        pass
+
+    def complete(self):
+        pass
+
+    def release(self):
+        pass
+
+class CheckpointStore:
+    """Directory of search checkpoints (HUBSPOT_CHECKPOINT_DIR)."""
+
+    def __init__(self, directory=None, max_age=CHECKPOINT_MAX_AGE_SECONDS):
+        self.directory = directory or get_env_checkpoint_dir()
+        self.max_age = max_age
+        os.makedirs(self.directory, exist_ok=True)
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def checkpoint(self, *key_parts):
+        """Checkpoint of the search identified by key_parts; call release() when the search ends."""
+        digest = hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+        path = os.path.join(self.directory, f"{digest}.jsonl")
+        with self._lock:
+            if path in self._active:
+                return _NoCheckpoint()
+            self._active.add(path)
+        return SearchCheckpoint(self, path)
+
+    def _release(self, path):
+        with self._lock:
+            self._active.discard(path)
+
+    def cleanup(self):
+        """Delete checkpoints too old to resume."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if time.time() - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_checkpoint_store():
+    """Process-wide checkpoint store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore()
+            _store.cleanup()
+        return _store
@@ -0,0 +1,164 @@
+"""
+Headless batch mode for the HubSpot dashboard pipeline.
+
+Runs the same fetch -> process -> metrics pipeline as the dashboard and writes
+a Parquet snapshot (loadable from the dashboard sidebar) plus the premium
+Excel report, e.g. from cron:
+
+    python -m hubspot_analytics run --from 2024-01-01 --to 2024-01-31 --out /data/hubspot
+
+The query command recomputes the metric tables over one or many snapshot runs
+with DuckDB (optional dependency) without loading the contacts into memory:
+
+    python -m hubspot_analytics query --snapshot-dir /data/hubspot --all-runs --out /data/hubspot/all_time
+"""
+import argparse
+import functools
+import logging
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .config import IST, get_env_api_key, get_env_snapshot_dir
+from .excel_report import write_excel_report
+from .exports import find_latest_snapshot, list_snapshot_runs, write_columnar_frame, write_pipeline_snapshot
+from .hubspot import (FetchIncomplete, detect_admission_confirmed_stage, fetch_deal_pipeline_stages,
+                      test_hubspot_connection)
+from .metrics import calculate_kpis
+from .pipeline import run_dashboard_pipeline
+from .reporting import ConsoleReporter, set_reporter
+from .streaming import fetch_and_process_contacts
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m hubspot_analytics", description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Fetch data, compute metrics and write snapshot + Excel report")
+    today = datetime.now(IST).date()
+    run.add_argument("--from", dest="start_date", type=_parse_date, default=today - timedelta(days=30),
+                     help="Lead start date, YYYY-MM-DD (default: 30 days ago)")
+    run.add_argument("--to", dest="end_date", type=_parse_date, default=today,
+                     help="Lead end date, YYYY-MM-DD (default: today)")
+    run.add_argument("--deal-from", dest="deal_start_date", type=_parse_date,
+                     help="Deal close start date (default: --from)")
+    run.add_argument("--deal-to", dest="deal_end_date", type=_parse_date,
+                     help="Deal close end date (default: --to)")
+    run.add_argument("--date-field", default="Created Date",
+                     choices=["Created Date", "Last Modified Date", "Both"],
+                     help="Contact date field to filter leads on")
+    run.add_argument("--out", default=None,
+                     help="Output directory (default: the dashboard snapshot directory)")
+    run.add_argument("--no-excel", action="store_true", help="Skip the Excel report")
+
+    query = subparsers.add_parser("query", help="Compute metric tables over snapshot runs with DuckDB")
+    query.add_argument("--snapshot-dir", default=None,
+                       help="Directory holding the snapshot runs (default: the dashboard snapshot directory)")
+    query.add_argument("--all-runs", action="store_true",
+                       help="Query every run together (newest run wins per contact/deal) instead of the latest one")
+    query.add_argument("--out", required=True, help="Directory to write the metric tables to (Parquet)")
+    query.add_argument("--memory-limit", default=None, help="DuckDB memory limit, e.g. 2GB")
+    return parser
+
+def run(args):
+    """Run the pipeline once; returns a process exit code."""
+    logger = logging.getLogger("hubspot_analytics")
+    set_reporter(ConsoleReporter())
+
+    api_key = get_env_api_key()
+    if not api_key:
+        logger.error("HUBSPOT_API_KEY is not set (or is not a private app token)")
+        return 2
+
+    deal_start_date = args.deal_start_date or args.start_date
+    deal_end_date = args.deal_end_date or args.end_date
+    if args.start_date > args.end_date or deal_start_date > deal_end_date:
+        logger.error("Start date must be before end date")
+        return 2
+
+    is_valid, message = test_hubspot_connection(api_key)
+    if not is_valid:
+        logger.error("Connection failed: %s", message)
+        return 1
+
+    deal_stages = fetch_deal_pipeline_stages(api_key)
+    customer_stage_ids = [stage['stage_id'] for stage in detect_admission_confirmed_stage(deal_stages or {})]
+    if not customer_stage_ids:
+        logger.error("No customer deal stages auto-detected")
+        return 1
+
+    try:
+        # Snapshots and reports hold every contact, so their detail properties come with the search
+        result = run_dashboard_pipeline(
+            api_key, args.date_field, args.start_date, args.end_date, deal_start_date, deal_end_date,
+            customer_stage_ids, deal_stages,
+            steps={'fetch_and_process_contacts': functools.partial(fetch_and_process_contacts, include_details=True)}
+        )
+    except FetchIncomplete as e:
+        logger.error("%s - progress is checkpointed, run the same command again to resume", e)
+        return 1
+    if not result:
+        logger.warning("No contacts found - nothing written")
+        return 0
+
+    date_range = (args.start_date.strftime("%Y-%m-%d"), args.end_date.strftime("%Y-%m-%d"))
+    out_dir = args.out or get_env_snapshot_dir()
+    os.makedirs(out_dir, exist_ok=True)
+    run_dir = write_pipeline_snapshot(result, out_dir, {
+        'date_field': args.date_field,
+        'date_range': date_range,
+        'deal_date_range': (deal_start_date.strftime("%Y-%m-%d"), deal_end_date.strftime("%Y-%m-%d")),
+    })
+    logger.info("Snapshot written to %s (%d contacts, %d deals)",
+                run_dir, result['contacts_count'], result['deals_count'])
+
+    if not args.no_excel:
+        kpis = calculate_kpis(result['contacts_df'], result['customers_df'],
+                              partial_revenue=result['partial_revenue'])
+        report_path = write_excel_report(
+            os.path.join(run_dir, "HubSpot_Premium_Report.xlsx"),
+            result['contacts_df'], result['customers_df'], result['metrics'], kpis, date_range, args.date_field
+        )
+        logger.info("Excel report written to %s", report_path)
+    return 0
+
+def query(args):
+    """Write the dashboard metric tables computed over snapshot runs; returns a process exit code."""
+    from .sql_metrics import DUCKDB_AVAILABLE, SnapshotMetrics
+
+    logger = logging.getLogger("hubspot_analytics")
+    if not DUCKDB_AVAILABLE:
+        logger.error("DuckDB is not installed (pip install duckdb)")
+        return 2
+
+    snapshot_dir = args.snapshot_dir or get_env_snapshot_dir()
+    if args.all_runs:
+        run_dirs = list_snapshot_runs(snapshot_dir)
+    else:
+        latest = find_latest_snapshot(snapshot_dir)
+        run_dirs = [latest] if latest else []
+    if not run_dirs:
+        logger.error("No snapshots found in %s", snapshot_dir)
+        return 1
+
+    tables = SnapshotMetrics(run_dirs, memory_limit=args.memory_limit).dashboard_metrics()
+    frames = {name: df for name, df in tables['metrics'].items() if isinstance(df, pd.DataFrame)}
+    frames.update({'revenue_data': tables['revenue_data'], 'matrix_data': tables['matrix_data']})
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, df in frames.items():
+        write_columnar_frame(df, os.path.join(args.out, f"{name}.parquet"))
+    logger.info("Wrote %d metric tables over %d snapshot run(s) to %s", len(frames), len(run_dirs), args.out)
+    return 0
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    if args.command == "query":
+        return query(args)
+    return 2
@@ -0,0 +1,125 @@
+"""Business rules and settings shared by the dashboard, the CLI and background workers."""
+import os
+import tempfile
+
+import pytz
+
+# Excluded Course Owners
+EXCLUDED_OWNERS = [
+    "Mahalekshmi M J",
+    "Sreeja Anoop",
+    "arya.krishnan",
+    "Devi Krishna",
+    "Aneesha S",
+    "Sonia William",
+    "recruitment",
+    "Rekha Raveendran",
+    "Aswathy Krishnan",
+    "Chandana Sekhar",
+    "nandhana.sivakumar"
+]
+
+# Excluded Deal Name Keywords - deals containing these terms are FULLY excluded from ALL counts and revenue
+EXCLUDED_DEAL_KEYWORDS = [
+    "vacation batch",
+    "vacation_batch",
+]
+
+# [OK] NEW: Course groups - the first keyword (in this order) found in a course name picks its group
+COURSE_GROUP_KEYWORDS = {
+    "oet": "OET",
+    "german": "German",
+    "ielts": "IELTS",
+    "haad": "HAAD",
+    "dha": "DHA",
+    "prometric": "Prometric",
+    "pte": "PTE",
+}
+
+# [OK] NEW: Partial Payment Stage IDs
+PARTIAL_ONLINE_STAGE_ID = "2107527928"    # Online partial payment stage
+PARTIAL_OFFLINE_STAGE_ID = "2171957962"   # Offline partial payment stage
+PARTIAL_STAGE_IDS = [PARTIAL_ONLINE_STAGE_ID, PARTIAL_OFFLINE_STAGE_ID]
+
+# Constants
+HUBSPOT_API_BASE = "https://api.hubapi.com"
+IST = pytz.timezone('Asia/Kolkata')
+
+# [OK] CRITICAL FIX: Lead Status Mapping - ABSOLUTELY NO CUSTOMER HERE!
+LEAD_STATUS_MAP = {
+    "cold": "Cold",
+    "warm": "Warm", 
+    "hot": "Hot",
+    "new": "New Lead",
+    "open": "New Lead",
+    "neutral_prospect": "Cold",
+    "prospect": "Warm",  
+    "hot_prospect": "Hot",
+    "not_connected": "Not Connected",
+    "not_interested": "Not Interested", 
+    "unqualified": "Not Qualified",
+    "not_qualified": "Not Qualified",
+    "duplicate": "Duplicate",
+    "junk": "Duplicate",
+    "": "Unknown",
+    None: "Unknown",
+    "unknown": "Unknown",
+    "other": "Unknown",
+    "qualified_lead": "Not Qualified",
+    "upselling": "Upselling",
+    "course_shifting": "Course Shifting",
+    "not connected (nc)": "Not Connected (NC)",
+    "not connected (nc)": "Not Connected (NC)",
+    "closed lost": "Closed Lost",
+    "closed_lost": "Closed Lost"
+}
+
+# [OK] CRITICAL FIX: List of terms that should NEVER become "Customer" in leads
+CUSTOMER_KEYWORDS_BLOCKLIST = [
+    "customer", "closed", "won", "admission", "confirmed", 
+    "contract", "signed", "paid", "payment", "completed"
+]
+
+# [OK] NEW: Team Definitions
+TEAM_MAPPING = {
+    "Momentum Makers": [
+        "Nisha Samuel", "Bindu -", "Remya Raghunath", "Jibymol Varghese", 
+        "akhila shaji", "Geethu Babu", "Arya S", "Parvathy R"
+    ],
+    "Success Squad": [
+        "Remya Ravindran", "Sumithra -", "Jayasree -", "SANIJA K P", 
+        "Shubha Lakshmi", "Aneena Elsa Shibu", "Merin j", "Pooja Prabhaji",
+        "athira krishna"
+    ],
+    "TRAINING SQUAD": [
+        "Gayathri Sandhya"
+    ]
+}
+
+# [OK] NEW: Environment-based settings (the dashboard also checks st.secrets first)
+DEFAULT_EXPORT_DIR = os.path.join(tempfile.gettempdir(), "hubspot_exports")
+DEFAULT_SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), "hubspot_snapshots")
+DEFAULT_CHECKPOINT_DIR = os.path.join(tempfile.gettempdir(), "hubspot_fetch_checkpoints")
+
+def get_env_api_key():
+    """HubSpot private app token from HUBSPOT_API_KEY, or None."""
+    api_key = os.getenv("HUBSPOT_API_KEY")
+    if api_key and api_key.startswith("pat-"):
+        return api_key
+    return None
+
+def get_env_export_dir():
+    """Columnar export directory from HUBSPOT_EXPORT_DIR."""
+    return os.getenv("HUBSPOT_EXPORT_DIR") or DEFAULT_EXPORT_DIR
+
+def get_env_snapshot_dir():
+    """Snapshot directory from HUBSPOT_SNAPSHOT_DIR."""
+    return os.getenv("HUBSPOT_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR
+
+def get_env_checkpoint_dir():
+    """Fetch checkpoint directory from HUBSPOT_CHECKPOINT_DIR."""
+    return os.getenv("HUBSPOT_CHECKPOINT_DIR") or DEFAULT_CHECKPOINT_DIR
+
+def get_env_rules_file():
+    """JSON file overriding the business rules above, from HUBSPOT_RULES_FILE, or None."""
+    return os.getenv("HUBSPOT_RULES_FILE") or None
@@ -0,0 +1,95 @@
+"""Contact detail columns (email, phone, company, ...) read on demand for the rows shown or exported.
+
+Contact searches only return the properties the metrics need, so the detail
+columns of a freshly fetched contacts frame are empty. hydrate_contact_details()
+fills them for the rows it is given through HubSpot's batch-read API, and keeps
+the details per contact, so paging back and forth costs no further requests.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .hubspot import LAZY_CONTACT_DETAILS, fetch_contact_details
+from .range_cache import search_key
+
+CONTACT_DETAIL_COLUMNS = {
+    "Email": "email", "Phone": "phone", "Company": "company", "Job Title": "jobtitle", "Country": "country",
+}
+DETAIL_CACHE_TTL_SECONDS = 900   # same freshness as the fetch caches
+DETAIL_CACHE_MAX_CONTACTS = int(os.getenv("HUBSPOT_DETAIL_CACHE_MAX_CONTACTS", "200000"))
+
+class ContactDetailCache:
+    """Detail properties per (portal, contact ID), least recently used dropped past max_contacts."""
+
+    def __init__(self, ttl=DETAIL_CACHE_TTL_SECONDS, max_contacts=DETAIL_CACHE_MAX_CONTACTS):
+        self.ttl = ttl
+        self.max_contacts = max_contacts
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key, contact_ids):
+        """({id: properties} of the cached contacts, [ids to fetch])."""
+        portal = search_key(api_key)[0]
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            for contact_id in contact_ids:
+                entry = self._entries.get((portal, contact_id))
+                if entry is not None and now - entry[0] <= self.ttl:
+                    self._entries.move_to_end((portal, contact_id))
+                    found[contact_id] = entry[1]
+                else:
+                    missing.append(contact_id)
+        return found, missing
+
+    def add(self, api_key, details):
+        portal = search_key(api_key)[0]
+        now = time.time()
+        with self._lock:
+            for contact_id, properties in details.items():
+                self._entries[(portal, contact_id)] = (now, properties)
+                self._entries.move_to_end((portal, contact_id))
+            while len(self._entries) > self.max_contacts:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_detail_cache = ContactDetailCache()
+
+def get_detail_cache():
+    """Process-wide cache of contact details."""
+    return _detail_cache
+
+def get_contact_details(api_key, contact_ids):
+    """{id: detail properties} for contact_ids, reading only the ones not cached from HubSpot."""
+    cache = get_detail_cache()
+    details, missing = cache.get(api_key, contact_ids)
+    if missing:
+        fetched = fetch_contact_details(api_key, missing)
+        cache.add(api_key, fetched)
+        details.update(fetched)
+    return details
+
+def hydrate_contact_details(df, api_key):
+    """df with the detail columns filled in for rows that have none yet (a new frame; df is unchanged).
+
+    Call it with only the rows about to be shown or exported. Rows whose details came with
+    the search (include_details, older snapshots) are left as they are.
+    """
+    columns = [column for column in CONTACT_DETAIL_COLUMNS if df is not None and column in df.columns]
+    if not LAZY_CONTACT_DETAILS or not api_key or not columns or 'ID' not in df.columns or df.empty:
+        return df
+    blank = df[columns].fillna('').astype(str).eq('').all(axis=1)
+    if not blank.any():
+        return df
+    ids = df.loc[blank, 'ID'].astype(str)
+    details = get_contact_details(api_key, list(dict.fromkeys(ids)))
+    df = df.copy(deep=False)
+    for column in columns:
+        values = {contact_id: (properties.get(CONTACT_DETAIL_COLUMNS[column]) or '')
+                  for contact_id, properties in details.items()}
+        df.loc[blank, column] = ids.map(values).fillna('')
+    return df
@@ -0,0 +1,213 @@
+"""Premium multi-sheet Excel report, written with bounded memory."""
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+import xlsxwriter
+
+# [OK] NEW: Streaming Excel report writer (xlsxwriter constant_memory mode)
+EXCEL_WRITE_CHUNK_ROWS = 5000      # rows converted to Python values at a time
+
+EXCEL_WIDTH_SAMPLE_ROWS = 10000    # rows sampled when auto-sizing column widths
+
+EXCEL_PERCENT_COLUMNS = ['Deal %', 'Customer %', 'Lead->Customer %', 'Lead->Deal %']
+
+def _excel_cell_values(series):
+    """Convert a column slice to plain Python values xlsxwriter can write (NaN -> blank)."""
+    values = series.astype(object).where(series.notna(), None).tolist()
+    if series.dtype == object:
+        values = [", ".join(map(str, v)) if isinstance(v, (list, tuple, set)) else v for v in values]
+    return values
+
+def _write_frame_rows(worksheet, df, first_row=1, on_chunk=None):
+    """Write df row by row in ascending order, as constant_memory mode requires.
+
+    Cells are written without a format so the column-level format applies.
+    on_chunk(rows_written, total_rows) is called after every chunk.
+    """
+    for chunk_start in range(0, len(df), EXCEL_WRITE_CHUNK_ROWS):
+        chunk = df.iloc[chunk_start:chunk_start + EXCEL_WRITE_CHUNK_ROWS]
+        columns = [_excel_cell_values(chunk[col]) for col in chunk.columns]
+        for offset, row_values in enumerate(zip(*columns)):
+            worksheet.write_row(first_row + chunk_start + offset, 0, row_values)
+        if on_chunk:
+            on_chunk(chunk_start + len(chunk), len(df))
+
+def _write_table_sheet(workbook, sheet_name, df, header_format, column_formats=None, widths=None, on_chunk=None):
+    """Add a sheet with a formatted header row followed by the rows of df."""
+    worksheet = workbook.add_worksheet(sheet_name)
+    column_formats = column_formats or {}
+    widths = widths or {}
+    for col_num, col_name in enumerate(df.columns):
+        fmt = column_formats.get(col_name)
+        width = widths.get(col_name)
+        if fmt is not None or width is not None:
+            worksheet.set_column(col_num, col_num, width, fmt)
+    worksheet.write_row(0, 0, [str(c) for c in df.columns], header_format)
+    _write_frame_rows(worksheet, df, on_chunk=on_chunk)
+    return worksheet
+
+def _performance_sheet_frame(metric_df, name_column, number_format, percent_format):
+    """Scale percentage columns to fractions and pick a column format for each column."""
+    sheet_df = metric_df.copy()
+    column_formats = {}
+    for col in sheet_df.columns:
+        if col in EXCEL_PERCENT_COLUMNS:
+            sheet_df[col] = pd.to_numeric(sheet_df[col], errors='coerce') / 100
+            column_formats[col] = percent_format
+        elif col != name_column and col != 'Customer_Revenue':
+            column_formats[col] = number_format
+    return sheet_df, column_formats
+
+EXCEL_REPORT_STEPS = 7  # one progress step per sheet
+
+def write_excel_report(output_path, df_contacts, df_customers, metrics, kpis, date_range, date_field,
+                       progress=None):
+    """Write the multi-sheet Excel report to output_path with bounded memory.
+
+    Uses xlsxwriter's constant_memory mode: each row is flushed to disk as soon as
+    the next one starts, and formatting is applied per column instead of per cell.
+    progress(fraction, message) is called as sheets are written, if given.
+    """
+    def report_progress(step, message, within_step=0.0):
+        if progress:
+            progress(min((step + within_step) / EXCEL_REPORT_STEPS, 1.0), message)
+
+    workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+    try:
+        # Define formats
+        header_format = workbook.add_format({
+            'bold': True,
+            'font_size': 12,
+            'bg_color': '#4F81BD',
+            'font_color': 'white',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1
+        })
+        
+        number_format = workbook.add_format({
+            'num_format': '#,##0',
+            'align': 'right',
+            'border': 1
+        })
+        
+        percent_format = workbook.add_format({
+            'num_format': '0.0%',
+            'align': 'right',
+            'border': 1
+        })
+        
+        # Sheet 1: Executive Summary
+        report_progress(0, "Writing executive summary")
+        summary_rows = [
+            ('Total Leads', kpis['total_leads']),
+            ('Deal Leads (Hot+Warm+Cold+Customer)', kpis['deal_leads']),
+            ('Customers', kpis['customer']),
+            ('Hot Leads', kpis['hot']),
+            ('Warm Leads', kpis['warm']),
+            ('Cold Leads', kpis['cold']),
+            ('New Leads', kpis['new_lead']),
+            ('Not Connected', kpis['not_connected']),
+            ('Not Interested', kpis['not_interested']),
+            ('Not Qualified', kpis['not_qualified']),
+            ('Duplicate', kpis['duplicate']),
+            ('Lead -> Deal %', kpis['lead_to_deal_pct']/100),
+            ('Lead -> Customer %', kpis['lead_to_customer_pct']/100),
+            ('Deal -> Customer %', kpis['deal_to_customer_pct']/100),
+            ('Total Revenue', kpis['total_revenue']),
+            ('Avg Revenue per Customer', kpis['avg_revenue_per_customer'] if kpis['avg_revenue_per_customer'] > 0 else 0)
+        ]
+        
+        worksheet = workbook.add_worksheet('Executive Summary')
+        worksheet.set_column('A:A', 35)
+        worksheet.set_column('B:B', 20)
+        
+        # Report header block sits beside the table (D1:F4) - rows must be written in order
+        header_block = [
+            ('HubSpot Analytics Report', workbook.add_format({
+                'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter'
+            })),
+            (f'Date Field: {date_field}', workbook.add_format({'align': 'center'})),
+            (f'Date Range: {date_range[0]} to {date_range[1]}', workbook.add_format({'align': 'center'})),
+            (f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', workbook.add_format({'align': 'center'})),
+        ]
+        
+        worksheet.write_row(0, 0, ['Metric', 'Count'], header_format)
+        for row in range(len(summary_rows) + 1):
+            if row > 0:
+                metric_name, value = summary_rows[row - 1]
+                worksheet.write_row(row, 0, [metric_name, value.item() if hasattr(value, 'item') else value])
+            if row < len(header_block):
+                text, fmt = header_block[row]
+                worksheet.merge_range(row, 3, row, 5, text, fmt)
+        
+        # Sheet 2: Raw Lead Data
+        report_progress(1, "Writing raw lead data")
+        if not df_contacts.empty:
+            # Auto-adjust column widths from a sample of rows
+            sample = df_contacts.head(EXCEL_WIDTH_SAMPLE_ROWS)
+            widths = {
+                col: min(max(int(sample[col].astype(str).str.len().max() or 0), len(str(col))) + 2, 50)
+                for col in df_contacts.columns
+            }
+            _write_table_sheet(
+                workbook, 'Raw Lead Data', df_contacts, header_format, widths=widths,
+                on_chunk=lambda done, total: report_progress(1, f"Writing raw lead data ({done:,}/{total:,} rows)", done / total)
+            )
+        
+        # Sheet 3: Customer Data
+        report_progress(2, "Writing customer data")
+        if df_customers is not None and not df_customers.empty:
+            _write_table_sheet(workbook, 'Customer Data', df_customers, header_format)
+        
+        # Sheet 4: Owner Performance (Metric 4)
+        report_progress(3, "Writing owner performance")
+        if 'metric_4' in metrics and not metrics['metric_4'].empty:
+            metric_4, formats = _performance_sheet_frame(metrics['metric_4'], 'Course Owner', number_format, percent_format)
+            _write_table_sheet(workbook, 'Owner Performance', metric_4, header_format, column_formats=formats)
+        
+        # Sheet 5: Course Performance (NEW METRIC)
+        report_progress(4, "Writing course performance")
+        if 'metric_5' in metrics and not metrics['metric_5'].empty:
+            metric_5, formats = _performance_sheet_frame(metrics['metric_5'], 'Course', number_format, percent_format)
+            _write_table_sheet(workbook, 'Course Performance', metric_5, header_format, column_formats=formats)
+        
+        # Sheet 6: Lead Status Summary
+        report_progress(5, "Writing lead status summary")
+        if not df_contacts.empty:
+            status_summary = df_contacts['Lead Status'].value_counts().reset_index()
+            status_summary.columns = ['Lead Status', 'Count']
+            status_summary['Percentage'] = (status_summary['Count'] / len(df_contacts) * 100).round(1) / 100
+            
+            _write_table_sheet(workbook, 'Lead Status Summary', status_summary, header_format,
+                               column_formats={'Count': number_format, 'Percentage': percent_format})
+        
+        # Sheet 7: Revenue Analysis
+        report_progress(6, "Writing revenue analysis")
+        if df_customers is not None and not df_customers.empty:
+            revenue_summary = df_customers.groupby('Course/Program').agg(
+                Customer_Count=('Is Customer', 'count'),
+                Total_Revenue=('Amount', 'sum'),
+                Avg_Revenue=('Amount', 'mean')
+            ).reset_index()
+            
+            revenue_summary = revenue_summary.sort_values('Total_Revenue', ascending=False)
+            _write_table_sheet(workbook, 'Revenue Analysis', revenue_summary, header_format,
+                               column_formats={'Total_Revenue': number_format, 'Avg_Revenue': number_format})
+    finally:
+        workbook.close()
+    
+    report_progress(EXCEL_REPORT_STEPS, "Report complete")
+    return output_path
+
+def create_excel_report(df_contacts, df_customers, metrics, kpis, date_range, date_field):
+    """Create the premium Excel report in a temp file and return its path."""
+    fd, output_path = tempfile.mkstemp(prefix="hubspot_report_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        return write_excel_report(output_path, df_contacts, df_customers, metrics, kpis, date_range, date_field)
+    except Exception:
+        os.remove(output_path)
+        raise
@@ -0,0 +1,189 @@
+"""Columnar (Parquet / Arrow IPC) exports and pipeline snapshots."""
+import hashlib
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from .config import IST
+from .processing import group_team_performance_metrics
+
+# [OK] NEW: Columnar (Parquet / Arrow IPC) exports with dtypes preserved
+COLUMNAR_EXPORT_FORMATS = {'Parquet': '.parquet', 'Arrow IPC': '.arrow'}
+
+COLUMNAR_BATCH_ROWS = 50000   # rows converted to Arrow (and written as one row group) at a time
+
+ARROW_NATIVE_INFERRED_TYPES = ('string', 'empty', 'boolean', 'integer', 'floating', 'mixed-integer-float',
+                               'decimal', 'datetime', 'date', 'bytes')
+
+def _arrow_ready_frame(df):
+    """Make df convertible to Arrow: string column names, named index as columns, uniform object columns."""
+    if any(name is not None for name in df.index.names):
+        df = df.reset_index()
+    df = df.copy(deep=False)
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ARROW_NATIVE_INFERRED_TYPES:
+            values = df[col].dropna()
+            if len(values) and values.map(lambda v: isinstance(v, (list, tuple))).all():
+                # List columns (e.g. associated IDs) become Arrow list<string>
+                df[col] = df[col].map(lambda v: [str(item) for item in v] if isinstance(v, (list, tuple)) else None)
+                continue
+            # Mixed scalars are stored as text like the CSV export
+            df[col] = df[col].map(
+                lambda v: None if v is None or (isinstance(v, float) and np.isnan(v))
+                else ", ".join(map(str, v)) if isinstance(v, (list, tuple, set)) else str(v)
+            )
+    return df
+
+def write_columnar_frame(df, path, fmt='Parquet'):
+    """Stream df to a Parquet or Arrow IPC file in batches of COLUMNAR_BATCH_ROWS rows."""
+    df = _arrow_ready_frame(df)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    if fmt == 'Parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    with writer:
+        for start in range(0, max(len(df), 1), COLUMNAR_BATCH_ROWS):
+            chunk = df.iloc[start:start + COLUMNAR_BATCH_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return path
+
+def read_columnar_frame(path):
+    """Read a Parquet file written by write_columnar_frame, with list columns as Python lists again."""
+    table = pq.read_table(path)
+    df = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_list(field.type):
+            df[field.name] = df[field.name].map(lambda v: list(v) if v is not None else None)
+    return df
+
+def collect_export_frames(df_contacts, df_customers, team_performance_df, metrics, extra_frames=None):
+    """Name -> DataFrame for everything the columnar export contains."""
+    frames = {'contacts': df_contacts, 'customers': df_customers, 'team_performance': team_performance_df}
+    for name, value in (metrics or {}).items():
+        if isinstance(value, pd.DataFrame):
+            frames[name] = value
+        elif isinstance(value, dict):
+            # metric_7 holds one frame per team
+            for team_name, team_df in value.items():
+                if isinstance(team_df, pd.DataFrame):
+                    frames[f"{name}_{re.sub(r'[^0-9A-Za-z]+', '_', str(team_name)).strip('_').lower()}"] = team_df
+    frames.update(extra_frames or {})
+    return {name: df for name, df in frames.items() if isinstance(df, pd.DataFrame) and not df.empty}
+
+def _new_folder(parent, prefix):
+    """Create and return a new folder prefix_<timestamp>_<random> under parent.
+
+    The random suffix keeps two exports or runs started in the same second apart.
+    """
+    os.makedirs(parent, exist_ok=True)
+    while True:
+        suffix = hashlib.blake2b(os.urandom(8), digest_size=4).hexdigest()
+        folder = os.path.join(parent, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{suffix}")
+        try:
+            os.mkdir(folder)
+            return folder
+        except FileExistsError:
+            continue
+
+def write_columnar_export(frames, export_dir, fmt='Parquet'):
+    """Write each frame to its own file in a timestamped folder under export_dir and zip the folder.
+
+    Returns (folder, zip_path). The zip stores files uncompressed since Parquet is compressed already.
+    """
+    extension = COLUMNAR_EXPORT_FORMATS[fmt]
+    folder = _new_folder(export_dir, "hubspot_export")
+    paths = [write_columnar_frame(df, os.path.join(folder, f"{name}{extension}"), fmt) for name, df in frames.items()]
+    zip_path = f"{folder}{extension}.zip"
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for path in paths:
+            zf.write(path, arcname=os.path.basename(path))
+    return folder, zip_path
+
+# [OK] NEW: Pipeline snapshots on disk (written by the headless CLI, loaded by the dashboard)
+SNAPSHOT_TABLES = ['contacts_df', 'customers_df', 'team_performance_df', 'revenue_data', 'matrix_data']
+
+SNAPSHOT_LATEST_FILE = "latest.json"
+
+def write_pipeline_snapshot(result, out_dir, run_info):
+    """Write pipeline results as Parquet tables plus a JSON manifest into a new run folder.
+
+    latest.json in out_dir is switched to the new run only after every file is written,
+    so readers never see a half-written snapshot. Returns the run folder.
+    """
+    run_dir = _new_folder(out_dir, "run")
+    os.makedirs(os.path.join(run_dir, "tables"))
+    
+    frames = {name: result[name] for name in SNAPSHOT_TABLES}
+    frames.update({name: df for name, df in result['metrics'].items() if isinstance(df, pd.DataFrame)})
+    tables = {}
+    for name, df in frames.items():
+        if isinstance(df, pd.DataFrame):
+            tables[name] = os.path.join("tables", f"{name}.parquet")
+            write_columnar_frame(df, os.path.join(run_dir, tables[name]))
+    
+    manifest = dict(run_info)
+    manifest.update({
+        'generated_at': datetime.now(IST).isoformat(),
+        'owner_mapping': result['owner_mapping'],
+        'partial_revenue': result['partial_revenue'],
+        'contacts_count': result['contacts_count'],
+        'deals_count': result['deals_count'],
+        'tables': tables,
+    })
+    with open(os.path.join(run_dir, "snapshot.json"), 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    
+    latest_tmp = os.path.join(out_dir, f"{SNAPSHOT_LATEST_FILE}.{os.path.basename(run_dir)}.tmp")
+    with open(latest_tmp, 'w') as f:
+        json.dump({'run_dir': os.path.basename(run_dir)}, f)
+    os.replace(latest_tmp, os.path.join(out_dir, SNAPSHOT_LATEST_FILE))
+    return run_dir
+
+def find_latest_snapshot(out_dir):
+    """Run folder latest.json points at, or None."""
+    try:
+        with open(os.path.join(out_dir, SNAPSHOT_LATEST_FILE)) as f:
+            run_dir = os.path.join(out_dir, json.load(f)['run_dir'])
+    except (OSError, ValueError, KeyError):
+        return None
+    return run_dir if os.path.exists(os.path.join(run_dir, "snapshot.json")) else None
+
+def list_snapshot_runs(out_dir):
+    """Every complete run folder in out_dir, oldest first."""
+    try:
+        names = sorted(os.listdir(out_dir))
+    except OSError:
+        return []
+    return [os.path.join(out_dir, name) for name in names
+            if name.startswith("run_") and os.path.exists(os.path.join(out_dir, name, "snapshot.json"))]
+
+def load_pipeline_snapshot(run_dir):
+    """Read a snapshot back into the dict shape run_dashboard_pipeline returns (plus its manifest)."""
+    with open(os.path.join(run_dir, "snapshot.json")) as f:
+        manifest = json.load(f)
+    frames = {name: read_columnar_frame(os.path.join(run_dir, path)) for name, path in manifest['tables'].items()}
+    
+    team_performance_df = frames.get('team_performance_df')
+    metrics = {name: df for name, df in frames.items() if name.startswith('metric_')}
+    metrics['metric_7'] = group_team_performance_metrics(team_performance_df) if team_performance_df is not None else {}
+    
+    result = {name: frames.get(name) for name in SNAPSHOT_TABLES}
+    result.update({
+        'owner_mapping': manifest['owner_mapping'],
+        'partial_revenue': manifest['partial_revenue'],
+        'contacts_count': manifest['contacts_count'],
+        'deals_count': manifest['deals_count'],
+        'metrics': metrics,
+        'manifest': manifest,
+    })
+    return result
@@ -0,0 +1,73 @@
+"""JSON decoding of HubSpot responses with the fastest library installed.
+
+msgspec (preferred) decodes a search page straight into slim records - id,
+properties, updatedAt and associations - without ever building the fields
+nobody reads (createdAt, archived, ...). orjson decodes the full page several
+times faster than the standard library. Both are optional; without them the
+json module is used. HUBSPOT_JSON_DECODER=msgspec|orjson|json picks one explicitly.
+"""
+import json
+import os
+from typing import Any, TypedDict
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+MSGSPEC_AVAILABLE = msgspec is not None
+ORJSON_AVAILABLE = orjson is not None
+
+class SearchRecord(TypedDict, total=False):
+    """The parts of a HubSpot object the fetchers and processors read."""
+    id: str
+    properties: dict[str, Any]
+    updatedAt: str
+    associations: dict[str, Any]
+
+class SearchPage(TypedDict, total=False):
+    """A search or batch-read response: results plus the paging cursor."""
+    results: list[SearchRecord]
+    paging: dict[str, Any]
+
+def _choose_decoder():
+    requested = os.getenv("HUBSPOT_JSON_DECODER", "").lower()
+    available = [name for name, ok in (('msgspec', MSGSPEC_AVAILABLE), ('orjson', ORJSON_AVAILABLE)) if ok] + ['json']
+    return requested if requested in available else available[0]
+
+JSON_DECODER = _choose_decoder()
+
+if JSON_DECODER == 'msgspec':
+    _any_decoder = msgspec.json.Decoder()
+    _page_decoder = msgspec.json.Decoder(SearchPage)
+
+def loads(content):
+    """Decode JSON bytes (or str) into Python objects; raises ValueError on invalid input."""
+    if JSON_DECODER == 'msgspec':
+        return _any_decoder.decode(content)
+    if JSON_DECODER == 'orjson':
+        return orjson.loads(content)
+    return json.loads(content)
+
+def dumps(value):
+    """Compact JSON text of value."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value).decode()
+    if MSGSPEC_AVAILABLE:
+        return msgspec.json.encode(value).decode()
+    return json.dumps(value, separators=(',', ':'))
+
+def decode_page(content):
+    """Decode a search or batch-read response body into {'results': [records], 'paging': {...}}.
+
+    With msgspec the records are slim (SearchRecord keys only); otherwise they are the full objects.
+    Raises ValueError on invalid JSON or, with msgspec, an unexpected page shape.
+    """
+    if JSON_DECODER == 'msgspec':
+        return _page_decoder.decode(content)
+    return loads(content)
@@ -0,0 +1,171 @@
+"""Priority-ordered admission of HubSpot API requests.
+
+Every request to HubSpot takes a slot from one process-wide FetchScheduler.
+Requests carry the priority of the work they belong to (a context variable):
+the user's current view first, then secondary lookups (associations, partial
+payments, team cohorts, a requested comparison period), then background work
+(scheduled refreshes, stale-data reloads, prefetches). Waiting requests are
+started highest priority first, and background requests never take the slots
+reserved for interactive work, so they only use the quota left over.
+
+Speculative work runs inside cancel_scope(event): once the event is set, its
+next request (or its wait for one) raises FetchCancelled.
+"""
+import collections
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+
+INTERACTIVE = 0   # the active user's current contacts and deals
+SECONDARY = 1     # associations, partial-payment and team cohort searches, comparison periods
+BACKGROUND = 2    # scheduled refreshes, stale-while-revalidate reloads, prefetches
+PRIORITY_NAMES = {INTERACTIVE: "interactive", SECONDARY: "secondary", BACKGROUND: "background"}
+
+MAX_CONCURRENT_REQUESTS = int(os.getenv("HUBSPOT_MAX_CONCURRENT_REQUESTS", "10"))
+RESERVED_INTERACTIVE_SLOTS = int(os.getenv("HUBSPOT_RESERVED_INTERACTIVE_SLOTS", "6"))
+MAX_REQUESTS_PER_SECOND = float(os.getenv("HUBSPOT_MAX_REQUESTS_PER_SECOND", "0"))   # 0 = no rate limit
+
+CANCEL_POLL_SECONDS = 0.5   # how often a waiting request of a cancellable fetch checks its event
+
+class FetchIncomplete(RuntimeError):
+    """A fetch stopped before its last page; the pages received so far are checkpointed."""
+
+class FetchCancelled(FetchIncomplete):
+    """The fetch's cancel_scope() event was set; rerunning it resumes from the checkpoints."""
+
+_priority = contextvars.ContextVar("hubspot_fetch_priority", default=INTERACTIVE)
+_cancel = contextvars.ContextVar("hubspot_fetch_cancel", default=None)
+
+def current_priority():
+    """Priority of HubSpot requests made from the current context."""
+    return _priority.get()
+
+@contextlib.contextmanager
+def fetch_priority(priority):
+    """Run the block's HubSpot requests at priority, or lower if the caller already runs lower.
+
+    Nesting only ever demotes: associations fetched during a background refresh stay background.
+    """
+    token = _priority.set(max(priority, _priority.get()))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+@contextlib.contextmanager
+def cancel_scope(event):
+    """HubSpot requests made in the block raise FetchCancelled once event (a threading.Event) is set."""
+    token = _cancel.set(event)
+    try:
+        yield
+    finally:
+        _cancel.reset(token)
+
+def check_cancelled():
+    """Raise FetchCancelled if the current fetch has been cancelled."""
+    event = _cancel.get()
+    if event is not None and event.is_set():
+        raise FetchCancelled("Fetch cancelled")
+
+def pause(seconds):
+    """time.sleep(seconds), cut short by FetchCancelled when the current fetch is cancelled."""
+    event = _cancel.get()
+    if event is None:
+        time.sleep(seconds)
+    elif event.wait(seconds):
+        raise FetchCancelled("Fetch cancelled")
+
+def in_fetch_context(func):
+    """func wrapped to run at the caller's priority and cancel scope (thread pools do not inherit context variables)."""
+    priority, event = current_priority(), _cancel.get()
+
+    def run(*args, **kwargs):
+        with fetch_priority(priority), cancel_scope(event):
+            return func(*args, **kwargs)
+    return run
+
+class FetchScheduler:
+    """Admits at most max_concurrent requests at a time, highest priority (lowest number) first.
+
+    Background requests may use at most max_concurrent - reserved slots. With per_second,
+    request starts are also spread to at most that many per second.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_REQUESTS, reserved=RESERVED_INTERACTIVE_SLOTS,
+                 per_second=MAX_REQUESTS_PER_SECOND):
+        self.max_concurrent = max(max_concurrent, 1)
+        self.background_limit = max(self.max_concurrent - reserved, 1)
+        self.per_second = per_second
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._order = itertools.count()
+        self._running = collections.Counter()
+        self._started = collections.deque()
+        self._counts = collections.Counter()
+
+    def _delay(self, priority, now):
+        """Seconds until a request of priority may start (caller holds _cond); 0 when it may start now."""
+        running = sum(self._running.values())
+        if running >= self.max_concurrent:
+            return None
+        if priority >= BACKGROUND and self._running[BACKGROUND] >= self.background_limit:
+            return None
+        if self.per_second:
+            while self._started and now - self._started[0] >= 1:
+                self._started.popleft()
+            if len(self._started) >= self.per_second:
+                return 1 - (now - self._started[0])
+        return 0
+
+    @contextlib.contextmanager
+    def slot(self, priority=None):
+        """Hold a request slot for the block, waiting behind higher-priority requests.
+
+        Raises FetchCancelled instead when the current fetch is cancelled before it gets one.
+        """
+        priority = current_priority() if priority is None else priority
+        cancel = _cancel.get()
+        entry = (priority, next(self._order))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    raise FetchCancelled("Fetch cancelled")
+                delay = self._delay(priority, time.monotonic()) if self._waiting[0] == entry else None
+                if delay == 0:
+                    break
+                if cancel is not None:
+                    delay = min(delay or CANCEL_POLL_SECONDS, CANCEL_POLL_SECONDS)
+                self._cond.wait(delay)
+            heapq.heappop(self._waiting)
+            self._running[priority] += 1
+            self._counts[priority] += 1
+            self._started.append(time.monotonic())
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[priority] -= 1
+                self._cond.notify_all()
+
+    def stats(self):
+        """{priority name: {'running', 'waiting', 'total'}} of the requests seen so far."""
+        with self._cond:
+            waiting = collections.Counter(priority for priority, _ in self._waiting)
+            return {name: {'running': self._running[priority], 'waiting': waiting[priority],
+                           'total': self._counts[priority]}
+                    for priority, name in PRIORITY_NAMES.items()}
+
+_scheduler = FetchScheduler()
+
+def get_fetch_scheduler():
+    """Process-wide scheduler every HubSpot request goes through."""
+    return _scheduler
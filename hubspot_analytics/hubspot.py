@@ -0,0 +1,875 @@
+"""HubSpot CRM API client: pipelines, owners, contacts and deals."""
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import pytz
+import requests
+
+from .checkpoints import get_checkpoint_store
+from .config import HUBSPOT_API_BASE, IST, PARTIAL_STAGE_IDS
+from .fastjson import decode_page, loads
+from .fetch_scheduler import (SECONDARY, FetchCancelled, FetchIncomplete, fetch_priority, get_fetch_scheduler,
+                              in_fetch_context, pause)
+from .range_cache import get_range_cache, property_millis, search_key
+from .records import RecordSet
+from .reporting import get_reporter
+
+# [OK] CRITICAL FIX: Fetch Deal Pipeline Stages to get correct Stage IDs
+def fetch_deal_pipeline_stages(api_key):
+    """Fetch deal pipeline stages to get correct stage IDs (not labels)."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    url = f"{HUBSPOT_API_BASE}/crm/v3/pipelines/deals"
+    
+    try:
+        with get_fetch_scheduler().slot():
+            response = requests.get(url, headers=headers, timeout=10)
+        
+        if response.status_code == 200:
+            data = response.json()
+            pipelines = data.get("results", [])
+            
+            if not pipelines:
+                get_reporter().error(" No deal pipelines found in HubSpot")
+                return {}
+            
+            all_stages = {}
+            
+            for pipeline in pipelines:
+                pipeline_id = pipeline.get("id", "")
+                pipeline_label = pipeline.get("label", "")
+                stages = pipeline.get("stages", [])
+                
+                for stage in stages:
+                    stage_id = stage.get("id", "")
+                    stage_label = stage.get("label", "")
+                    stage_metadata = stage.get("metadata", {})
+                    probability = stage_metadata.get("probability", "0")
+                    
+                    all_stages[stage_id] = {
+                        "stage_id": stage_id,
+                        "stage_label": stage_label,
+                        "pipeline_id": pipeline_id,
+                        "pipeline_label": pipeline_label,
+                        "probability": probability,
+                        "full_info": f"{stage_label} (ID: {stage_id}, Probability: {probability})"
+                    }
+            
+            get_reporter().success(f"[OK] Loaded {len(all_stages)} deal stages from {len(pipelines)} pipelines")
+            return all_stages
+            
+        elif response.status_code == 403:
+            get_reporter().error("""
+             Missing required scope: crm.pipelines.read
+            Please update your API key permissions to include:
+            - crm.objects.deals.read
+            - crm.objects.contacts.read  
+            - crm.pipelines.read
+            """)
+            return {}
+        else:
+            get_reporter().error(f" Failed to fetch deal pipelines: {response.status_code}")
+            return {}
+            
+    except requests.exceptions.RequestException as e:
+        get_reporter().error(f" Error fetching deal pipelines: {e}")
+        return {}
+
+# [OK] Auto-detect Admission Confirmed stage ID
+def detect_admission_confirmed_stage(all_stages):
+    """Auto-detect Admission Confirmed stage from pipeline stages."""
+    target_labels = [
+        "admission confirmed",
+        "admission_confirmed", 
+        "confirmed",
+        "closed won",
+        "closedwon",
+        "won",
+        "customer"
+    ]
+    
+    detected_stages = []
+    
+    for stage_id, stage_info in all_stages.items():
+        stage_label = stage_info.get("stage_label", "").lower()
+        probability = stage_info.get("probability", "0")
+        
+        # [OK] Skip upselling stages - they should NOT count as customer stages
+        if 'upselling' in stage_label:
+            continue
+        
+        # [OK] NEW: Explicit check for known IDs
+        if stage_id in ['closedwon', '1884422889']:
+             detected_stages.append({
+                "stage_id": stage_id,
+                "stage_label": stage_info.get("stage_label"),
+                "probability": probability,
+                "pipeline": stage_info.get("pipeline_label"),
+                "match_reason": f"Explicit ID Match: {stage_id}"
+            })
+             continue
+
+        for target in target_labels:
+            if target in stage_label:
+                try:
+                    prob_float = float(probability)
+                    if prob_float >= 0.9:
+                        detected_stages.append({
+                            "stage_id": stage_id,
+                            "stage_label": stage_info.get("stage_label"),
+                            "probability": probability,
+                            "pipeline": stage_info.get("pipeline_label"),
+                            "match_reason": f"Label contains '{target}', probability: {probability}"
+                        })
+                        break
+                except:
+                    detected_stages.append({
+                        "stage_id": stage_id,
+                        "stage_label": stage_info.get("stage_label"),
+                        "probability": probability,
+                        "pipeline": stage_info.get("pipeline_label"),
+                        "match_reason": f"Label contains '{target}'"
+                    })
+                    break
+    
+    return detected_stages
+
+def validate_api_key(api_key):
+    """Validate the HubSpot API key format."""
+    if not api_key:
+        return False, " API key is empty"
+    
+    if not api_key.startswith("pat-"):
+        return False, " Invalid API key format. Should start with 'pat-'"
+    
+    if len(api_key) < 20:
+        return False, " API key appears too short"
+    
+    return True, "[OK] API key format looks valid"
+
+def test_hubspot_connection(api_key):
+    """Test if the HubSpot API key is valid."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts?limit=1"
+    
+    try:
+        with get_fetch_scheduler().slot():
+            response = requests.get(url, headers=headers, timeout=10)
+        
+        if response.status_code == 200:
+            return True, "[OK] Connection successful! API key is valid."
+        elif response.status_code == 401:
+            error_data = response.json()
+            error_message = error_data.get('message', 'Unknown error')
+            
+            if "Invalid token" in error_message or "expired" in error_message:
+                return False, " API key is invalid or expired. Please check your API key."
+            elif "scope" in error_message.lower():
+                return False, f" Missing required scopes. Error: {error_message}"
+            else:
+                return False, f" Authentication failed. Status: {response.status_code}"
+        else:
+            return False, f" Connection failed. Status: {response.status_code}"
+    except requests.exceptions.RequestException as e:
+        return False, f" Connection error: {str(e)}"
+
+def fetch_owner_mapping(api_key):
+    """Fetch ALL owner ID to name mapping with pagination."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    url = f"{HUBSPOT_API_BASE}/crm/v3/owners"
+    params = {"limit": 100}
+    mapping = {}
+    page_count = 0
+    total_owners = 0
+
+    try:
+        progress = get_reporter().progress()
+        
+        while True:
+            with get_fetch_scheduler().slot():
+                response = requests.get(url, headers=headers, params=params, timeout=30)
+            response.raise_for_status()
+
+            data = response.json()
+            owners = data.get("results", [])
+            
+            for owner in owners:
+                owner_id = str(owner.get("id", ""))
+
+                first_name = owner.get("firstName", "")
+                last_name = owner.get("lastName", "")
+                email = owner.get("email", "")
+
+                name = f"{first_name} {last_name}".strip() if first_name or last_name else email.split("@")[0] if email else f"Owner {owner_id}"
+                mapping[owner_id] = name
+
+            page_count += 1
+            total_owners += len(owners)
+            
+            progress.update(min(page_count / 5, 0.9), f" Fetched {total_owners} owners (page {page_count})...")
+
+            paging = data.get("paging", {})
+            next_link = paging.get("next", {}).get("link")
+
+            if not next_link:
+                progress.update(1.0, f"[OK] Owner mapping complete! Total: {total_owners} owners")
+                break
+
+            url = next_link
+            params = None
+            time.sleep(0.1)
+            
+    except requests.exceptions.RequestException as e:
+        get_reporter().warning(f" Partial owner mapping loaded. Error: {str(e)[:100]}")
+    except Exception as e:
+        get_reporter().warning(f" Could not fetch owner mapping: {str(e)[:100]}")
+
+    return mapping
+
+FETCH_CHUNK_DAYS = 35  # searches are split into date chunks fetched in parallel
+
+def split_date_range(start_date, end_date, days=FETCH_CHUNK_DAYS):
+    """Split [start_date, end_date] into consecutive (chunk_start, chunk_end) date pairs."""
+    date_chunks = []
+    curr_start = start_date
+    while curr_start <= end_date:
+        curr_end = min(curr_start + timedelta(days=days), end_date)
+        date_chunks.append((curr_start, curr_end))
+        curr_start = curr_end + timedelta(days=1)
+    return date_chunks
+
+def date_to_hubspot_timestamp(date_obj, is_end_date=False):
+    """Convert date to HubSpot timestamp (milliseconds)."""
+    if isinstance(date_obj, str):
+        date_obj = datetime.strptime(date_obj, "%Y-%m-%d").date()
+    
+    if is_end_date:
+        dt = datetime.combine(date_obj, datetime.max.time())
+    else:
+        dt = datetime.combine(date_obj, datetime.min.time())
+    
+    dt_ist = IST.localize(dt)
+    dt_utc = dt_ist.astimezone(pytz.UTC)
+    return int(dt_utc.timestamp() * 1000)
+
+# [OK] NEW: Paged searches retry with backoff and checkpoint every page, so a failed fetch resumes
+SEARCH_MAX_RETRIES = 6
+SEARCH_BACKOFF_SECONDS = 1.0   # doubled on every retry
+SEARCH_MAX_BACKOFF_SECONDS = 60
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def retry_after_seconds(response):
+    """Seconds to wait from a Retry-After header (seconds or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+def post_with_retry(url, headers, body, max_retries=SEARCH_MAX_RETRIES):
+    """POST body, retrying rate limits, server errors and network errors with exponential backoff.
+
+    Waits at least as long as HubSpot's Retry-After asks. Returns the first response with a
+    non-retryable status; raises FetchIncomplete once the retries are used up. Each attempt
+    waits for a slot of the fetch scheduler at the current fetch priority.
+    """
+    for attempt in range(max_retries + 1):
+        backoff = min(SEARCH_BACKOFF_SECONDS * 2 ** attempt, SEARCH_MAX_BACKOFF_SECONDS)
+        try:
+            with get_fetch_scheduler().slot():
+                response = requests.post(url, headers=headers, json=body, timeout=30)
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+            error = f"HTTP {response.status_code}"
+            wait = max(retry_after_seconds(response) or 0, backoff)
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+            wait = backoff
+        if attempt < max_retries:
+            pause(wait + random.uniform(0, backoff / 4))
+    raise FetchIncomplete(f"HubSpot search failed after {max_retries} retries ({error})")
+
+class PagedSearch:
+    """Iterate the result pages of one search request, resuming from its checkpoint.
+
+    Pages an interrupted run of the same search already received are replayed from
+    disk and the search continues at the saved cursor. complete is True once the
+    last page has been received. A non-retryable error status (e.g. 400) ends the
+    search early, as before; persistent rate limits or outages raise FetchIncomplete.
+    """
+
+    def __init__(self, api_key, url, headers, body):
+        self.api_key = api_key
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.complete = False
+
+    def __iter__(self):
+        checkpoint = get_checkpoint_store().checkpoint(search_key(self.api_key, self.url), self.body)
+        try:
+            pages, after = checkpoint.load()
+            yield from pages
+            while True:
+                request = dict(self.body, after=after) if after else self.body
+                response = post_with_retry(self.url, self.headers, request)
+                if not response.ok:
+                    checkpoint.complete()
+                    return
+                try:
+                    # Decoded with msgspec/orjson when installed, into slim records with msgspec
+                    data = decode_page(response.content)
+                except ValueError:
+                    raise FetchIncomplete("HubSpot returned an unreadable search page")
+                batch = data.get("results", [])
+                after = data.get("paging", {}).get("next", {}).get("after")
+                if batch:
+                    checkpoint.save_page(batch, after)
+                    yield batch
+                if not batch or not after:
+                    self.complete = True
+                    checkpoint.complete()
+                    return
+        finally:
+            checkpoint.release()
+
+# [OK] NEW: Two-tier contact fetch - searches return what the metrics need, details are read per shown row
+CONTACT_CORE_PROPERTIES = [
+    "hs_lead_status", "lead_status", 
+    "hubspot_owner_id", "hs_assigned_owner_id",
+    "course", "program", "product", "service", "offering",
+    "course_name", "program_name", "product_name",
+    "enquired_course", "interested_course", "course_interested",
+    "program_of_interest", "course_of_interest", "product_of_interest",
+    "which_course_do_you_prefer", "which_course_are_you_interested_in",
+    "select_your_preferred_course_mode", "which_type_of_oet_course__do_you_prefer",
+    "firstname", "lastname",
+    "createdate", "lastmodifieddate", "closedate",
+    "amount", "total_revenue",
+    "hs_analytics_source_data_1", "refferal_lead_", "refferred_by", "servicecustomer",
+    "utm_campaign", "campaign_name", "hs_analytics_source_data_2"
+]
+# Only shown in drill-down tables and exports; filled in by details.hydrate_contact_details()
+CONTACT_DETAIL_PROPERTIES = ["email", "phone", "company", "jobtitle", "country"]
+LAZY_CONTACT_DETAILS = os.getenv("HUBSPOT_LAZY_CONTACT_DETAILS", "1") != "0"
+CONTACT_BATCH_READ_SIZE = 100   # HubSpot's batch-read limit
+
+def fetch_hubspot_contacts_with_date_filter(api_key, date_field, start_date, end_date, include_details=None):
+    """Fetch ALL contacts from HubSpot with server-side date filtering (Cached 15 mins)."""
+    all_contacts = []
+    try:
+        for page in iter_contact_pages(api_key, date_field, start_date, end_date, include_details=include_details):
+            all_contacts.extend(page)
+        all_contacts = RecordSet(all_contacts)
+        return all_contacts, len(all_contacts)
+    except FetchIncomplete:
+        raise
+    except Exception as e:
+        get_reporter().error(f" Error fetching contacts: {e}")
+        return [], 0
+
+def iter_contact_pages(api_key, date_field, start_date, end_date, on_chunk_done=None, include_details=None):
+    """Yield pages (lists of up to 100 contacts) as they arrive; date chunks are fetched in parallel.
+
+    Parts of the range already fetched recently come from the range cache (yielded first, as
+    one chunk); only the rest is searched. Contacts are de-duplicated by ID across chunks.
+    on_chunk_done(chunks_done, chunks_total) is called each time a date chunk has been fully fetched.
+    Contacts carry CONTACT_DETAIL_PROPERTIES only with include_details (default: not
+    LAZY_CONTACT_DETAILS); otherwise they are read later for the rows that need them.
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts/search"
+    
+    if include_details is None:
+        include_details = not LAZY_CONTACT_DETAILS
+    all_properties = CONTACT_CORE_PROPERTIES + (CONTACT_DETAIL_PROPERTIES if include_details else [])
+    
+    # [OK] NEW: Reuse cached date segments and search only the uncovered parts of the range
+    cache = get_range_cache()
+    cache_key = search_key(api_key, 'contacts', date_field, 'details' if include_details else 'core')
+    date_properties = {"Created Date": ["createdate"], "Last Modified Date": ["lastmodifieddate"]}.get(
+        date_field, ["createdate", "lastmodifieddate"]
+    )
+    range_start = date_to_hubspot_timestamp(start_date, is_end_date=False)
+    range_end = date_to_hubspot_timestamp(end_date + timedelta(days=1), is_end_date=False)
+    
+    def in_range(contact):
+        return any(range_start <= (property_millis(contact, name) or -1) <= range_end for name in date_properties)
+    
+    cached_contacts, missing_ranges = cache.lookup(cache_key, start_date, end_date, in_range)
+    date_chunks = [chunk for missing_start, missing_end in missing_ranges
+                   for chunk in split_date_range(missing_start, missing_end)]
+    cached_chunks = 1 if cached_contacts else 0
+    total_chunks = len(date_chunks) + cached_chunks
+        
+    def chunk_pages(chunk_start, chunk_end):
+        start_timestamp = date_to_hubspot_timestamp(chunk_start, is_end_date=False)
+        safe_end_date = chunk_end + timedelta(days=1)
+        end_timestamp = date_to_hubspot_timestamp(safe_end_date, is_end_date=False)
+        
+        if date_field == "Created Date":
+            filter_groups = [{"filters": [
+                {"propertyName": "createdate", "operator": "GTE", "value": start_timestamp},
+                {"propertyName": "createdate", "operator": "LTE", "value": end_timestamp}
+            ]}]
+        elif date_field == "Last Modified Date":
+            filter_groups = [{"filters": [
+                {"propertyName": "lastmodifieddate", "operator": "GTE", "value": start_timestamp},
+                {"propertyName": "lastmodifieddate", "operator": "LTE", "value": end_timestamp}
+            ]}]
+        else:
+            filter_groups = [
+                {"filters": [
+                    {"propertyName": "createdate", "operator": "GTE", "value": start_timestamp},
+                    {"propertyName": "createdate", "operator": "LTE", "value": end_timestamp}
+                ]},
+                {"filters": [
+                    {"propertyName": "lastmodifieddate", "operator": "GTE", "value": start_timestamp},
+                    {"propertyName": "lastmodifieddate", "operator": "LTE", "value": end_timestamp}
+                ]}
+            ]
+        
+        body = {
+            "filterGroups": filter_groups,
+            "properties": all_properties,
+            "associations": ["owners"],
+            "limit": 100,
+            "sorts": [{
+                "propertyName": "createdate" if date_field == "Created Date" else "lastmodifieddate",
+                "direction": "ASCENDING"
+            }]
+        }
+        
+        fetched = []
+        search = PagedSearch(api_key, url, headers, body)
+        for batch in search:
+            fetched.extend(batch)
+            yield batch
+        if search.complete:
+            cache.add(cache_key, chunk_start, chunk_end, fetched)
+    
+    def chunk_done(done, total):
+        if on_chunk_done is not None:
+            on_chunk_done(done + cached_chunks, total_chunks)
+    
+    seen_ids = set()
+    
+    def unseen(page):
+        page = [contact for contact in page if contact.get("id") not in seen_ids]
+        seen_ids.update(contact.get("id") for contact in page)
+        return page
+    
+    for i in range(0, len(cached_contacts), 100):
+        page = unseen(cached_contacts[i:i + 100])
+        if page:
+            yield page
+    if cached_chunks:
+        chunk_done(0, len(date_chunks))
+    
+    for page in iter_pages_concurrently([
+        (lambda start=start, end=end: chunk_pages(start, end)) for start, end in date_chunks
+    ], on_source_done=chunk_done):
+        page = unseen(page)
+        if page:
+            yield page
+
+def fetch_contact_details(api_key, contact_ids, properties=None):
+    """{contact id: properties} for contact_ids via the batch-read API, 100 per request in parallel.
+
+    properties defaults to CONTACT_DETAIL_PROPERTIES. IDs of a batch HubSpot answered but did not
+    return (e.g. deleted contacts) map to {}; IDs of a failed batch are left out, so callers retry them.
+    """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts/batch/read"
+    properties = properties or CONTACT_DETAIL_PROPERTIES
+    
+    def read_batch(batch_ids):
+        body = {"properties": properties, "inputs": [{"id": contact_id} for contact_id in batch_ids]}
+        response = post_with_retry(url, headers, body)
+        if response.status_code not in [200, 207]:
+            return {}
+        details = {contact_id: {} for contact_id in batch_ids}
+        for record in decode_page(response.content).get("results", []):
+            details[str(record.get("id"))] = record.get("properties") or {}
+        return details
+    
+    contact_ids = [str(contact_id) for contact_id in contact_ids]
+    batches = [contact_ids[i:i + CONTACT_BATCH_READ_SIZE] for i in range(0, len(contact_ids), CONTACT_BATCH_READ_SIZE)]
+    details = {}
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        for batch_details in executor.map(in_fetch_context(read_batch), batches):
+            details.update(batch_details)
+    return details
+
+# [OK] NEW: Run several paged searches at once and hand pages over as soon as they arrive
+PAGE_FETCH_WORKERS = 5
+MAX_PENDING_PAGES = 20  # fetch threads wait when this many pages are not consumed yet
+
+def iter_pages_concurrently(page_sources, max_workers=PAGE_FETCH_WORKERS, max_pending_pages=MAX_PENDING_PAGES,
+                            on_source_done=None):
+    """Yield pages from several page iterators (given as zero-arg factories) fetched on a thread pool.
+
+    Pages are passed through a bounded queue, so memory held here is at most
+    max_pending_pages pages, and fetching continues while the caller processes a page.
+    Closing the generator early stops the fetch threads. on_source_done(done, total) is
+    called in the consuming thread once all pages of a source have been yielded.
+    """
+    pages = queue.Queue(maxsize=max_pending_pages)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def drain(source):
+        try:
+            for page in source():
+                if not put(page):
+                    return
+        finally:
+            put(done)
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(in_fetch_context(drain), source) for source in page_sources]
+        remaining = len(futures)
+        while remaining:
+            item = pages.get()
+            if item is done:
+                remaining -= 1
+                if on_source_done is not None:
+                    on_source_done(len(futures) - remaining, len(futures))
+            else:
+                yield item
+        for future in futures:
+            future.result()  # surface unexpected errors from the fetch threads
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+# [OK] Fetch DEALS using CORRECT Stage IDs
+def fetch_hubspot_deals(api_key, start_date, end_date, customer_stage_ids):
+    """Fetch DEALS from HubSpot using CORRECT stage IDs (Cached 15 mins)."""
+    if not customer_stage_ids:
+        get_reporter().error(" No customer stage IDs configured.")
+        return [], 0
+    
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals/search"
+    
+    deal_properties = [
+        "dealname", "dealstage", "amount", "hubspot_owner_id", "closedate", "createdate",
+        "course", "program", "product", "service", "offering", "course_name", "program_name",
+        "partial_amount", "hs_v2_date_entered_2107527928", "hs_v2_date_entered_2171957962",
+        "hs_v2_date_entered_contractsent", "hs_v2_date_entered_presentationscheduled",
+        "hs_v2_date_entered_decisionmakerboughtin", "hs_analytics_source"
+    ]
+    
+    # [OK] NEW: Reuse cached date segments and search only the uncovered parts of the range
+    cache = get_range_cache()
+    cache_key = search_key(api_key, 'deals', tuple(sorted(str(stage_id) for stage_id in customer_stage_ids)))
+    range_start = date_to_hubspot_timestamp(start_date, is_end_date=False)
+    range_end = date_to_hubspot_timestamp(end_date, is_end_date=True)
+    cached_deals, missing_ranges = cache.lookup(
+        cache_key, start_date, end_date,
+        lambda deal: range_start <= (property_millis(deal, "closedate") or -1) <= range_end
+    )
+    
+    all_deals = []
+    chunk_results = []
+    
+    date_chunks = [chunk for missing_start, missing_end in missing_ranges
+                   for chunk in split_date_range(missing_start, missing_end)]
+        
+    def fetch_deal_chunk(chunk_start, chunk_end):
+        start_timestamp = date_to_hubspot_timestamp(chunk_start, is_end_date=False)
+        end_timestamp = date_to_hubspot_timestamp(chunk_end, is_end_date=True)
+        
+        filter_groups = [{
+            "filters": [
+                {"propertyName": "dealstage", "operator": "IN", "values": customer_stage_ids},
+                {"propertyName": "closedate", "operator": "GTE", "value": start_timestamp},
+                {"propertyName": "closedate", "operator": "LTE", "value": end_timestamp}
+            ]
+        }]
+        
+        body = {
+            "filterGroups": filter_groups,
+            "properties": deal_properties,
+            "associations": ["owners", "contacts"],
+            "limit": 100,
+            "sorts": [{"propertyName": "closedate", "direction": "DESCENDING"}]
+        }
+        search = PagedSearch(api_key, url, headers, body)
+        chunk_deals = [deal for batch in search for deal in batch]
+        return chunk_deals, search.complete
+
+    try:
+        # A failed chunk is raised after the others are finished and cached
+        failure = None
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            future_to_chunk = {executor.submit(in_fetch_context(fetch_deal_chunk), start, end): (start, end)
+                               for start, end in date_chunks}
+            for future in as_completed(future_to_chunk):
+                try:
+                    chunk_deals, complete = future.result()
+                except FetchIncomplete as e:
+                    failure = failure or e
+                    continue
+                all_deals.extend(chunk_deals)
+                if complete:
+                    chunk_results.append((future_to_chunk[future], chunk_deals))
+
+        if all_deals:
+            try:
+                assoc_url = f"{HUBSPOT_API_BASE}/crm/v3/associations/deals/contacts/batch/read"
+                deal_contact_map = {}
+                deal_ids = [str(d.get("id")) for d in all_deals if d.get("id")]
+                
+                def fetch_associations(batch_ids):
+                    assoc_body = {"inputs": [{"id": did} for did in batch_ids]}
+                    with fetch_priority(SECONDARY):
+                        assoc_resp = post_with_retry(assoc_url, headers, assoc_body)
+                    if assoc_resp.status_code in [200, 207]:
+                        return loads(assoc_resp.content).get("results", [])
+                    return []
+
+                batches = [deal_ids[i:i+100] for i in range(0, len(deal_ids), 100)]
+                
+                with ThreadPoolExecutor(max_workers=5) as assoc_exec:
+                    for result_batch in assoc_exec.map(in_fetch_context(fetch_associations), batches):
+                        for result in result_batch:
+                            from_id = str(result.get("from", {}).get("id"))
+                            to_items = result.get("to", [])
+                            if to_items:
+                                contact_id = str(to_items[0].get("id"))
+                                if from_id not in deal_contact_map:
+                                    deal_contact_map[from_id] = []
+                                deal_contact_map[from_id].append({"id": contact_id})
+                
+                for deal in all_deals:
+                    deal_id = str(deal.get("id"))
+                    if deal_id in deal_contact_map:
+                        if "associations" not in deal: deal["associations"] = {}
+                        if "contacts" not in deal["associations"]: deal["associations"]["contacts"] = {"results": []}
+                        for c in deal_contact_map[deal_id]:
+                            deal["associations"]["contacts"]["results"].append({"id": c["id"]})
+                            
+            except FetchCancelled:
+                raise
+            except Exception as e:
+                # Deals are still usable without their contacts; the Associated Contact IDs stay empty
+                get_reporter().warning(f" Could not fetch deal-contact associations: {str(e)[:100]}")
+        
+        # Cache the fetched chunks with their contact associations, then add the cached part of the range
+        for (chunk_start, chunk_end), chunk_deals in chunk_results:
+            cache.add(cache_key, chunk_start, chunk_end, chunk_deals)
+        if failure is not None:
+            raise failure
+        fetched_ids = set(str(d.get("id")) for d in all_deals)
+        for deal in cached_deals:
+            if str(deal.get("id")) not in fetched_ids:
+                fetched_ids.add(str(deal.get("id")))
+                all_deals.append(deal)
+        
+        # Fingerprinted once here, so caches keyed on the deal list need not hash every record
+        all_deals = RecordSet(all_deals)
+        return all_deals, len(all_deals)
+    except FetchIncomplete:
+        raise
+    except Exception as e:
+        get_reporter().error(f" Unexpected error fetching deals: {e}")
+        return [], 0
+
+# [OK] NEW: Fetch partial payment deals that entered partial stage in current month
+def fetch_partial_payment_deals(api_key, start_date, end_date):
+    """Fetch deals that ENTERED partial payment stage during the reporting period."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals/search"
+    
+    ist = pytz.timezone('Asia/Kolkata')
+    start_utc = datetime.combine(start_date, datetime.min.time())
+    start_utc = ist.localize(start_utc).astimezone(pytz.UTC).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    end_utc = datetime.combine(end_date, datetime.max.time())
+    end_utc = ist.localize(end_utc).astimezone(pytz.UTC).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    
+    properties = [
+        "dealname", "dealstage", "amount", "partial_amount",
+        "hubspot_owner_id", "closedate", "createdate",
+        "course", "program", "course_name", "program_name",
+        "hs_v2_date_entered_2107527928", "hs_v2_date_entered_2171957962",
+    ]
+    
+    all_deals = []
+    
+    for stage_id in PARTIAL_STAGE_IDS:
+        prop_name = f"hs_v2_date_entered_{stage_id}"
+        body = {
+            "filterGroups": [{
+                "filters": [
+                    {"propertyName": prop_name, "operator": "GTE", "value": start_utc},
+                    {"propertyName": prop_name, "operator": "LTE", "value": end_utc}
+                ]
+            }],
+            "properties": properties,
+            "limit": 100,
+        }
+        # Secondary to the main contact and deal searches
+        with fetch_priority(SECONDARY):
+            for batch in PagedSearch(api_key, url, headers, body):
+                all_deals.extend(batch)
+    
+    return all_deals
+
+def detect_key_stages(all_stages):
+    """
+    Dynamically identify Stage IDs for Hot, Warm, Cold.
+    STRICTLY returns specific "Admission Confirmed" IDs for Online/Offline.
+    """
+    stage_map = {}
+
+    # Strict Admission Confirmed IDs (Online: closedwon, Offline: 1884422889)
+    # We do NOT want "Partial Payment" or other weird won stages unless explicitly requested.
+    stage_map['Admission Confirmed'] = ['closedwon', '1884422889']
+
+    for stage_id, stage_info in all_stages.items():
+        label = stage_info.get("stage_label", "").lower()
+        
+        # Hot
+        if "hot" in label:
+            stage_map['Hot'] = stage_id
+        
+        # Warm
+        elif "warm" in label:
+            stage_map['Warm'] = stage_id
+            
+        # Cold
+        elif "cold" in label:
+            stage_map['Cold'] = stage_id
+            
+    return stage_map
+
+def get_hubspot_iso_timestamp(date_obj, is_end_date=False):
+    """
+    Convert a local date (IST) to a HubSpot-compatible UTC ISO timestamp string.
+    """
+    if not date_obj:
+        return None
+        
+    # Define IST timezone
+    ist = pytz.timezone('Asia/Kolkata')
+    
+    if is_end_date:
+        # Create datetime at end of day IST
+        dt = datetime.combine(date_obj, datetime.max.time())
+        dt_ist = ist.localize(dt)
+    else:
+        # Create datetime at start of day IST
+        dt = datetime.combine(date_obj, datetime.min.time())
+        dt_ist = ist.localize(dt)
+        
+    # Convert to UTC
+    dt_utc = dt_ist.astimezone(pytz.UTC)
+    
+    # Format as ISO 8601 string with milliseconds and Z
+    return dt_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def fetch_team_performance_deals(api_key, start_date, end_date, stage_ids_map):
+    """
+    Fetch deals using 3 SEPARATE queries for Hot, Warm, Cold in parallel chunks.
+    """
+    if not stage_ids_map: return [], 0
+        
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals/search"
+    all_deals_map = {}
+    
+    properties = [
+        "dealname", "dealstage", "amount", "hubspot_owner_id", "closedate", "createdate",
+        "course", "program", "program_name", "course_name"
+    ]
+    for stage_name, stage_id in stage_ids_map.items():
+        properties.append(f"hs_v2_date_entered_{stage_id}")
+
+    date_chunks = split_date_range(start_date, end_date)
+        
+    def fetch_cohort(prop, operator1, val1, operator2, val2):
+        body = {
+            "filterGroups": [{
+                "filters": [
+                    {"propertyName": prop, "operator": operator1, "value": val1},
+                    {"propertyName": prop, "operator": operator2, "value": val2}
+                ]
+            }],
+            "properties": properties,
+            "limit": 100
+        }
+        return [deal for batch in PagedSearch(api_key, url, headers, body) for deal in batch]
+
+    def fetch_all_cohorts_for_chunk(chunk_start, chunk_end):
+        start_utc = get_hubspot_iso_timestamp(chunk_start, is_end_date=False)
+        end_utc = get_hubspot_iso_timestamp(chunk_end, is_end_date=True)
+        results = []
+        if 'Hot' in stage_ids_map:
+            results.extend(fetch_cohort(f"hs_v2_date_entered_{stage_ids_map['Hot']}", "GTE", start_utc, "LTE", end_utc))
+        if 'Warm' in stage_ids_map:
+            results.extend(fetch_cohort(f"hs_v2_date_entered_{stage_ids_map['Warm']}", "GTE", start_utc, "LTE", end_utc))
+        if 'Cold' in stage_ids_map:
+            results.extend(fetch_cohort(f"hs_v2_date_entered_{stage_ids_map['Cold']}", "GTE", start_utc, "LTE", end_utc))
+        return results
+
+    # Cohort searches are secondary to the main contact and deal searches
+    with fetch_priority(SECONDARY), ThreadPoolExecutor(max_workers=5) as executor:
+        fetch_chunk = in_fetch_context(lambda c: fetch_all_cohorts_for_chunk(c[0], c[1]))
+        for chunk_results in executor.map(fetch_chunk, date_chunks):
+            for d in chunk_results:
+                all_deals_map[d['id']] = d
+
+    unique_deals = list(all_deals_map.values())
+    return unique_deals, len(unique_deals)
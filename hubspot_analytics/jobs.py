@@ -0,0 +1,180 @@
+"""Background report jobs with metadata persisted on disk."""
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+# [OK] NEW: Background report jobs (worker pool + job metadata persisted on disk)
+REPORT_JOBS_DIR = os.environ.get("HUBSPOT_REPORT_JOBS_DIR") or os.path.join(tempfile.gettempdir(), "hubspot_report_jobs")
+
+REPORT_JOB_WORKERS = 2
+
+REPORT_JOB_TTL_SECONDS = 24 * 60 * 60   # finished jobs and their files are kept for a day
+REPORT_JOB_CLEANUP_INTERVAL_SECONDS = 10 * 60   # how often listing/submitting jobs also deletes expired ones
+
+REPORT_JOBS_SHOWN = 5
+
+def _write_meta(meta_path, job):
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, meta_path)
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class JobProgress:
+    """progress(fraction, message) callback of one job; picklable, so worker processes can report too."""
+
+    def __init__(self, meta_path):
+        self.meta_path = meta_path
+
+    def __call__(self, fraction, message):
+        job = _read_meta(self.meta_path)
+        if job is not None and job['status'] == 'running':
+            job.update(progress=fraction, message=message)
+            _write_meta(self.meta_path, job)
+
+class ReportJobManager:
+    """Runs report builds in the background and tracks them as JSON files on disk.
+
+    A small thread pool runs each job's build(output_path, progress); builds hand their
+    CPU-heavy part to run_in_process(), a pool of spawned worker processes, so writing a
+    workbook does not hold the GIL the sessions' script threads need. Job metadata lives
+    next to the report file, so any session (or a restarted server) can list jobs and
+    download finished reports.
+    """
+
+    def __init__(self, jobs_dir=REPORT_JOBS_DIR, max_workers=REPORT_JOB_WORKERS):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._process_pool = None
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self._recover_interrupted()
+        self.cleanup()
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            job.update(changes)
+            _write_meta(self._meta_path(job_id), job)
+            return job
+
+    def _recover_interrupted(self):
+        """Jobs left queued/running by a previous process can never finish - mark them failed."""
+        for job in self._load_jobs():
+            if job['status'] in ('queued', 'running'):
+                self._update(job['id'], status='failed', error="Interrupted by a server restart",
+                             finished_at=datetime.now().isoformat())
+
+    def get(self, job_id):
+        return _read_meta(self._meta_path(job_id))
+
+    def list_jobs(self, limit=REPORT_JOBS_SHOWN):
+        """Newest jobs first (limit=None for all); expired jobs are cleaned up every few minutes."""
+        self._maybe_cleanup()
+        jobs = self._load_jobs()
+        return jobs if limit is None else jobs[:limit]
+
+    def _load_jobs(self):
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            if name.endswith(".json"):
+                job = self.get(name[:-len(".json")])
+                if job:
+                    jobs.append(job)
+        jobs.sort(key=lambda j: j['created_at'], reverse=True)
+        return jobs
+
+    def has_active_jobs(self):
+        return any(job['status'] in ('queued', 'running') for job in self.list_jobs(limit=None))
+
+    def submit(self, label, file_name, build):
+        """Queue build(output_path, progress) and return the new job id.
+
+        progress(fraction, message) is picklable and may be passed on to run_in_process().
+        """
+        self._maybe_cleanup()
+        job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hashlib.blake2b(os.urandom(8), digest_size=4).hexdigest()}"
+        job = {
+            'id': job_id,
+            'label': label,
+            'file_name': file_name,
+            'path': os.path.join(self.jobs_dir, f"{job_id}{os.path.splitext(file_name)[1]}"),
+            'status': 'queued',
+            'progress': 0.0,
+            'message': "Waiting for a worker",
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None,
+        }
+        with self._lock:
+            _write_meta(self._meta_path(job_id), job)
+        self._executor.submit(self._run, job_id, job['path'], build)
+        return job_id
+
+    def run_in_process(self, func, *args, **kwargs):
+        """func(*args, **kwargs) in a worker process; arguments and result must be picklable."""
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+            pool = self._process_pool
+        try:
+            return pool.submit(func, *args, **kwargs).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for the next job
+            with self._lock:
+                if self._process_pool is pool:
+                    self._process_pool = None
+            raise
+
+    def _run(self, job_id, output_path, build):
+        self._update(job_id, status='running', message="Starting")
+        try:
+            build(output_path, JobProgress(self._meta_path(job_id)))
+            self._update(job_id, status='done', progress=1.0, message="Ready for download",
+                         finished_at=datetime.now().isoformat())
+        except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+
+    def _maybe_cleanup(self):
+        """cleanup(), at most once per REPORT_JOB_CLEANUP_INTERVAL_SECONDS."""
+        with self._lock:
+            if time.monotonic() - self._last_cleanup < REPORT_JOB_CLEANUP_INTERVAL_SECONDS:
+                return
+            self._last_cleanup = time.monotonic()
+        self.cleanup()
+
+    def cleanup(self, max_age_seconds=REPORT_JOB_TTL_SECONDS):
+        """Delete finished jobs (metadata and file) older than max_age_seconds."""
+        cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+        with self._lock:
+            self._last_cleanup = time.monotonic()
+        for job in self._load_jobs():
+            if job['status'] in ('done', 'failed') and datetime.fromisoformat(job['created_at']) < cutoff:
+                for path in (job['path'], self._meta_path(job['id'])):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
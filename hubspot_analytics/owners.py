@@ -0,0 +1,125 @@
+"""Owner dimension: one row per HubSpot owner with its team and exclusion flag.
+
+The dimension is built from fetch_owner_mapping() and keyed on the integer owner
+ID. Frames that carry an 'Owner ID' column are joined on it; aggregated frames
+that only have owner names ('Course Owner') are joined on the name. Team and
+exclusion lookups are then array indexing on the row keys, and a frame is split
+into its teams with a single groupby instead of one case-insensitive isin()
+filter per team.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .config import TEAM_MAPPING
+from .rules import get_rules
+
+OWNER_COLUMNS = ['owner_id', 'name', 'name_key', 'team', 'excluded']
+OWNER_ID_COLUMN = 'Owner ID'
+NO_TEAM = -1
+
+def owner_id_array(owner_ids):
+    """HubSpot owner IDs (numbers or numeric strings) as int64; -1 where missing or not numeric."""
+    ids = pd.to_numeric(pd.Series(owner_ids, dtype=object), errors='coerce')
+    return ids.fillna(-1).to_numpy(dtype=np.int64)
+
+class OwnerDimension:
+    """The owners of one owner mapping, indexed by integer key (the row position); immutable.
+
+    Team membership matches names case-insensitively, like TEAM_MAPPING always has;
+    excluded follows the rules' excluded owners exactly. Owners missing from the
+    mapping are classified by name on each lookup and never stored.
+    """
+
+    def __init__(self, owner_mapping=None, rules=None, team_mapping=TEAM_MAPPING):
+        self.rules = rules or get_rules()
+        self.owner_mapping = dict(owner_mapping or {})
+        self.teams = list(team_mapping)
+        self._team_code = {}
+        for code, members in enumerate(team_mapping.values()):
+            for member in members:
+                self._team_code.setdefault(member.lower(), code)
+        self._rows = []
+        for owner_id, name in self.owner_mapping.items():
+            name_key = name.lower() if isinstance(name, str) else None
+            code = self._team_code.get(name_key, NO_TEAM)
+            self._rows.append({'owner_id': owner_id_array([owner_id])[0], 'name': name, 'name_key': name_key,
+                               'team': self.teams[code] if code != NO_TEAM else None,
+                               'excluded': self.rules.excludes_owner(name)})
+        # One extra trailing entry answers for key -1 (owners not in the mapping)
+        self._team_codes = np.array([self._team_code.get(row['name_key'], NO_TEAM) for row in self._rows] + [NO_TEAM])
+        self._excluded = np.array([row['excluded'] for row in self._rows] + [False])
+        ids = pd.Series([row['owner_id'] for row in self._rows], dtype=np.int64)
+        names = pd.Series([row['name'] for row in self._rows], dtype=object)
+        # An ID or name listed twice resolves to its first row; the trailing -1 answers for index misses
+        self._id_index = pd.Index(ids[~ids.duplicated()])
+        self._id_keys = np.append(np.flatnonzero(~ids.duplicated().to_numpy()), -1)
+        self._name_index = pd.Index(names[~names.duplicated()])
+        self._name_keys = np.append(np.flatnonzero(~names.duplicated().to_numpy()), -1)
+
+    def keys(self, owner_ids):
+        """Integer owner key of every owner ID (-1 for IDs not in the mapping)."""
+        return self._id_keys[self._id_index.get_indexer(owner_id_array(owner_ids))]
+
+    def name_keys(self, names):
+        """Integer owner key of every owner name (-1 for names not in the mapping)."""
+        return self._name_keys[self._name_index.get_indexer(pd.Index(np.asarray(names, dtype=object)))]
+
+    def _lookup(self, names, owner_ids, values, classify):
+        """values[key] per owner, joined on owner_ids when given (names for IDs not in the mapping);
+        owners outside the mapping get classify(unique names) instead."""
+        names = np.asarray(names, dtype=object)
+        keys = self.name_keys(names)
+        if owner_ids is not None:
+            id_keys = self.keys(owner_ids)
+            keys = np.where(id_keys >= 0, id_keys, keys)
+        result = values[keys]
+        unknown = (keys < 0) & pd.notna(names)
+        if unknown.any():
+            codes, unique = pd.factorize(names[unknown])
+            result[unknown] = classify(np.asarray(unique, dtype=object))[codes]
+        return result
+
+    def team_codes(self, names, owner_ids=None):
+        """Position in self.teams of each owner's team, NO_TEAM for owners outside every team."""
+        return self._lookup(names, owner_ids, self._team_codes,
+                            lambda unique: np.array([self._team_code.get(str(name).lower(), NO_TEAM) for name in unique]))
+
+    def excluded(self, names, owner_ids=None):
+        """Boolean array: which owners (by name, or by ID where owner_ids is given) are excluded owners."""
+        return self._lookup(names, owner_ids, self._excluded, self.rules.excluded_owner_mask)
+
+    def excluded_rows(self, df, column='Course Owner'):
+        """Boolean array: which rows of df belong to excluded owners (joined on its 'Owner ID' column if any)."""
+        return self.excluded(df[column], df[OWNER_ID_COLUMN] if OWNER_ID_COLUMN in df.columns else None)
+
+    def team_frames(self, df, column='Course Owner'):
+        """{team: rows of df owned by its members} for every team (in TEAM_MAPPING order), from one groupby.
+
+        Rows are joined on df's 'Owner ID' column when it has one. A team without rows maps to an empty frame.
+        """
+        if column not in df.columns:
+            return {team: df.iloc[0:0] for team in self.teams}
+        codes = self.team_codes(df[column], df[OWNER_ID_COLUMN] if OWNER_ID_COLUMN in df.columns else None)
+        groups = dict(tuple(df.groupby(codes, sort=False)))
+        return {team: groups.get(code, df.iloc[0:0]) for code, team in enumerate(self.teams)}
+
+    def table(self):
+        """The dimension as a frame indexed by owner key."""
+        return pd.DataFrame(self._rows, columns=OWNER_COLUMNS).rename_axis('owner_key')
+
+_dimension = None
+_dimension_lock = threading.Lock()
+
+def get_owner_dimension(owner_mapping=None):
+    """Process-wide OwnerDimension, rebuilt when a fetch brings a different owner_mapping or the business rules change."""
+    global _dimension
+    rules = get_rules()
+    with _dimension_lock:
+        current = _dimension.owner_mapping if _dimension is not None else {}
+        if owner_mapping and owner_mapping != current:
+            _dimension = OwnerDimension(owner_mapping, rules=rules)
+        elif _dimension is None or _dimension.rules.fingerprint != rules.fingerprint:
+            _dimension = OwnerDimension(current, rules=rules)
+        return _dimension
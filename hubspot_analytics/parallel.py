@@ -0,0 +1,134 @@
+"""Partitioned execution of the record processors on a process pool.
+
+Raw records are sharded by the same 35-day date chunks the fetchers use, each
+shard is processed (or partially aggregated) in a worker process and the partial
+results are merged back into the order the sequential processors produce. Small
+inputs are processed inline, where a pool would only add start-up and pickling cost.
+"""
+import multiprocessing
+import os
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from .hubspot import split_date_range
+from .processing import (count_team_performance, process_contacts_data, process_deals_as_customers,
+                         process_team_performance_metrics, team_deal_owners, team_performance_frame)
+
+PARALLEL_MIN_RECORDS = int(os.getenv("HUBSPOT_PARALLEL_MIN_RECORDS", "20000"))  # below this, run inline
+PROCESS_POOL_WORKERS = int(os.getenv("HUBSPOT_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """Shared process pool (spawned workers only import this Streamlit-free package)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def use_process_pool(record_count):
+    """Whether record_count records are worth shipping to the process pool."""
+    return PROCESS_POOL_WORKERS > 1 and record_count >= PARALLEL_MIN_RECORDS
+
+def _record_day(record, date_property):
+    """YYYY-MM-DD prefix of an ISO date property, or '' when missing."""
+    return str((record.get('properties') or {}).get(date_property) or '')[:10]
+
+def shard_records_by_date(records, date_property, date_chunks=None):
+    """Group records into date chunks by date_property.
+
+    date_chunks defaults to split_date_range() over the records' own date span, i.e. the
+    fetchers' chunking. Records dated outside the chunks (or undated) go to the nearest edge chunk.
+    """
+    if date_chunks is None:
+        days = sorted(day for day in (_record_day(r, date_property) for r in records) if day)
+        if not days:
+            return [records] if records else []
+        date_chunks = split_date_range(date.fromisoformat(days[0]), date.fromisoformat(days[-1]))
+
+    chunk_starts = [chunk_start.isoformat() for chunk_start, _ in date_chunks]
+    shards = [[] for _ in date_chunks]
+    for record in records:
+        index = bisect_right(chunk_starts, _record_day(record, date_property)) - 1
+        shards[max(index, 0)].append(record)
+    return [shard for shard in shards if shard]
+
+def map_shards(func, shards):
+    """Run func over every shard on the process pool, preserving shard order."""
+    return list(get_process_pool().map(func, shards))
+
+def concat_in_record_order(frames, records, id_column):
+    """Concatenate per-shard frames with their rows in the input order of records (matched by id).
+
+    The n-th row of an id takes the position of the n-th record with that id. Repeated
+    copies of a record share its date, so they land in one shard and keep their order.
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    positions = defaultdict(list)
+    for position, record in enumerate(records):
+        positions[record.get("id", "")].append(position)
+    occurrence = df.groupby(id_column, sort=False).cumcount()
+    keys = [positions[record_id][min(n, len(positions[record_id]) - 1)] if record_id in positions else len(records)
+            for record_id, n in zip(df[id_column], occurrence)]
+    return df.take(np.argsort(keys, kind='stable')).reset_index(drop=True)
+
+def process_contacts_partitioned(contacts, owner_mapping=None, api_key=None, start_date=None, end_date=None):
+    """process_contacts_data, run per date shard on the process pool for large inputs."""
+    if not use_process_pool(len(contacts)):
+        return process_contacts_data(contacts, owner_mapping, api_key, start_date=start_date, end_date=end_date)
+
+    frames = map_shards(
+        partial(process_contacts_data, owner_mapping=owner_mapping, api_key=api_key, start_date=start_date, end_date=end_date),
+        shard_records_by_date(contacts, 'createdate')
+    )
+    return concat_in_record_order(frames, contacts, 'ID')
+
+def process_deals_partitioned(deals, owner_mapping=None, api_key=None, all_stages=None, start_date=None):
+    """process_deals_as_customers, run per date shard on the process pool for large inputs."""
+    if not use_process_pool(len(deals)):
+        return process_deals_as_customers(deals, owner_mapping, api_key, all_stages, start_date=start_date)
+
+    frames = map_shards(
+        partial(process_deals_as_customers, owner_mapping=owner_mapping, api_key=api_key, all_stages=all_stages, start_date=start_date),
+        shard_records_by_date(deals, 'closedate')
+    )
+    return concat_in_record_order(frames, deals, 'Customer ID')
+
+def merge_owner_counts(partials):
+    """Sum per-owner count dicts produced for disjoint shards."""
+    merged = {}
+    for owner_counts in partials:
+        for owner, counts in owner_counts.items():
+            totals = merged.setdefault(owner, dict.fromkeys(counts, 0))
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+    return merged
+
+def process_team_performance_partitioned(deals, start_date, end_date, stage_ids_map, owner_mapping):
+    """process_team_performance_metrics with per-shard owner counts merged before the rates are computed."""
+    if not use_process_pool(len(deals)):
+        return process_team_performance_metrics(deals, start_date, end_date, stage_ids_map, owner_mapping)
+
+    partials = map_shards(
+        partial(count_team_performance, start_date=start_date, end_date=end_date,
+                stage_ids_map=stage_ids_map, owner_mapping=owner_mapping),
+        shard_records_by_date(deals, 'createdate')
+    )
+    # Owners in order of their first counted deal, as the sequential count lists them - the
+    # unstable sort by Hot in team_performance_frame then breaks ties the same way
+    merged = merge_owner_counts(partials)
+    owner_order = dict.fromkeys(owner for owner in team_deal_owners(deals, owner_mapping) if owner is not None)
+    return team_performance_frame({owner: merged[owner] for owner in owner_order if owner in merged})
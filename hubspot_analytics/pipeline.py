@@ -0,0 +1,129 @@
+"""Full fetch -> process -> metrics pipeline for one date range."""
+from types import SimpleNamespace
+
+import pandas as pd
+
+from .hubspot import (detect_key_stages, fetch_hubspot_deals, fetch_owner_mapping, fetch_partial_payment_deals,
+                      fetch_team_performance_deals)
+from .metrics import (create_course_revenue, create_metric_1, create_metric_2, create_metric_4, create_metric_5,
+                      create_metric_6, create_volume_conversion_matrix)
+from .parallel import process_deals_partitioned, process_team_performance_partitioned
+from .owners import get_owner_dimension
+from .processing import calculate_partial_revenue, group_team_performance_metrics
+from .streaming import fetch_and_process_contacts
+
+# [OK] NEW: Full fetch -> process -> metrics pipeline, shared by the dashboard and the headless CLI
+PIPELINE_STATE_KEYS = [
+    'owner_mapping', 'contacts_df', 'customers_df', 'partial_revenue',
+    'team_performance_df', 'metrics', 'revenue_data', 'matrix_data'
+]
+
+def compute_dashboard_metrics(df_contacts, df_customers, team_performance_df, metric_4=None):
+    """Build every metric table the dashboard shows from the processed frames."""
+    if metric_4 is None:
+        metric_4 = create_metric_4(df_contacts, df_customers)
+    
+    metrics = {
+        'metric_1': create_metric_1(df_contacts),
+        'metric_2': create_metric_2(df_contacts),
+        'metric_4': metric_4,
+        'metric_5': create_metric_5(df_contacts, df_customers),
+        'metric_6': create_metric_6(df_contacts),  # [OK] NEW LEAD STATUS METRIC
+        'metric_7': group_team_performance_metrics(team_performance_df) if team_performance_df is not None else {}  # [OK] NEW TEAM METRIC DICT
+    }
+    
+    return {
+        'metrics': metrics,
+        # [OK] NEW: Revenue and matrix data
+        'revenue_data': create_course_revenue(df_customers),
+        'matrix_data': create_volume_conversion_matrix(metrics['metric_1'], df_contacts, df_customers),
+    }
+
+# Fetch/process steps a caller may swap for wrapped versions (the dashboard passes st.cache_data ones)
+DEFAULT_PIPELINE_STEPS = {
+    'fetch_owner_mapping': fetch_owner_mapping,
+    # Contacts are processed in batches while the remaining pages are still downloading
+    'fetch_and_process_contacts': fetch_and_process_contacts,
+    'fetch_hubspot_deals': fetch_hubspot_deals,
+    'fetch_team_performance_deals': fetch_team_performance_deals,
+    'fetch_partial_payment_deals': fetch_partial_payment_deals,
+    # Deal processors need the full record set; large inputs are sharded by date chunk across a process pool
+    'process_deals_as_customers': process_deals_partitioned,
+    'process_team_performance_metrics': process_team_performance_partitioned,
+}
+
+def run_dashboard_pipeline(api_key, date_field, start_date, end_date, deal_start_date, deal_end_date,
+                           customer_stage_ids, deal_stages, steps=None):
+    """Fetch and process HubSpot data for the given ranges and compute all dashboard tables.
+
+    Returns a dict keyed like PIPELINE_STATE_KEYS (plus record counts), or None if no contacts were found.
+    steps overrides entries of DEFAULT_PIPELINE_STEPS. Status messages go to get_reporter().
+    """
+    step = SimpleNamespace(**dict(DEFAULT_PIPELINE_STEPS, **(steps or {})))
+    
+    # Fetch owners - the owner dimension (teams, exclusions) is rebuilt from them when they change
+    owner_mapping = step.fetch_owner_mapping(api_key)
+    owners = get_owner_dimension(owner_mapping)
+    
+    # Fetch and process CONTACTS (Leads) - Passing dates for Qualified Lead intersection check
+    df_contacts, total_contacts = step.fetch_and_process_contacts(
+        api_key, date_field, start_date, end_date, owner_mapping
+    )
+    
+    # [OK] Fetch DEALS using Stage IDs
+    deals, total_deals = step.fetch_hubspot_deals(
+        api_key, deal_start_date, deal_end_date, customer_stage_ids
+    )
+    
+    # [OK] NEW: Fetch Team Performance Deals (Date Entered Logic)
+    stage_ids_map = detect_key_stages(deal_stages)
+    team_perf_deals, count_tp = step.fetch_team_performance_deals(
+        api_key, deal_start_date, deal_end_date, stage_ids_map
+    )
+    
+    if not total_contacts:
+        return None
+    
+    # Process deals (customers)
+    df_customers = step.process_deals_as_customers(deals, owner_mapping, api_key, deal_stages, start_date=deal_start_date)
+    
+    # [OK] NEW: Fetch partial payment deals for current month revenue
+    partial_deals = step.fetch_partial_payment_deals(api_key, deal_start_date, deal_end_date)
+    admission_deal_ids = set(str(d.get('id')) for d in deals)
+    partial_revenue = calculate_partial_revenue(
+        partial_deals, admission_deal_ids, owner_mapping, deal_start_date, deal_end_date
+    )
+    
+    # [OK] FILTER OUT EXCLUDED OWNERS
+    if df_contacts is not None and not df_contacts.empty:
+        df_contacts = df_contacts[~owners.excluded_rows(df_contacts)]
+        
+    if df_customers is not None and not df_customers.empty:
+        df_customers = df_customers[~owners.excluded_rows(df_customers)]
+    
+    metric_4_data = create_metric_4(df_contacts, df_customers)
+    
+    # [OK] NEW: Process Team Performance Metrics
+    df_team_perf = step.process_team_performance_metrics(team_perf_deals, deal_start_date, deal_end_date, stage_ids_map, owner_mapping)
+    
+    # [OK] NEW: Merge Customer Count/Revenue from metric_4 (Sales Performance)
+    if not metric_4_data.empty:
+        cust_data = metric_4_data[['Course Owner', 'Customer', 'Customer_Revenue']].copy()
+        cust_data = cust_data.rename(columns={'Customer': 'Customer Count', 'Customer_Revenue': 'Customer Revenue'})
+        
+        # Merge
+        df_team_perf = pd.merge(df_team_perf, cust_data, on='Course Owner', how='left')
+        df_team_perf['Customer Count'] = df_team_perf['Customer Count'].fillna(0)
+        df_team_perf['Customer Revenue'] = df_team_perf['Customer Revenue'].fillna(0)
+    
+    result = {
+        'owner_mapping': owner_mapping,
+        'contacts_df': df_contacts,
+        'customers_df': df_customers,
+        'partial_revenue': partial_revenue,
+        'team_performance_df': df_team_perf,
+        'contacts_count': total_contacts,
+        'deals_count': len(deals),
+    }
+    result.update(compute_dashboard_metrics(df_contacts, df_customers, df_team_perf, metric_4=metric_4_data))
+    return result
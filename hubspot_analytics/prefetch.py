@@ -0,0 +1,112 @@
+"""Speculative background loads (e.g. the comparison period) that are dropped when nobody wants them."""
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from .fetch_scheduler import BACKGROUND, FetchCancelled, cancel_scope, fetch_priority
+
+# [OK] NEW: Prefetch likely next views with leftover HubSpot quota
+PREFETCH_WORKERS = 2
+PREFETCH_PERIODS = int(os.getenv("HUBSPOT_PREFETCH_PERIODS", "1"))   # preceding periods to prefetch; 0 disables
+
+logger = logging.getLogger("hubspot_analytics")
+
+class PrefetchOwner:
+    """A party asking for prefetches; keep it in the session state - once collected, its wants lapse."""
+
+class PrefetchTask:
+    """One speculative load, shared by every owner (session) that asked for its key."""
+
+    def __init__(self, key):
+        self.key = key
+        self.owners = weakref.WeakSet()
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def done(self):
+        return self.future.done()
+
+    def succeeded(self):
+        """Finished without being cancelled or failing."""
+        return self.future.done() and not self.cancelled.is_set() and self.future.exception() is None
+
+    def result(self):
+        return self.future.result()
+
+class Prefetcher:
+    """Runs load functions on a small thread pool at BACKGROUND fetch priority.
+
+    Owners say which keys they want with request(); keys an owner no longer asks for are
+    given up, and a load nobody wants is cancelled - its next HubSpot request raises
+    FetchCancelled. Its searches keep their checkpoints, so a real fetch of the same
+    range resumes where the prefetch stopped.
+    """
+
+    def __init__(self, max_workers=PREFETCH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def _run(self, task, load):
+        if task.cancelled.is_set():
+            raise FetchCancelled("Fetch cancelled")
+        try:
+            with fetch_priority(BACKGROUND), cancel_scope(task.cancelled):
+                return load()
+        except FetchCancelled:
+            raise
+        except Exception:
+            logger.exception("Prefetch of %s failed", task.key)
+            raise
+
+    def _give_up(self, owner, keep=()):
+        """Remove owner from every task not in keep, cancelling tasks left without owners (caller holds _lock).
+
+        Returns the cancelled tasks. Tasks whose owners were all garbage collected go too.
+        """
+        cancelled = []
+        for key, task in list(self._tasks.items()):
+            if key not in keep:
+                task.owners.discard(owner)
+            if not task.owners:
+                task.cancelled.set()
+                cancelled.append(self._tasks.pop(key))
+        return cancelled
+
+    def request(self, owner, loads):
+        """Make owner want exactly the keys of loads ({key: zero-arg load}), starting the missing loads.
+
+        A finished load is kept; one that failed or was cancelled is started again.
+        """
+        with self._lock:
+            self._give_up(owner, keep=loads)
+            for key, load in loads.items():
+                task = self._tasks.get(key)
+                if task is None or (task.done() and not task.succeeded()):
+                    task = self._tasks[key] = PrefetchTask(key)
+                    task.future = self._executor.submit(self._run, task, load)
+                task.owners.add(owner)
+
+    def get(self, key):
+        """Task prefetching key, or None."""
+        with self._lock:
+            return self._tasks.get(key)
+
+    def cancel(self, owner, wait=False):
+        """Give up every key of owner; with wait, return only after the cancelled loads have stopped."""
+        with self._lock:
+            cancelled = self._give_up(owner)
+        if wait:
+            for task in cancelled:
+                try:
+                    task.future.exception()
+                except Exception:
+                    pass
+
+    def stats(self):
+        """{key: 'running' | 'done' | 'failed'} of the prefetches someone still wants."""
+        with self._lock:
+            return {key: 'running' if not task.done() else 'done' if task.succeeded() else 'failed'
+                    for key, task in self._tasks.items()}
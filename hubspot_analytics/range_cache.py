@@ -0,0 +1,158 @@
+"""Range-aware cache of raw search results, stored per fetched date segment.
+
+st.cache_data keys on the exact (start, end) arguments, so widening a range or
+loading the previous period used to fetch everything again. Here each search
+(object, date property, filters) keeps the records of every date segment it has
+fetched; a request works out which parts of its range are not covered yet,
+fetches only those and stitches them together with the cached segments.
+"""
+import contextlib
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+RANGE_CACHE_TTL_SECONDS = 900   # same freshness as the fetch caches
+RANGE_CACHE_MAX_RECORDS = int(os.getenv("HUBSPOT_RANGE_CACHE_MAX_RECORDS", "300000"))
+
+_bypass = contextvars.ContextVar("hubspot_range_cache_bypass", default=False)
+
+@contextlib.contextmanager
+def refetch_ranges():
+    """Within this block every range is fetched again (and the fresh segments replace the cached ones)."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+def subtract_ranges(start_date, end_date, covered):
+    """Parts of [start_date, end_date] not covered by the (start, end) date pairs in covered (all inclusive)."""
+    missing = []
+    cursor = start_date
+    for seg_start, seg_end in sorted(covered):
+        if seg_end < cursor:
+            continue
+        if seg_start > end_date:
+            break
+        if seg_start > cursor:
+            missing.append((cursor, seg_start - timedelta(days=1)))
+        cursor = max(cursor, seg_end + timedelta(days=1))
+        if cursor > end_date:
+            return missing
+    if cursor <= end_date:
+        missing.append((cursor, end_date))
+    return missing
+
+def search_key(api_key, *parts):
+    """Cache key of a search: portal (hashed API key) plus the object and filter description."""
+    return (hashlib.sha256(str(api_key).encode()).hexdigest()[:16],) + tuple(parts)
+
+def property_millis(record, name):
+    """Epoch milliseconds of an ISO date(-time) or millisecond property, or None."""
+    value = (record.get('properties') or {}).get(name)
+    if value in (None, ''):
+        return None
+    value = str(value)
+    if value.isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+    except ValueError:
+        return None
+
+class RangeCache:
+    """Records of each search key cached per date segment, with a TTL and a total record cap.
+
+    Segments are the date chunks actually fetched; only chunks fetched completely are stored,
+    so a failed page never leaves a silently truncated segment behind.
+    """
+
+    def __init__(self, ttl=RANGE_CACHE_TTL_SECONDS, max_records=RANGE_CACHE_MAX_RECORDS):
+        self.ttl = ttl
+        self.max_records = max_records
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        now = time.time()
+        return [seg for seg in self._segments.get(key, []) if now - seg['fetched_at'] <= self.ttl]
+
+    def _fresh(self, key):
+        """Segments of key that may be served (none inside refetch_ranges())."""
+        return [] if _bypass.get() else self._live(key)
+
+    def lookup(self, key, start_date, end_date, in_range):
+        """(cached records, date ranges to fetch) of [start_date, end_date] for key, from one snapshot of its segments.
+
+        Taking both from the same snapshot means a segment stored by another thread meanwhile is
+        either served or fetched again, never counted as covered without its records. Records of
+        a segment that expires or is replaced after the lookup may also come back from the fetch;
+        callers de-duplicate by ID.
+        """
+        with self._lock:
+            segments = self._fresh(key)
+        return (self._records(segments, start_date, end_date, in_range),
+                subtract_ranges(start_date, end_date, [(seg['start'], seg['end']) for seg in segments]))
+
+    def missing(self, key, start_date, end_date):
+        """Date ranges of [start_date, end_date] that have to be fetched for key."""
+        return self.lookup(key, start_date, end_date, lambda record: False)[1]
+
+    def cached_records(self, key, start_date, end_date, in_range):
+        """Records of the cached segments overlapping the range for which in_range(record) is true."""
+        return self.lookup(key, start_date, end_date, in_range)[0]
+
+    @staticmethod
+    def _records(segments, start_date, end_date, in_range):
+        """in_range records of the segments overlapping the range, newest segment first
+        (so callers de-duplicating by ID keep the latest copy)."""
+        overlapping = [seg for seg in segments if seg['start'] <= end_date and seg['end'] >= start_date]
+        overlapping.sort(key=lambda seg: seg['fetched_at'], reverse=True)
+        return [record for seg in overlapping for record in seg['records'] if in_range(record)]
+
+    def add(self, key, start_date, end_date, records):
+        """Store the complete result of fetching [start_date, end_date] for key."""
+        segment = {'start': start_date, 'end': end_date, 'records': list(records), 'fetched_at': time.time()}
+        with self._lock:
+            # Drop expired and overlapping segments of this key; the new fetch supersedes them
+            self._segments[key] = [
+                seg for seg in self._live(key) if seg['end'] < start_date or seg['start'] > end_date
+            ] + [segment]
+            self._evict()
+
+    def _evict(self):
+        """Remove expired segments, then the oldest ones while more than max_records are cached (caller holds _lock)."""
+        self._segments = {key: self._live(key) for key in self._segments}
+        total = sum(len(seg['records']) for segs in self._segments.values() for seg in segs)
+        by_age = sorted((seg['fetched_at'], key, index) for key, segs in self._segments.items()
+                        for index, seg in enumerate(segs))
+        evicted = set()
+        for _, key, index in by_age:
+            if total <= self.max_records:
+                break
+            evicted.add((key, index))
+            total -= len(self._segments[key][index]['records'])
+        self._segments = {
+            key: [seg for index, seg in enumerate(segs) if (key, index) not in evicted]
+            for key, segs in self._segments.items()
+        }
+        self._segments = {key: segs for key, segs in self._segments.items() if segs}
+
+    def clear(self):
+        with self._lock:
+            self._segments.clear()
+
+    def stats(self):
+        """{key: [(start, end, record count), ...]} of the cached segments."""
+        with self._lock:
+            return {key: [(seg['start'], seg['end'], len(seg['records'])) for seg in segs]
+                    for key, segs in self._segments.items()}
+
+_range_cache = RangeCache()
+
+def get_range_cache():
+    """Process-wide range cache used by the HubSpot fetchers."""
+    return _range_cache
@@ -0,0 +1,36 @@
+"""Raw HubSpot record lists that carry a content fingerprint.
+
+Caches keyed on a list of raw records (e.g. st.cache_data on a processor) would
+otherwise hash every nested dict on each call. A RecordSet is fingerprinted once
+when it is fetched, from each record's ID, last-modified stamp and associations,
+and caches key on that instead.
+"""
+import hashlib
+
+def record_fingerprint(records):
+    """Digest of the records' IDs, last-modified stamps and association IDs, in order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for record in records:
+        properties = record.get('properties') or {}
+        stamp = (record.get('updatedAt') or properties.get('hs_lastmodifieddate')
+                 or properties.get('lastmodifieddate') or '')
+        digest.update(f"{record.get('id')}|{stamp}".encode())
+        for name, linked in sorted((record.get('associations') or {}).items()):
+            ids = ",".join(str(item.get('id')) for item in (linked or {}).get('results', []))
+            digest.update(f"|{name}:{ids}".encode())
+        digest.update(b";")
+    return digest.hexdigest()
+
+class RecordSet(list):
+    """List of raw records with the fingerprint computed when it was built.
+
+    Treat it as read-only: changing the records does not update the fingerprint.
+    """
+
+    def __init__(self, records=(), fingerprint=None):
+        super().__init__(records)
+        self.fingerprint = fingerprint or record_fingerprint(self)
+
+def records_hash(records):
+    """Cache hash of a record list: the stored fingerprint of a RecordSet (for st.cache_data hash_funcs)."""
+    return getattr(records, 'fingerprint', None) or record_fingerprint(records)
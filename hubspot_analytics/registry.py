@@ -0,0 +1,180 @@
+"""Process-wide registry of loaded datasets shared by all dashboard sessions."""
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from .fetch_scheduler import BACKGROUND, fetch_priority
+
+# [OK] NEW: One copy of each distinct dataset per server process, however many sessions show it
+DATASET_MAX_AGE_SECONDS = 900   # matches the fetch cache TTL; older datasets are refreshed before reuse
+DATASET_MAX_STALE_SECONDS = 6 * 60 * 60   # older than this, a dataset is reloaded instead of served stale
+
+logger = logging.getLogger("hubspot_analytics")
+
+def dataset_key(date_field, start_date, end_date, deal_start_date, deal_end_date, customer_stage_ids):
+    """Registry key of a pipeline run: date field, both date ranges and the customer stage IDs."""
+    return ('pipeline', date_field, str(start_date), str(end_date), str(deal_start_date), str(deal_end_date),
+            tuple(sorted(str(stage_id) for stage_id in customer_stage_ids)))
+
+def read_only_view(value):
+    """Shallow copy of a frame (or dict / tuple of frames); with copy-on-write any edit stays in the copy.
+
+    Other values (record lists, numbers) are returned as they are and must be treated as read-only.
+    """
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, dict):
+        return {name: read_only_view(item) for name, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(read_only_view(item) for item in value)
+    return value
+
+class DatasetLease:
+    """A session's handle on a registry entry; the entry is released when the lease is released or collected.
+
+    stale is True when the data was served past its max age while a refresh runs in the background.
+    """
+
+    def __init__(self, registry, key, entry, stale=False):
+        self.key = key
+        self.loaded_at = entry['loaded_at']
+        self.stale = stale
+        self.data = read_only_view(entry['data'])
+        self._entry = entry
+        self._finalizer = weakref.finalize(self, registry._release, key, entry)
+
+    def age(self):
+        """Seconds since the data was loaded."""
+        return time.time() - self.loaded_at
+
+    def release(self):
+        self._finalizer()
+
+class DatasetRegistry:
+    """Reference-counted datasets keyed by dataset_key(); sessions hold DatasetLease objects.
+
+    Sessions store the lease in st.session_state, so a closed session releases it when
+    it is garbage collected. Concurrent requests for the same key load it once.
+
+    Stale-while-revalidate: past max_age (and up to max_stale) a dataset is still leased
+    at once, flagged stale, while one background reload per key replaces it; newer()
+    tells a session when to swap. A dataset nobody leases is kept until it is older
+    than max_stale, as the last good copy to serve.
+    """
+
+    def __init__(self, max_age=DATASET_MAX_AGE_SECONDS, max_stale=DATASET_MAX_STALE_SECONDS):
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._revalidating = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dataset-revalidate")
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _is_fresh(self, entry):
+        max_age = entry.get('max_age', self.max_age)
+        return max_age is None or time.time() - entry['loaded_at'] <= max_age
+
+    def _prune(self):
+        """Drop unleased datasets too old to serve even stale (caller holds _lock)."""
+        now = time.time()
+        for key, entry in list(self._entries.items()):
+            if entry['refs'] <= 0 and now - entry['loaded_at'] > self.max_stale:
+                del self._entries[key]
+
+    def _register(self, key, data, max_age=None, refs=1):
+        entry = {'data': data, 'loaded_at': time.time(), 'refs': refs}
+        if max_age is not None:
+            entry['max_age'] = max_age
+        with self._lock:
+            # A replaced entry for the same key stays alive for its remaining leases
+            self._entries[key] = entry
+            self._prune()
+        return entry
+
+    def acquire(self, key, load=None):
+        """Lease the dataset for key, calling load() to build it when no usable copy is registered.
+
+        load returns a dict of frames/values (or None for "no data", which is not registered
+        and makes acquire return None). Without load, only a fresh registered dataset is leased.
+        With load, a stale one is leased at once and reloaded in the background.
+        """
+        with self._key_lock(key):
+            with self._lock:
+                self._prune()
+                entry = self._entries.get(key)
+                if entry is not None and self._is_fresh(entry):
+                    entry['refs'] += 1
+                    return DatasetLease(self, key, entry)
+                if entry is not None and load is not None:
+                    entry['refs'] += 1
+                    if key not in self._revalidating:
+                        self._revalidating.add(key)
+                        self._executor.submit(self._revalidate, key, load)
+                    return DatasetLease(self, key, entry, stale=True)
+            if load is None:
+                return None
+            data = load()
+            if data is None:
+                return None
+            return DatasetLease(self, key, self._register(key, data))
+
+    def _revalidate(self, key, load):
+        try:
+            # The stale copy is already being served, so the reload only uses leftover HubSpot quota
+            with fetch_priority(BACKGROUND):
+                data = load()
+            if data is not None:
+                with self._key_lock(key):
+                    self._register(key, data, refs=0)
+        except Exception:
+            logger.exception("Background reload of %s failed", key)
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def newer(self, lease):
+        """A newer dataset for lease.key has been registered since the lease was taken."""
+        with self._lock:
+            entry = self._entries.get(lease.key)
+            return entry is not None and entry is not lease._entry and entry['loaded_at'] > lease.loaded_at
+
+    def revalidating(self, key):
+        """A background reload of key is running."""
+        with self._lock:
+            return key in self._revalidating
+
+    def publish(self, key, data, max_age=None):
+        """Register freshly built data for key (replacing any older copy) and return the publisher's lease.
+
+        max_age overrides the registry default for this entry, e.g. for data a scheduler keeps refreshing.
+        """
+        with self._key_lock(key):
+            return DatasetLease(self, key, self._register(key, data, max_age))
+
+    def _release(self, key, entry):
+        with self._lock:
+            entry['refs'] -= 1
+            # The last copy of a key stays registered (see _prune); replaced ones go with their last lease
+            self._prune()
+
+    def invalidate(self, key=None):
+        """Stop handing out key (or every dataset); existing leases keep their data."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """{key: number of leases} for the registered datasets."""
+        with self._lock:
+            return {key: entry['refs'] for key, entry in self._entries.items()}
@@ -0,0 +1,114 @@
+"""Status reporting for the data pipeline.
+
+Pipeline code calls get_reporter() instead of a UI library; the dashboard installs
+a Streamlit reporter, everything else logs.
+"""
+import contextvars
+import logging
+import threading
+
+class _LogProgress:
+    """Progress handle that logs the status line whenever it changes."""
+
+    def __init__(self, logger):
+        self._logger = logger
+        self._last_text = None
+
+    def update(self, fraction, text=None):
+        if text and text != self._last_text:
+            self._logger.info("%s (%d%%)", text, round(fraction * 100))
+            self._last_text = text
+
+class ConsoleReporter:
+    """Sends pipeline messages to the logging module (used by the headless CLI)."""
+
+    def __init__(self, logger_name="hubspot_dashboard"):
+        self._logger = logging.getLogger(logger_name)
+
+    def error(self, message):
+        self._logger.error(message)
+
+    def warning(self, message):
+        self._logger.warning(message)
+
+    def success(self, message):
+        self._logger.info(message)
+
+    def info(self, message):
+        self._logger.info(message)
+
+    def progress(self):
+        return _LogProgress(self._logger)
+
+    def partial_contacts(self, df_contacts, chunks_done, chunks_total):
+        self._logger.info("Loaded %d of %d contact chunks (%d contacts)", chunks_done, chunks_total, len(df_contacts))
+
+# [OK] NEW: Reporter for pipeline runs on a worker thread, polled by the UI thread
+class _BufferedProgress:
+    """Progress handle that keeps the latest status line on its BufferedReporter."""
+
+    def __init__(self, reporter):
+        self._reporter = reporter
+
+    def update(self, fraction, text=None):
+        if text:
+            self._reporter._set(status=text)
+
+class BufferedReporter:
+    """Collects messages and partial results thread-safely until the UI thread picks them up.
+
+    A UI framework that can only draw from its own thread runs the pipeline on a worker
+    with this reporter installed, and calls drain() / snapshot() while waiting for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._messages = []
+        self._state = {'status': None, 'contacts': None, 'chunks_done': 0, 'chunks_total': 0, 'version': 0}
+
+    def _add(self, kind, message):
+        with self._lock:
+            self._messages.append((kind, message))
+
+    def _set(self, **changes):
+        with self._lock:
+            self._state.update(changes, version=self._state['version'] + 1)
+
+    def error(self, message):
+        self._add('error', message)
+
+    def warning(self, message):
+        self._add('warning', message)
+
+    def success(self, message):
+        self._add('success', message)
+
+    def info(self, message):
+        self._add('info', message)
+
+    def progress(self):
+        return _BufferedProgress(self)
+
+    def partial_contacts(self, df_contacts, chunks_done, chunks_total):
+        self._set(contacts=df_contacts, chunks_done=chunks_done, chunks_total=chunks_total)
+
+    def drain(self):
+        """[(kind, message), ...] reported since the last drain; kind is error/warning/success/info."""
+        with self._lock:
+            messages, self._messages = self._messages, []
+        return messages
+
+    def snapshot(self):
+        """Latest status line, partial contacts and chunk counts; version changes with every update."""
+        with self._lock:
+            return dict(self._state)
+
+_active_reporter = contextvars.ContextVar("hubspot_reporter", default=ConsoleReporter())
+
+def get_reporter():
+    """Reporter the pipeline functions should send status messages to."""
+    return _active_reporter.get()
+
+def set_reporter(reporter):
+    """Route pipeline status messages to reporter (in the current context)."""
+    _active_reporter.set(reporter)
@@ -0,0 +1,150 @@
+"""Business rules (exclusions, customer-status and course-group keywords) compiled into matchers.
+
+Each keyword list is compiled into one regular expression, so a value is checked
+against all keywords in a single scan instead of one `in` test per keyword, and
+a whole column is checked with one Series.str.contains() call.
+The defaults come from config.py; a JSON file named by HUBSPOT_RULES_FILE can
+override any of them:
+
+    {"excluded_owners": ["..."], "excluded_deal_keywords": ["vacation batch"],
+     "customer_status_keywords": ["won", "..."], "course_groups": {"oet": "OET", "german": "German"}}
+
+get_rules() re-reads the file when it changes, so edits apply without a restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .config import (COURSE_GROUP_KEYWORDS, CUSTOMER_KEYWORDS_BLOCKLIST, EXCLUDED_DEAL_KEYWORDS, EXCLUDED_OWNERS,
+                     get_env_rules_file)
+
+logger = logging.getLogger("hubspot_analytics")
+
+def compile_keywords(keywords):
+    """Regex matching any of keywords (longest first at each position), or None for no keywords."""
+    keywords = sorted({keyword for keyword in keywords if keyword}, key=len, reverse=True)
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+class RuleSet:
+    """One compiled version of the rules; immutable, so callers may keep it for a whole run."""
+
+    def __init__(self, excluded_owners=EXCLUDED_OWNERS, excluded_deal_keywords=EXCLUDED_DEAL_KEYWORDS,
+                 customer_status_keywords=CUSTOMER_KEYWORDS_BLOCKLIST, course_groups=COURSE_GROUP_KEYWORDS):
+        self.excluded_owners = frozenset(excluded_owners)
+        self.excluded_deal_keywords = [str(keyword).lower() for keyword in excluded_deal_keywords]
+        self.customer_status_keywords = [str(keyword).lower() for keyword in customer_status_keywords]
+        self.course_groups = {str(keyword).lower(): group for keyword, group in dict(course_groups).items()}
+        self.deal_pattern = compile_keywords(self.excluded_deal_keywords)
+        self.customer_pattern = compile_keywords(self.customer_status_keywords)
+        # Lookahead finds the longest course keyword starting at every position, overlapping ones included
+        course_pattern = compile_keywords(self.course_groups)
+        self._course_pattern = re.compile(f"(?=({course_pattern.pattern}))") if course_pattern else None
+        # A keyword found implies every shorter keyword inside it; keep the highest-priority group of those
+        priority = {keyword: rank for rank, keyword in enumerate(self.course_groups)}
+        self._course_rank = {keyword: min(priority[other] for other in self.course_groups if other in keyword)
+                             for keyword in self.course_groups}
+        self._course_names = list(self.course_groups.values())
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [sorted(self.excluded_owners), self.excluded_deal_keywords, self.customer_status_keywords,
+             list(self.course_groups.items())]).encode()).hexdigest()[:16]
+
+    @classmethod
+    def from_dict(cls, rules):
+        """RuleSet of the defaults overridden by the keys of rules; raises ValueError on a malformed value."""
+        if not isinstance(rules, dict):
+            raise ValueError("rules must be a JSON object")
+        for name in ('excluded_owners', 'excluded_deal_keywords', 'customer_status_keywords'):
+            if name in rules and not (isinstance(rules[name], list) and all(isinstance(v, str) for v in rules[name])):
+                raise ValueError(f"{name} must be a list of strings")
+        course_groups = rules.get('course_groups', COURSE_GROUP_KEYWORDS)
+        if not (isinstance(course_groups, dict) and all(isinstance(v, str) for v in course_groups.values())):
+            raise ValueError("course_groups must map keywords to group names")
+        return cls(rules.get('excluded_owners', EXCLUDED_OWNERS),
+                   rules.get('excluded_deal_keywords', EXCLUDED_DEAL_KEYWORDS),
+                   rules.get('customer_status_keywords', CUSTOMER_KEYWORDS_BLOCKLIST), course_groups)
+
+    def excludes_owner(self, owner_name):
+        return owner_name in self.excluded_owners
+
+    def excludes_deal(self, text):
+        """Whether lowercased text (a deal name or course) contains an excluded keyword."""
+        return self.deal_pattern is not None and self.deal_pattern.search(text) is not None
+
+    def is_customer_status(self, status):
+        """Whether a lowercased lead status contains a customer keyword."""
+        return self.customer_pattern is not None and self.customer_pattern.search(status) is not None
+
+    def excluded_owner_mask(self, owner_names):
+        """Boolean array: which of owner_names are excluded owners."""
+        return pd.Series(owner_names, dtype=object).isin(self.excluded_owners).to_numpy(dtype=bool)
+
+    def excluded_deal_mask(self, texts):
+        """Boolean array: which lowercased texts (deal names or courses) contain an excluded keyword."""
+        return _contains(self.deal_pattern, texts)
+
+    def customer_status_mask(self, statuses):
+        """Boolean array: which lowercased lead statuses contain a customer keyword."""
+        return _contains(self.customer_pattern, statuses)
+
+    def course_group(self, course):
+        """Group of the first course_groups keyword found in course, else course itself."""
+        if self._course_pattern is None:
+            return course
+        ranks = [self._course_rank[match] for match in self._course_pattern.findall(str(course).lower())]
+        return self._course_names[min(ranks)] if ranks else course
+
+    def group_courses(self, courses):
+        """course_group() of every value of the courses Series, classifying each distinct value once."""
+        groups = {course: self.course_group(course) for course in pd.unique(courses)}
+        return courses.map(groups)
+
+def _contains(pattern, values):
+    """pattern.search() over the values as one Series.str.contains() call; False for non-strings."""
+    values = pd.Series(values, dtype=object)
+    if pattern is None or values.empty:
+        return np.zeros(len(values), dtype=bool)
+    return values.str.contains(pattern, na=False).to_numpy(dtype=bool)
+
+def load_rules(path):
+    """RuleSet from the JSON file at path; raises OSError or ValueError."""
+    with open(path, encoding="utf-8") as f:
+        return RuleSet.from_dict(json.load(f))
+
+_rules = RuleSet()
+_rules_source = (None, None)
+_rules_lock = threading.Lock()
+
+def get_rules():
+    """Current RuleSet, re-read first if HUBSPOT_RULES_FILE was set, changed or removed since the last call.
+
+    A file that cannot be read or parsed is logged and the previous rules stay in force.
+    """
+    global _rules, _rules_source
+    path = get_env_rules_file()
+    try:
+        source = (path, os.stat(path).st_mtime_ns if path else None)
+    except OSError:
+        source = (path, None)
+    if source == _rules_source:
+        return _rules
+    with _rules_lock:
+        if source != _rules_source:
+            try:
+                _rules = load_rules(path) if source[1] is not None else RuleSet()
+            except (OSError, ValueError):
+                logger.exception("Could not load business rules from %s; keeping the previous rules", path)
+            else:
+                if path and source[1] is None:
+                    logger.warning("Business rules file %s not found; using the built-in rules", path)
+                elif path:
+                    logger.info("Loaded business rules from %s (%s)", path, _rules.fingerprint)
+            _rules_source = source
+        return _rules
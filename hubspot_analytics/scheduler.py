@@ -0,0 +1,97 @@
+"""Background refresh of the current month's dashboard dataset."""
+import logging
+import os
+import threading
+from datetime import datetime
+
+from .config import IST
+from .fetch_scheduler import BACKGROUND, fetch_priority
+from .hubspot import detect_admission_confirmed_stage, fetch_deal_pipeline_stages
+from .pipeline import run_dashboard_pipeline
+from .range_cache import refetch_ranges
+from .registry import dataset_key
+
+# [OK] NEW: Keep the current month warm so sessions open on ready data
+REFRESH_INTERVAL_SECONDS = int(os.getenv("HUBSPOT_REFRESH_INTERVAL", "600"))  # 0 disables the scheduler
+
+logger = logging.getLogger("hubspot_analytics")
+
+def current_month_range(today=None):
+    """First day of this month (IST) to today."""
+    today = today or datetime.now(IST).date()
+    return today.replace(day=1), today
+
+class RefreshScheduler:
+    """Re-runs the dashboard pipeline for the current month every interval seconds on a daemon thread.
+
+    Each run fetches contacts, deals, partial-payment deals, team performance deals and
+    owners from HubSpot and publishes the result with its metrics in a DatasetRegistry,
+    replacing the previous run. Sessions pick it up with registry.acquire(scheduler.current['key']).
+    """
+
+    def __init__(self, registry, api_key, interval=REFRESH_INTERVAL_SECONDS, date_field="Created Date", steps=None):
+        self.registry = registry
+        self.api_key = api_key
+        self.interval = interval
+        self.date_field = date_field
+        self.steps = steps
+        self.current = None      # key, date_field, date ranges and as_of of the published dataset
+        self.last_error = None
+        self._lease = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="hubspot-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Scheduled refresh failed")
+            self._stop.wait(self.interval)
+
+    def refresh_once(self):
+        """Fetch and publish the current month now; returns the published key (None if no contacts)."""
+        # Scheduled runs only use HubSpot quota that sessions leave over
+        with fetch_priority(BACKGROUND):
+            deal_stages = fetch_deal_pipeline_stages(self.api_key)
+        customer_stage_ids = [stage['stage_id'] for stage in detect_admission_confirmed_stage(deal_stages or {})]
+        if not customer_stage_ids:
+            raise RuntimeError("No customer deal stages auto-detected")
+
+        start_date, end_date = current_month_range()
+        # Runs come more often than the range cache expires, so always search HubSpot again
+        with fetch_priority(BACKGROUND), refetch_ranges():
+            result = run_dashboard_pipeline(
+                self.api_key, self.date_field, start_date, end_date, start_date, end_date,
+                customer_stage_ids, deal_stages, steps=self.steps
+            )
+        if result is None:
+            return None
+
+        key = dataset_key(self.date_field, start_date, end_date, start_date, end_date, customer_stage_ids)
+        # Twice the interval, so one slow or failed run does not make the data unavailable
+        lease = self.registry.publish(key, result, max_age=2 * self.interval)
+        previous, self._lease = self._lease, lease
+        self.current = {
+            'key': key,
+            'date_field': self.date_field,
+            'date_range': (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+            'deal_date_range': (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+            'as_of': datetime.fromtimestamp(lease.loaded_at, IST),
+        }
+        if previous is not None:
+            previous.release()
+        logger.info("Scheduled refresh published %d contacts, %d deals for %s to %s",
+                    result['contacts_count'], result['deals_count'], start_date, end_date)
+        return key
@@ -0,0 +1,257 @@
+"""Dashboard metric tables computed with SQL in an embedded DuckDB over Parquet snapshots.
+
+DuckDB scans the snapshot files and only the grouped results (one row per course,
+owner, status or campaign) are turned into pandas frames, so memory is bounded by
+the number of groups rather than the number of contacts. The grouped rows go
+through the same finishing functions as the pandas builders in metrics.py, so the
+tables have the same columns, dtypes and ordering.
+
+Several snapshot runs can be queried together (e.g. one per month for multi-year
+analysis); a contact or deal present in more than one run is taken from the
+newest run. DuckDB is optional - DUCKDB_AVAILABLE is False when it is not installed.
+"""
+import json
+import os
+
+import pandas as pd
+
+from .metrics import (campaign_performance_table, course_grouped_performance_table, course_lead_table,
+                      course_performance_table, course_revenue_table, lead_status_table, owner_lead_table,
+                      owner_performance_table, volume_conversion_table)
+from .processing import group_team_performance_metrics
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+DUCKDB_AVAILABLE = duckdb is not None
+
+# Snapshot table -> key column used to de-duplicate rows across runs
+SNAPSHOT_VIEWS = {'contacts': ('contacts_df', 'ID'), 'customers': ('customers_df', 'Customer ID')}
+
+def _quote(value):
+    """SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _ident(name):
+    """SQL identifier (column names contain spaces and slashes)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _snapshot_files(run_dirs, table):
+    """Parquet files of one snapshot table, oldest run first."""
+    runs = []
+    for run_dir in run_dirs:
+        with open(os.path.join(run_dir, "snapshot.json")) as f:
+            manifest = json.load(f)
+        if table in manifest['tables']:
+            runs.append((manifest.get('generated_at', ''), os.path.join(run_dir, manifest['tables'][table])))
+    return [path for _, path in sorted(runs)]
+
+class SnapshotMetrics:
+    """Metric builders that run as DuckDB SQL over one or more snapshot run folders.
+
+    filters / customer_filters map contact / customer columns to allowed values (like the
+    dashboard's sidebar filters); empty value lists are ignored. memory_limit (e.g. '2GB')
+    caps DuckDB's own memory; beyond it DuckDB spills to temp files.
+    """
+
+    def __init__(self, run_dirs, filters=None, customer_filters=None, memory_limit=None):
+        if duckdb is None:
+            raise RuntimeError("DuckDB is not installed (pip install duckdb)")
+        self.run_dirs = [run_dirs] if isinstance(run_dirs, str) else list(run_dirs)
+        self.con = duckdb.connect()
+        memory_limit = memory_limit or os.getenv("HUBSPOT_DUCKDB_MEMORY_LIMIT")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = {_quote(memory_limit)}")
+
+        self.columns = {}
+        view_filters = {'contacts': filters, 'customers': customer_filters}
+        for view, (table, key) in SNAPSHOT_VIEWS.items():
+            self._create_view(view, _snapshot_files(self.run_dirs, table), key, view_filters[view])
+
+    def _create_view(self, view, files, key, filters):
+        if not files:
+            self.columns[view] = []
+            return
+        if len(files) == 1:
+            source = f"SELECT * FROM read_parquet({_quote(files[0])})"
+        else:
+            # Newest run wins for records present in several runs
+            runs = " UNION ALL BY NAME ".join(
+                f"SELECT *, {rank} AS _run FROM read_parquet({_quote(path)})" for rank, path in enumerate(files)
+            )
+            source = (f"SELECT * EXCLUDE (_run) FROM ({runs}) "
+                      f"QUALIFY row_number() OVER (PARTITION BY {_ident(key)} ORDER BY _run DESC) = 1")
+
+        conditions = [
+            f"{_ident(column)} IN ({', '.join(_quote(v) for v in values)})"
+            for column, values in (filters or {}).items() if values
+        ]
+        if conditions:
+            source = f"SELECT * FROM ({source}) WHERE {' AND '.join(conditions)}"
+
+        self.con.execute(f"CREATE VIEW {view} AS {source}")
+        self.columns[view] = [row[0] for row in self.con.execute(f"DESCRIBE {view}").fetchall()]
+
+    def query(self, sql):
+        """Run sql on a fresh cursor (safe to call from several threads) and return a DataFrame."""
+        return self.con.cursor().execute(sql).df()
+
+    def _has(self, view, *columns):
+        return all(column in self.columns[view] for column in columns)
+
+    def _lead_pivots(self, key_sql, key_name, where):
+        counts = self.query(f"""
+            SELECT {key_sql} AS {_ident(key_name)}, "Lead Status", count("ID") AS n
+            FROM contacts WHERE {where} AND "Lead Status" IS NOT NULL
+            GROUP BY ALL
+        """)
+        if counts.empty:
+            return None, None
+        pivot_counts = counts.pivot_table(index=key_name, columns='Lead Status', values='n', aggfunc='sum', fill_value=0)
+        pivot_amounts = self.query(f"""
+            SELECT {key_sql} AS {_ident(key_name)}, coalesce(sum("Amount"), 0) AS "Amount"
+            FROM contacts WHERE {where} AND "Lead Status" = 'Qualified Lead'
+            GROUP BY ALL ORDER BY 1
+        """).set_index(key_name)
+        return pivot_counts, pivot_amounts
+
+    def create_metric_1(self):
+        """METRIC 1: Course x Lead Status"""
+        if not self._has('contacts', 'Course/Program'):
+            return pd.DataFrame()
+        pivot_counts, pivot_amounts = self._lead_pivots(
+            'trim("Course/Program")', 'Course_Clean', "\"Course/Program\" IS NOT NULL AND \"Course/Program\" <> ''"
+        )
+        return pd.DataFrame() if pivot_counts is None else course_lead_table(pivot_counts, pivot_amounts)
+
+    def create_metric_2(self):
+        """METRIC 2: Course Owner x Lead Status"""
+        if not self._has('contacts', 'Course Owner'):
+            return pd.DataFrame()
+        pivot_counts, pivot_amounts = self._lead_pivots(
+            '"Course Owner"', 'Course Owner', "\"Course Owner\" IS NOT NULL AND \"Course Owner\" <> ''"
+        )
+        return pd.DataFrame() if pivot_counts is None else owner_lead_table(pivot_counts, pivot_amounts)
+
+    def _customers_by(self, key, aggregates):
+        if not self._has('customers', key, 'Is Customer', 'Amount'):
+            return pd.DataFrame(columns=[key, 'Customer_Count', 'Customer_Revenue'])
+        return self.query(f"""
+            SELECT {_ident(key)}, {aggregates}
+            FROM customers WHERE {_ident(key)} IS NOT NULL
+            GROUP BY ALL ORDER BY 1
+        """)
+
+    def create_metric_4(self):
+        """METRIC 4: Course Owner Performance SUMMARY"""
+        owner_lead_pivot = self.create_metric_2()
+        if owner_lead_pivot.empty:
+            return pd.DataFrame()
+        customer_by_owner = self._customers_by('Course Owner', """
+            sum("Is Customer"::INTEGER)::BIGINT AS Customer_Count,
+            sum("Amount") AS Customer_Revenue,
+            sum("Was_Hot"::INTEGER)::BIGINT AS Hot_Customer,
+            sum("Was_Warm"::INTEGER)::BIGINT AS Warm_Customer,
+            sum("Was_Cold"::INTEGER)::BIGINT AS Cold_Customer
+        """)
+        return owner_performance_table(owner_lead_pivot, customer_by_owner)
+
+    def create_metric_5(self):
+        """METRIC 5: Course Performance KPI Table"""
+        course_lead_pivot = self.create_metric_1()
+        if course_lead_pivot.empty:
+            return pd.DataFrame()
+        customer_by_course = self._customers_by('Course/Program', """
+            sum("Is Customer"::INTEGER)::BIGINT AS Customer_Count,
+            sum("Amount") AS Customer_Revenue
+        """)
+        return course_performance_table(course_lead_pivot, customer_by_course)
+
+    def create_metric_6(self):
+        """METRIC 6: Lead Status Count Breakdown"""
+        if not self._has('contacts', 'Lead Status'):
+            return pd.DataFrame()
+        total_leads = self.con.cursor().execute("SELECT count(*) FROM contacts").fetchone()[0]
+        if not total_leads:
+            return pd.DataFrame()
+        status_counts = self.query("""
+            SELECT "Lead Status", count(*) AS "Count"
+            FROM contacts WHERE "Lead Status" IS NOT NULL
+            GROUP BY ALL ORDER BY "Count" DESC, "Lead Status"
+        """)
+        return lead_status_table(status_counts, total_leads)
+
+    def create_course_revenue(self):
+        """Revenue by course from customer data."""
+        if not self._has('customers', 'Course/Program', 'Amount', 'Is Customer'):
+            return pd.DataFrame()
+        revenue_df = self.query("""
+            SELECT trim("Course/Program") AS "Course",
+                   sum("Is Customer"::INTEGER)::BIGINT AS "Customers",
+                   sum("Amount") AS "Revenue"
+            FROM customers WHERE "Course/Program" IS NOT NULL AND "Course/Program" <> ''
+            GROUP BY ALL ORDER BY 1
+        """)
+        return pd.DataFrame() if revenue_df.empty else course_revenue_table(revenue_df)
+
+    def create_volume_conversion_matrix(self, metric_1=None):
+        """Volume x conversion classification of the METRIC 1 courses."""
+        metric_1 = self.create_metric_1() if metric_1 is None else metric_1
+        if metric_1.empty or 'Total' not in metric_1.columns:
+            return pd.DataFrame()
+        customer_by_course = {}
+        if self._has('customers', 'Course/Program'):
+            customer_by_course = dict(self.con.cursor().execute("""
+                SELECT trim("Course/Program"), count(*)
+                FROM customers WHERE "Course/Program" IS NOT NULL AND "Course/Program" <> ''
+                GROUP BY ALL
+            """).fetchall())
+        return volume_conversion_table(metric_1, customer_by_course)
+
+    def create_campaign_performance(self):
+        """Leads and converted customers per Campaign."""
+        if not self._has('contacts', 'Campaign', 'Lead Status Raw', 'Lead Status'):
+            return pd.DataFrame()
+        camp_grouped = self.query("""
+            SELECT "Campaign",
+                   count("ID") AS Total_Leads,
+                   (count_if(lower("Lead Status Raw") = 'customer')
+                    + count_if("Lead Status" IN ('Customer', 'customer')))::BIGINT AS Customers
+            FROM contacts WHERE "Campaign" IS NOT NULL
+            GROUP BY ALL ORDER BY 1
+        """)
+        return campaign_performance_table(camp_grouped)
+
+    def create_course_grouped_performance(self):
+        """Leads, cold leads and converted customers per Course Grouped."""
+        if not self._has('contacts', 'Course Grouped', 'Lead Status Raw', 'Lead Status'):
+            return pd.DataFrame()
+        course_grouped = self.query("""
+            SELECT "Course Grouped",
+                   count("ID") AS Total_Leads,
+                   count_if(lower("Lead Status Raw") IN ('neutral prospect', 'cold', 'neutral_prospect'))::BIGINT AS Cold_Leads,
+                   (count_if(lower("Lead Status Raw") = 'customer')
+                    + count_if("Lead Status" IN ('Customer', 'customer')))::BIGINT AS Customers
+            FROM contacts WHERE "Course Grouped" IS NOT NULL
+            GROUP BY ALL ORDER BY 1
+        """)
+        return course_grouped_performance_table(course_grouped)
+
+    def dashboard_metrics(self, team_performance_df=None):
+        """Same dict as pipeline.compute_dashboard_metrics, computed over the snapshot files."""
+        metric_1 = self.create_metric_1()
+        metrics = {
+            'metric_1': metric_1,
+            'metric_2': self.create_metric_2(),
+            'metric_4': self.create_metric_4(),
+            'metric_5': self.create_metric_5(),
+            'metric_6': self.create_metric_6(),
+            'metric_7': group_team_performance_metrics(team_performance_df) if team_performance_df is not None else {}
+        }
+        return {
+            'metrics': metrics,
+            'revenue_data': self.create_course_revenue(),
+            'matrix_data': self.create_volume_conversion_matrix(metric_1),
+        }
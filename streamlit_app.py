@@ -1,19 +1,41 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta, date
-import pytz
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 import json
-import io
 import numpy as np
-from collections import Counter
-import re
-import xlsxwriter
-from io import BytesIO
+from collections import OrderedDict
+import functools
+import hashlib
+import threading
+import os
+
+from hubspot_analytics import hubspot, parallel, streaming
+from hubspot_analytics.config import IST, DEFAULT_EXPORT_DIR, DEFAULT_SNAPSHOT_DIR, get_env_api_key
+from hubspot_analytics.details import get_detail_cache, hydrate_contact_details
+from hubspot_analytics.excel_report import write_excel_report
+from hubspot_analytics.exports import (COLUMNAR_EXPORT_FORMATS, collect_export_frames, find_latest_snapshot,
+                                       load_pipeline_snapshot, write_columnar_export)
+from hubspot_analytics.fetch_scheduler import SECONDARY, check_cancelled, fetch_priority
+from hubspot_analytics.hubspot import FetchIncomplete, detect_admission_confirmed_stage, test_hubspot_connection
+from hubspot_analytics.jobs import ReportJobManager
+from hubspot_analytics.metrics import (calculate_kpis, calculate_previous_period, create_campaign_performance,
+                                       create_comparison_data, create_course_grouped_performance, create_course_revenue,
+                                       create_crm_owner_breakdown, create_metric_1, create_metric_2, create_metric_4,
+                                       create_metric_5, create_metric_6, create_qualified_lead_drilldown,
+                                       create_volume_conversion_matrix, get_detailed_team_data_temp_logic, get_this_month_lead_performance)
+from hubspot_analytics.owners import get_owner_dimension
+from hubspot_analytics.pipeline import PIPELINE_STATE_KEYS, compute_dashboard_metrics, run_dashboard_pipeline
+from hubspot_analytics.prefetch import PREFETCH_PERIODS, PrefetchOwner, Prefetcher
+from hubspot_analytics.processing import group_team_performance_metrics
+from hubspot_analytics.range_cache import get_range_cache
+from hubspot_analytics.records import RecordSet, records_hash
+from hubspot_analytics.registry import DatasetRegistry, dataset_key, read_only_view
+from hubspot_analytics.reporting import BufferedReporter, set_reporter
+from hubspot_analytics.rules import get_rules
+from hubspot_analytics.scheduler import REFRESH_INTERVAL_SECONDS, RefreshScheduler
+from hubspot_analytics.sql_metrics import DUCKDB_AVAILABLE, SnapshotMetrics
 
 # Set page config
 st.set_page_config(
@@ -28,35 +50,13 @@ MAX_LABEL_LENGTH = 25  # Truncate long labels
 CHART_HEIGHT = 420
 COLOR_PALETTE = px.colors.qualitative.Set2
 
-# Excluded Course Owners
-EXCLUDED_OWNERS = [
-    "Mahalekshmi M J",
-    "Sreeja Anoop",
-    "arya.krishnan",
-    "Devi Krishna",
-    "Aneesha S",
-    "Sonia William",
-    "recruitment",
-    "Rekha Raveendran",
-    "Aswathy Krishnan",
-    "Chandana Sekhar",
-    "nandhana.sivakumar"
-]
-
-# Excluded Deal Name Keywords - deals containing these terms are FULLY excluded from ALL counts and revenue
-EXCLUDED_DEAL_KEYWORDS = [
-    "vacation batch",
-    "vacation_batch",
-]
+# Figure cache limits (shared by all sessions in this server process)
+FIGURE_CACHE_MAX_ENTRIES = 128
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # estimated from trace data sizes, not Python object size
 
 # Will be populated dynamically
 CUSTOMER_DEAL_STAGES = []  # Will contain stage IDs, not labels
 
-# [OK] NEW: Partial Payment Stage IDs
-PARTIAL_ONLINE_STAGE_ID = "2107527928"    # Online partial payment stage
-PARTIAL_OFFLINE_STAGE_ID = "2171957962"   # Offline partial payment stage
-PARTIAL_STAGE_IDS = [PARTIAL_ONLINE_STAGE_ID, PARTIAL_OFFLINE_STAGE_ID]
-
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -551,13 +551,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Constants
-HUBSPOT_API_BASE = "https://api.hubapi.com"
-IST = pytz.timezone('Asia/Kolkata')
-
 # [OK] SECURITY: Load API key from Streamlit secrets
 def get_api_key():
-    """Safely load API key from Streamlit secrets"""
+    """Safely load API key from Streamlit secrets, falling back to the environment"""
     try:
         if "hubspot" in st.secrets and "api_key" in st.secrets["hubspot"]:
             api_key = st.secrets["hubspot"]["api_key"]
@@ -568,67 +564,119 @@ def get_api_key():
             api_key = st.secrets["HUBSPOT_API_KEY"]
             if api_key and api_key.startswith("pat-"):
                 return api_key
-        
-        import os
-        api_key = os.getenv("HUBSPOT_API_KEY")
-        if api_key and api_key.startswith("pat-"):
-            return api_key
-        
+    except Exception:
+        # No secrets.toml (e.g. headless runs) - use the environment
+        pass
+    
+    return get_env_api_key()
+
+# [OK] NEW: Output directories for exports and precomputed snapshots
+def _get_setting(secret_key, env_key, default):
+    """Read a setting from st.secrets["hubspot"], top-level st.secrets or the environment."""
+    try:
+        if "hubspot" in st.secrets and secret_key in st.secrets["hubspot"]:
+            return st.secrets["hubspot"][secret_key]
+        if env_key in st.secrets:
+            return st.secrets[env_key]
+    except Exception:
+        pass
+    return os.getenv(env_key) or default
+
+def get_export_dir():
+    """Directory where Parquet/Arrow exports are written."""
+    return _get_setting("export_dir", "HUBSPOT_EXPORT_DIR", DEFAULT_EXPORT_DIR)
+
+def get_snapshot_dir():
+    """Directory the headless batch run writes precomputed snapshots to."""
+    return _get_setting("snapshot_dir", "HUBSPOT_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+
+# [OK] NEW: Optional DuckDB query engine for data loaded from a snapshot
+def get_snapshot_metrics(filters=None, customer_filters=None):
+    """SnapshotMetrics over the loaded snapshot when query_engine is "duckdb", else None (use pandas)."""
+    run_dir = st.session_state.get('snapshot_run_dir')
+    if not run_dir or not DUCKDB_AVAILABLE:
         return None
-        
-    except Exception as e:
-        st.error(f"Error loading API key: {str(e)}")
+    if str(_get_setting("query_engine", "HUBSPOT_QUERY_ENGINE", "pandas")).lower() != "duckdb":
         return None
+    return SnapshotMetrics(run_dir, filters=filters, customer_filters=customer_filters)
 
-# [OK] CRITICAL FIX: Lead Status Mapping - ABSOLUTELY NO CUSTOMER HERE!
-LEAD_STATUS_MAP = {
-    "cold": "Cold",
-    "warm": "Warm", 
-    "hot": "Hot",
-    "new": "New Lead",
-    "open": "New Lead",
-    "neutral_prospect": "Cold",
-    "prospect": "Warm",  
-    "hot_prospect": "Hot",
-    "not_connected": "Not Connected",
-    "not_interested": "Not Interested", 
-    "unqualified": "Not Qualified",
-    "not_qualified": "Not Qualified",
-    "duplicate": "Duplicate",
-    "junk": "Duplicate",
-    "": "Unknown",
-    None: "Unknown",
-    "unknown": "Unknown",
-    "other": "Unknown",
-    "qualified_lead": "Not Qualified",
-    "upselling": "Upselling",
-    "course_shifting": "Course Shifting",
-    "not connected (nc)": "Not Connected (NC)",
-    "not connected (nc)": "Not Connected (NC)",
-    "closed lost": "Closed Lost",
-    "closed_lost": "Closed Lost"
-}
+# [OK] NEW: Status reporting for the data pipeline (Streamlit UI or headless console)
+class _StreamlitProgress:
+    """Progress bar plus status line rendered with Streamlit."""
+
+    def __init__(self):
+        self._bar = st.progress(0)
+        self._text = st.empty()
+
+    def update(self, fraction, text=None):
+        self._bar.progress(fraction)
+        if text:
+            self._text.text(text)
 
-# [OK] CRITICAL FIX: List of terms that should NEVER become "Customer" in leads
-CUSTOMER_KEYWORDS_BLOCKLIST = [
-    "customer", "closed", "won", "admission", "confirmed", 
-    "contract", "signed", "paid", "payment", "completed"
-]
-
-# [OK] NEW: Team Definitions
-TEAM_MAPPING = {
-    "Momentum Makers": [
-        "Nisha Samuel", "Bindu -", "Remya Raghunath", "Jibymol Varghese", 
-        "akhila shaji", "Geethu Babu", "Arya S", "Parvathy R"
-    ],
-    "Success Squad": [
-        "Remya Ravindran", "Sumithra -", "Jayasree -", "SANIJA K P", 
-        "Shubha Lakshmi", "Aneena Elsa Shibu", "Merin j", "Pooja Prabhaji",
-        "athira krishna"
-    ],
-    "TRAINING SQUAD": [
-        "Gayathri Sandhya"
-    ]
+class StreamlitReporter:
+    """Sends pipeline messages to the Streamlit page."""
+
+    def error(self, message):
+        st.error(message)
+
+    def warning(self, message):
+        st.warning(message)
+
+    def success(self, message):
+        st.success(message)
+
+    def info(self, message):
+        st.info(message)
+
+    def progress(self):
+        return _StreamlitProgress()
+
+    def partial_contacts(self, df_contacts, chunks_done, chunks_total):
+        # Partial results are drawn by load_dataset_progressively from a BufferedReporter
+        pass
+
+# [OK] NEW: Large step results are kept once per process and handed out as views, not unpickled copies
+SHARED_CACHE_MAX_ENTRIES = 32
+
+def shared_result_cache(ttl=None, hash_funcs=None):
+    """Like st.cache_data, but a hit returns the stored result without a pickle round trip.
+
+    Results live once in st.cache_resource; each caller gets read_only_view() of them, so
+    frames are copy-on-write views and edits never reach the shared copy. Raw record
+    lists are shared as they are and must not be modified.
+    """
+    def decorate(func):
+        cached = st.cache_resource(ttl=ttl, max_entries=SHARED_CACHE_MAX_ENTRIES, show_spinner=False,
+                                   hash_funcs=hash_funcs)(func)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return read_only_view(cached(*args, **kwargs))
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorate
+
+# [OK] NEW: HubSpot fetchers and record processors from the core package, cached per server process
+fetch_deal_pipeline_stages = st.cache_data(ttl=86400)(hubspot.fetch_deal_pipeline_stages)
+fetch_owner_mapping = st.cache_data(ttl=3600)(hubspot.fetch_owner_mapping)
+fetch_and_process_contacts = shared_result_cache(ttl=900)(streaming.fetch_and_process_contacts)
+fetch_hubspot_deals = shared_result_cache(ttl=900)(hubspot.fetch_hubspot_deals)
+fetch_partial_payment_deals = shared_result_cache(ttl=900)(hubspot.fetch_partial_payment_deals)
+fetch_team_performance_deals = shared_result_cache(ttl=900)(hubspot.fetch_team_performance_deals)
+# Deal lists are RecordSets fingerprinted at fetch time - the cache keys on that instead of hashing every record
+process_deals_as_customers = shared_result_cache(hash_funcs={RecordSet: records_hash})(parallel.process_deals_partitioned)
+
+SHARED_CACHED_STEPS = [fetch_and_process_contacts, fetch_hubspot_deals, fetch_partial_payment_deals,
+                       fetch_team_performance_deals, process_deals_as_customers]
+
+CACHED_PIPELINE_STEPS = {
+    'fetch_owner_mapping': fetch_owner_mapping,
+    'fetch_and_process_contacts': fetch_and_process_contacts,
+    'fetch_hubspot_deals': fetch_hubspot_deals,
+    'fetch_team_performance_deals': fetch_team_performance_deals,
+    'fetch_partial_payment_deals': fetch_partial_payment_deals,
+    'process_deals_as_customers': process_deals_as_customers,
+    'process_team_performance_metrics': parallel.process_team_performance_partitioned,
 }
 
 # [OK] NEW: KPI Rendering Functions
@@ -739,649 +787,585 @@ def render_lead_status_metrics(status_counts, total_leads, status_amounts=None):
         </div>
     </div>
     """.format(total_leads=total_leads)
-    
-    return html
 
-# [OK] NEW: Enhanced Excel Export Function
-def create_excel_report(df_contacts, df_customers, metrics, kpis, date_range, date_field):
-    """Create a professional Excel report with multiple sheets and formatting."""
-    
-    # Create an in-memory BytesIO object
-    output = BytesIO()
-    
-    # Create Excel writer with XlsxWriter engine
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        workbook = writer.book
-        
-        # Define formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'font_size': 12,
-            'bg_color': '#4F81BD',
-            'font_color': 'white',
-            'align': 'center',
-            'valign': 'vcenter',
-            'border': 1
-        })
-        
-        number_format = workbook.add_format({
-            'num_format': '#,##0',
-            'align': 'right',
-            'border': 1
-        })
-        
-        percent_format = workbook.add_format({
-            'num_format': '0.0%',
-            'align': 'right',
-            'border': 1
-        })
-        
-        # Sheet 1: Executive Summary
-        summary_data = {
-            'Metric': [
-                'Total Leads',
-                'Deal Leads (Hot+Warm+Cold+Customer)',
-                'Customers',
-                'Hot Leads',
-                'Warm Leads', 
-                'Cold Leads',
-                'New Leads',
-                'Not Connected',
-                'Not Interested',
-                'Not Qualified',
-                'Duplicate',
-                'Lead -> Deal %',
-                'Lead -> Customer %',
-                'Deal -> Customer %',
-                'Total Revenue',
-                'Avg Revenue per Customer'
-            ],
-            'Count': [
-                kpis['total_leads'],
-                kpis['deal_leads'],
-                kpis['customer'],
-                kpis['hot'],
-                kpis['warm'],
-                kpis['cold'],
-                kpis['new_lead'],
-                kpis['not_connected'],
-                kpis['not_interested'],
-                kpis['not_qualified'],
-                kpis['duplicate'],
-                kpis['lead_to_deal_pct']/100,
-                kpis['lead_to_customer_pct']/100,
-                kpis['deal_to_customer_pct']/100,
-                kpis['total_revenue'],
-                kpis['avg_revenue_per_customer'] if kpis['avg_revenue_per_customer'] > 0 else 0
-            ]
-        }
-        
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Executive Summary', index=False)
-        
-        worksheet = writer.sheets['Executive Summary']
-        
-        # Apply formatting
-        for col_num, value in enumerate(summary_df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        
-        # Set column widths
-        worksheet.set_column('A:A', 35)
-        worksheet.set_column('B:B', 20)
-        
-        # Add report header
-        worksheet.merge_range('D1:F1', 'HubSpot Analytics Report', workbook.add_format({
-            'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter'
-        }))
-        
-        worksheet.merge_range('D2:F2', f'Date Field: {date_field}', workbook.add_format({
-            'align': 'center'
-        }))
-        
-        worksheet.merge_range('D3:F3', f'Date Range: {date_range[0]} to {date_range[1]}', workbook.add_format({
-            'align': 'center'
-        }))
-        
-        worksheet.merge_range('D4:F4', f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', workbook.add_format({
-            'align': 'center'
-        }))
-        
-        # Sheet 2: Raw Lead Data
-        if not df_contacts.empty:
-            df_contacts.to_excel(writer, sheet_name='Raw Lead Data', index=False)
-            worksheet = writer.sheets['Raw Lead Data']
-            
-            # Apply formatting
-            for col_num, value in enumerate(df_contacts.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Auto-adjust column widths
-            for i, col in enumerate(df_contacts.columns):
-                column_len = max(df_contacts[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, min(column_len, 50))
-        
-        # Sheet 3: Customer Data
-        if df_customers is not None and not df_customers.empty:
-            df_customers.to_excel(writer, sheet_name='Customer Data', index=False)
-            worksheet = writer.sheets['Customer Data']
-            
-            for col_num, value in enumerate(df_customers.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-        
-        # Sheet 4: Owner Performance (Metric 4)
-        if 'metric_4' in metrics and not metrics['metric_4'].empty:
-            metric_4 = metrics['metric_4'].copy()
-            metric_4.to_excel(writer, sheet_name='Owner Performance', index=False)
-            
-            worksheet = writer.sheets['Owner Performance']
-            for col_num, value in enumerate(metric_4.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Format percentages
-            percent_columns = ['Deal %', 'Customer %', 'Lead->Customer %', 'Lead->Deal %']
-            num_rows = len(metric_4)
-            num_cols = len(metric_4.columns)
-            
-            for row in range(1, num_rows + 1):
-                for col in range(num_cols):
-                    col_name = metric_4.columns[col]
-                    if col_name in percent_columns:
-                        value = metric_4.iloc[row-1, col]
-                        if pd.notnull(value):
-                            worksheet.write(row, col, value/100, percent_format)
-                    elif col_name not in ['Course Owner'] and col_name != 'Customer_Revenue':
-                        value = metric_4.iloc[row-1, col]
-                        if pd.notnull(value):
-                            worksheet.write(row, col, value, number_format)
-        
-        # Sheet 5: Course Performance (NEW METRIC)
-        if 'metric_5' in metrics and not metrics['metric_5'].empty:
-            metric_5 = metrics['metric_5'].copy()
-            metric_5.to_excel(writer, sheet_name='Course Performance', index=False)
-            
-            worksheet = writer.sheets['Course Performance']
-            for col_num, value in enumerate(metric_5.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Format percentages
-            percent_columns = ['Deal %', 'Customer %', 'Lead->Customer %', 'Lead->Deal %']
-            num_rows = len(metric_5)
-            num_cols = len(metric_5.columns)
-            
-            for row in range(1, num_rows + 1):
-                for col in range(num_cols):
-                    col_name = metric_5.columns[col]
-                    if col_name in percent_columns:
-                        value = metric_5.iloc[row-1, col]
-                        if pd.notnull(value):
-                            worksheet.write(row, col, value/100, percent_format)
-                    elif col_name not in ['Course'] and col_name != 'Customer_Revenue':
-                        value = metric_5.iloc[row-1, col]
-                        if pd.notnull(value):
-                            worksheet.write(row, col, value, number_format)
-        
-        # Sheet 6: Lead Status Summary
-        if not df_contacts.empty:
-            status_summary = df_contacts['Lead Status'].value_counts().reset_index()
-            status_summary.columns = ['Lead Status', 'Count']
-            status_summary['Percentage'] = (status_summary['Count'] / len(df_contacts) * 100).round(1)
-            
-            status_summary.to_excel(writer, sheet_name='Lead Status Summary', index=False)
-            
-            worksheet = writer.sheets['Lead Status Summary']
-            for col_num, value in enumerate(status_summary.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Format percentages
-            for row in range(1, len(status_summary) + 1):
-                worksheet.write(row, 2, status_summary.iloc[row-1, 2]/100, percent_format)
-                worksheet.write(row, 1, status_summary.iloc[row-1, 1], number_format)
-        
-        # Sheet 7: Revenue Analysis
-        if df_customers is not None and not df_customers.empty:
-            revenue_summary = df_customers.groupby('Course/Program').agg(
-                Customer_Count=('Is Customer', 'count'),
-                Total_Revenue=('Amount', 'sum'),
-                Avg_Revenue=('Amount', 'mean')
-            ).reset_index()
-            
-            revenue_summary = revenue_summary.sort_values('Total_Revenue', ascending=False)
-            revenue_summary.to_excel(writer, sheet_name='Revenue Analysis', index=False)
-            
-            worksheet = writer.sheets['Revenue Analysis']
-            for col_num, value in enumerate(revenue_summary.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Format revenue columns
-            for row in range(1, len(revenue_summary) + 1):
-                worksheet.write(row, 2, revenue_summary.iloc[row-1, 2], number_format)
-                worksheet.write(row, 3, revenue_summary.iloc[row-1, 3], number_format)
-    
-    # Get the Excel data
-    excel_data = output.getvalue()
-    return excel_data
-
-# [OK] NEW: Lead Status Metrics Function
-def create_metric_6(df_contacts):
-    """METRIC 6: Lead Status Count Breakdown"""
-    if df_contacts.empty or 'Lead Status' not in df_contacts.columns:
-        return pd.DataFrame()
-    
-    # Get all lead status counts
-    status_counts = df_contacts['Lead Status'].value_counts().reset_index()
-    status_counts.columns = ['Lead Status', 'Count']
-    
-    # Calculate percentages
-    total_leads = len(df_contacts)
-    status_counts['Percentage'] = (status_counts['Count'] / total_leads * 100).round(2)
-    
-    # Order by count descending
-    status_counts = status_counts.sort_values('Count', ascending=False)
-    
-    return status_counts
+    return html
 
-# [OK] NEW: Qualified Lead Drilldown
-def create_qualified_lead_drilldown(df_contacts):
-    """
-    Generate breakdown for Qualified Leads by Traffic Source Drill-Down 1 and Referral Status.
+# [OK] NEW: Server-side paginated tables (only the visible page is styled and sent)
+TABLE_PAGE_SIZES = [25, 50, 100, 250]
+TOTAL_ROW_CSS = 'background-color: #d4edda; font-weight: bold'
+
+# st.fragment lets page/sort changes rerun only the table instead of the whole app
+_table_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+def style_total_rows(df, label_col='Course Owner', labels=('TOTAL',), css=TOTAL_ROW_CSS):
+    """Vectorized style frame highlighting TOTAL rows."""
+    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+    if label_col in df.columns:
+        styles.loc[df[label_col].astype(str).isin(labels).to_numpy(), :] = css
+    return styles
+
+def conversion_band_styles(values):
+    """Red/amber/green CSS for conversion percentages (<3, <8, >=8); blank for non-numbers."""
+    numeric = pd.to_numeric(values, errors='coerce')
+    bands = np.select(
+        [numeric < 3, numeric < 8, numeric >= 8],
+        [
+            'background-color: #f8d7da; color: #721c24; font-weight: bold',
+            'background-color: #fff3cd; color: #856404; font-weight: bold',
+            'background-color: #d4edda; color: #155724; font-weight: bold',
+        ],
+        default=''
+    )
+    return pd.Series(bands, index=values.index)
+
+def change_direction_styles(df, columns):
+    """Green/red/black font for positive/negative/zero change columns."""
+    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+    for col in columns:
+        values = pd.to_numeric(df[col], errors='coerce')
+        colors = np.select([values > 0, values < 0], ['green', 'red'], default='black')
+        styles[col] = pd.Series(colors, index=df.index).radd('color: ').add('; font-weight: bold')
+    return styles
+
+def _table_search_mask(df, query):
+    """Case-insensitive substring match across the text columns of df."""
+    mask = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object or pd.api.types.is_string_dtype(series):
+            mask |= series.astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+    return mask
+
+def _sort_table(df, column, descending):
+    """Stable sort that tolerates mixed-type object columns."""
+    try:
+        return df.sort_values(column, ascending=not descending, kind='stable', na_position='last')
+    except TypeError:
+        return df.sort_values(column, ascending=not descending, kind='stable', na_position='last',
+                              key=lambda s: s.astype(str))
+
+@_table_fragment
+def render_paginated_table(df, key, style_fn=None, formats=None, pinned_fn=None, height=None, page_size=50,
+                           hydrate=None):
+    """Sort, filter and paginate df server-side and render only the visible page.
+
+    style_fn receives the page DataFrame and must return a same-shaped frame of CSS
+    strings (Styler.apply(axis=None)). pinned_fn returns a boolean mask of rows (e.g.
+    TOTAL rows) that skip sorting/filtering and are appended to every page. hydrate
+    fills on-demand columns (contact details) of the page before it is shown, so
+    search and sort only see values that are already loaded.
     """
-    if df_contacts.empty:
-        return pd.DataFrame()
-        
-    # Filter for Qualified Leads only
-    ql_df = df_contacts[df_contacts['Lead Status'] == 'Qualified Lead'].copy()
-    
-    # [OK] NEW: Global exclusion of Service-Customer leads
-    def is_service_customer(val):
-        v = str(val).lower().strip()
-        return v in ['yes', 'true', '1', 'y', 'checked']
-        
-    if 'Service-Customer' in ql_df.columns:
-        ql_df = ql_df[~ql_df['Service-Customer'].apply(is_service_customer)]
-    
-    if ql_df.empty:
-        return pd.DataFrame()
-        
-    # Standardize Traffic Source if it's CRM or Referral related
-    def categorize_source(source):
-        s = str(source).lower().strip()
-        if not s or s == 'none': return 'Other'
-        if 'crm' in s: return 'CRM'
-        if 'referral' in s or 'refer' in s or 'reffer' in s: return 'Referral'
-        return source
-
-    ql_df['Source Category'] = ql_df['Traffic Source Drill-Down 1'].apply(categorize_source)
-    
-    # Standardize Referral Status
-    def standardize_referral(row):
-        # Look in both Referral Lead and Referred By for 'chatbot'
-        ref_lead = str(row.get('Referral Lead', '')).lower()
-        ref_by = str(row.get('Referred By', '')).lower()
-        
-        if 'chatbot' in ref_lead or 'chatbot' in ref_by:
-            return 'Chatbot'
-        if any(x in ref_lead for x in ['yes', 'true', '1', 'y', 'checked']):
-            return 'Referral'
-        return 'Sales'
-        
-    ql_df['Is Referral'] = ql_df.apply(standardize_referral, axis=1)
-    
-    # Create the matrix/cross-tab
-    pivot = ql_df.groupby(['Source Category', 'Is Referral']).size().unstack(fill_value=0)
-    
-    # Ensure Referral, Sales, and Chatbot columns exist
-    for col in ['Referral', 'Sales', 'Chatbot']:
-        if col not in pivot.columns: pivot[col] = 0
-    
-    # Add Total column
-    pivot['Total Qualified Leads'] = pivot['Referral'] + pivot['Sales'] + pivot['Chatbot']
-    
-    # Reset index for display
-    result = pivot.reset_index()
-    
-    # Sort by total descending
-    result = result.sort_values('Total Qualified Leads', ascending=False)
-    
-    # Add TOTAL row
-    if not result.empty:
-        total_row = pd.Series({
-            'Source Category': 'TOTAL',
-            'Referral': result['Referral'].sum(),
-            'Sales': result['Sales'].sum(),
-            'Chatbot': result['Chatbot'].sum(),
-            'Total Qualified Leads': result['Total Qualified Leads'].sum()
-        })
-        result = pd.concat([result, pd.DataFrame([total_row])], ignore_index=True)
-    
-    return result
+    if df is None or df.empty:
+        st.info("No rows to display")
+        return
+
+    if pinned_fn is not None:
+        pinned_mask = np.asarray(pinned_fn(df), dtype=bool)
+        pinned, body = df[pinned_mask], df[~pinned_mask]
+    else:
+        pinned, body = df.iloc[0:0], df
+
+    columns_by_label = {str(c): c for c in df.columns}
+    ctrl_search, ctrl_sort, ctrl_desc, ctrl_size = st.columns([3, 2, 1, 1])
+    with ctrl_search:
+        query = st.text_input("Search rows", key=f"{key}_search", placeholder="Search rows...",
+                              label_visibility="collapsed")
+    with ctrl_sort:
+        sort_label = st.selectbox("Sort by", ["(default order)"] + list(columns_by_label),
+                                  key=f"{key}_sort", label_visibility="collapsed")
+    with ctrl_desc:
+        descending = st.checkbox("Desc", value=True, key=f"{key}_desc")
+    with ctrl_size:
+        size = st.selectbox("Rows per page", TABLE_PAGE_SIZES,
+                            index=TABLE_PAGE_SIZES.index(page_size) if page_size in TABLE_PAGE_SIZES else 1,
+                            key=f"{key}_size", label_visibility="collapsed")
+
+    if query:
+        body = body[_table_search_mask(body, query)]
+    if sort_label in columns_by_label:
+        body = _sort_table(body, columns_by_label[sort_label], descending)
+
+    total_rows = len(body)
+    total_pages = max(1, -(-total_rows // size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+
+    start = (st.session_state.get(page_key, 1) - 1) * size
+    page_df = body.iloc[start:start + size]
+    if hydrate is not None:
+        page_df = hydrate(page_df)
+    if not pinned.empty:
+        page_df = pd.concat([page_df, pinned])
+
+    size_kwargs = {'height': height} if height else {}
+    if style_fn is not None or formats:
+        styler = page_df.style
+        if style_fn is not None:
+            styler = styler.apply(style_fn, axis=None)
+        if formats:
+            styler = styler.format({k: v for k, v in formats.items() if k in page_df.columns})
+        st.dataframe(styler, width='stretch', **size_kwargs)
+    else:
+        st.dataframe(page_df, width='stretch', **size_kwargs)
+
+    info_col, page_col = st.columns([4, 1])
+    with page_col:
+        st.number_input("Page", min_value=1, max_value=total_pages, step=1, key=page_key,
+                        label_visibility="collapsed")
+    with info_col:
+        shown_to = min(start + size, total_rows)
+        st.caption(
+            f"Rows {start + 1 if total_rows else 0:,}-{shown_to:,} of {total_rows:,}"
+            f"{f' matching {query!r}' if query else ''} | page {st.session_state.get(page_key, 1)} of {total_pages}"
+        )
 
-# [OK] NEW: CRM Owner Breakdown
-def create_crm_owner_breakdown(df_contacts):
+@st.cache_resource
+def get_dataset_registry():
+    """Process-wide dataset registry: sessions showing the same data share one copy of it."""
+    return DatasetRegistry()
+
+def use_dataset_lease(lease):
+    """Point this session at a registry dataset (releasing the one it held before)."""
+    previous = st.session_state.get('dataset_lease')
+    st.session_state.dataset_lease = lease
+    for key in PIPELINE_STATE_KEYS:
+        st.session_state[key] = lease.data[key]
+    if previous is not None:
+        previous.release()
+
+def dataset_as_of(lease):
+    """When the session's dataset was produced: snapshot generation time or registry load time."""
+    generated_at = (lease.data.get('manifest') or {}).get('generated_at')
+    if generated_at:
+        return datetime.fromisoformat(generated_at)
+    return datetime.fromtimestamp(lease.loaded_at, IST)
+
+@st.cache_resource
+def get_refresh_scheduler():
+    """Background refresh of the current month into the dataset registry (None when disabled)."""
+    interval = int(_get_setting("refresh_interval", "HUBSPOT_REFRESH_INTERVAL", REFRESH_INTERVAL_SECONDS))
+    api_key = get_api_key()
+    if interval <= 0 or not api_key:
+        return None
+    return RefreshScheduler(get_dataset_registry(), api_key, interval=interval).start()
+
+def swap_in_newer_dataset():
+    """Move the session to a newer copy of its dataset (e.g. a finished background reload)."""
+    lease = st.session_state.get('dataset_lease')
+    if lease is None or not get_dataset_registry().newer(lease):
+        return False
+    newer = get_dataset_registry().acquire(lease.key)
+    if newer is None:
+        return False
+    use_dataset_lease(newer)
+    return True
+
+DATASET_POLL_SECONDS = 3
+
+def render_dataset_freshness(polling=False):
+    """"As of" line for the session's dataset, or a stale-data notice while it is being reloaded."""
+    lease = st.session_state.dataset_lease
+    registry = get_dataset_registry()
+    if polling and (registry.newer(lease) or not registry.revalidating(lease.key)):
+        # Reload finished (or failed) - rerun the whole app, which swaps in the new data
+        st.rerun()
+    as_of = dataset_as_of(lease)
+    if not lease.stale:
+        st.caption(f" Data as of {as_of:%d %b %Y %H:%M} IST")
+    elif polling:
+        st.warning(f" Showing data as of {as_of:%d %b %H:%M} IST ({int(lease.age() // 60)} min old) - refreshing in the background...")
+    else:
+        st.warning(f" Showing data as of {as_of:%d %b %H:%M} IST ({int(lease.age() // 60)} min old) - background refresh failed, fetch again to retry")
+
+def attach_scheduled_dataset():
+    """Give a session without data the scheduler's current-month dataset, if it is ready."""
+    scheduler = get_refresh_scheduler()
+    if scheduler is None or scheduler.current is None:
+        return False
+    current = scheduler.current
+    lease = get_dataset_registry().acquire(current['key'])
+    if lease is None:
+        return False
+    use_dataset_lease(lease)
+    st.session_state.snapshot_run_dir = None
+    st.session_state.date_filter = current['date_field']
+    st.session_state.date_range = current['date_range']
+    st.session_state.deal_date_range = current['deal_date_range']
+    return True
+
+# [OK] NEW: Business rules are reloaded from HUBSPOT_RULES_FILE when it changes
+@st.cache_resource
+def get_rules_state():
+    """Fingerprint of the rules the cached processed frames were built with."""
+    return {'fingerprint': get_rules().fingerprint}
+
+def sync_business_rules():
+    """Drop processed results and shared datasets built with rules that have since changed."""
+    state = get_rules_state()
+    fingerprint = get_rules().fingerprint
+    if fingerprint != state['fingerprint']:
+        state['fingerprint'] = fingerprint
+        fetch_and_process_contacts.clear()
+        process_deals_as_customers.clear()
+        get_dataset_registry().invalidate()
+
+# [OK] NEW: The comparison period is prefetched with leftover quota after the main fetch
+@st.cache_resource
+def get_prefetcher():
+    """Process-wide prefetcher: sessions wanting the same period share one background load."""
+    return Prefetcher()
+
+def get_prefetch_owner():
+    """This session's prefetch owner; its prefetches lapse when the session is gone."""
+    if 'prefetch_owner' not in st.session_state:
+        st.session_state.prefetch_owner = PrefetchOwner()
+    return st.session_state.prefetch_owner
+
+def comparison_period_key(date_field, start_date, end_date, customer_stage_ids):
+    """Prefetch key of a comparison period."""
+    return ('comparison', date_field, str(start_date), str(end_date),
+            tuple(sorted(str(stage_id) for stage_id in customer_stage_ids)))
+
+def load_comparison_period(api_key, date_field, start_date, end_date, owner_mapping, customer_stage_ids, deal_stages):
+    """(df_contacts, contacts count, deals, df_customers) of a comparison period, through the shared caches.
+
+    Runs on prefetch threads too, so everything comes in as arguments, never from session_state.
     """
-    Generate breakdown for CRM-sourced Qualified Leads by Course Owner.
+    df_contacts, contacts_count = fetch_and_process_contacts(api_key, date_field, start_date, end_date, owner_mapping)
+    deals, _ = fetch_hubspot_deals(api_key, start_date, end_date, customer_stage_ids)
+    df_customers = None
+    if contacts_count or deals:
+        check_cancelled()
+        df_customers = process_deals_as_customers(deals, owner_mapping, api_key, deal_stages, start_date=start_date)
+    return df_contacts, contacts_count, deals, df_customers
+
+def sync_comparison_prefetch(api_key, selection):
+    """Prefetch the period(s) before the loaded range, or give them up once the sidebar selection changes.
+
+    selection is the sidebar's current date field and ranges; the prefetch runs only while it is the
+    selection the session's dataset was loaded with.
     """
-    if df_contacts.empty:
-        return pd.DataFrame()
-        
-    # 1. Filter for Qualified Leads only
-    ql_df = df_contacts[df_contacts['Lead Status'] == 'Qualified Lead'].copy()
-    
-    # [OK] NEW: Global exclusion of Service-Customer leads
-    def is_service_customer(val):
-        v = str(val).lower().strip()
-        return v in ['yes', 'true', '1', 'y', 'checked']
-        
-    if 'Service-Customer' in ql_df.columns:
-        ql_df = ql_df[~ql_df['Service-Customer'].apply(is_service_customer)]
-    
-    if ql_df.empty:
-        return pd.DataFrame()
-        
-    # 2. Categorize Source (reuse logic from main drilldown)
-    def categorize_source(source):
-        s = str(source).lower().strip()
-        if not s or s == 'none': return 'Other'
-        if 'crm' in s: return 'CRM'
-        if 'referral' in s or 'refer' in s or 'reffer' in s: return 'Referral'
-        return source
-
-    ql_df['Source Category'] = ql_df['Traffic Source Drill-Down 1'].apply(categorize_source)
-    
-    # 3. Filter for CRM only
-    crm_df = ql_df[ql_df['Source Category'] == 'CRM'].copy()
-    
-    if crm_df.empty:
-        return pd.DataFrame()
-        
-    # 4. Standardize Referral/Sales/Chatbot (reuse logic)
-    def standardize_referral(row):
-        ref_lead = str(row.get('Referral Lead', '')).lower()
-        ref_by = str(row.get('Referred By', '')).lower()
-        if 'chatbot' in ref_lead or 'chatbot' in ref_by: return 'Chatbot'
-        if any(x in ref_lead for x in ['yes', 'true', '1', 'y', 'checked']): return 'Referral'
-        return 'Sales'
-        
-    crm_df['Is Referral'] = crm_df.apply(standardize_referral, axis=1)
-    
-    # 5. Group by Owner (Course Owner)
-    pivot = crm_df.groupby(['Course Owner', 'Is Referral']).size().unstack(fill_value=0)
-    
-    # Ensure columns exist
-    for col in ['Referral', 'Sales', 'Chatbot']:
-        if col not in pivot.columns: pivot[col] = 0
-        
-    pivot['Total CRM Leads'] = pivot['Referral'] + pivot['Sales'] + pivot['Chatbot']
-    
-    result = pivot.reset_index()
-    result = result.sort_values('Total CRM Leads', ascending=False)
+    prefetcher, owner = get_prefetcher(), get_prefetch_owner()
+    lease = st.session_state.get('dataset_lease')
+    if lease is None or not st.session_state.date_range or PREFETCH_PERIODS <= 0:
+        prefetcher.cancel(owner)
+        return
+    if st.session_state.get('prefetch_dataset_key') != lease.key:
+        st.session_state.prefetch_dataset_key = lease.key
+        st.session_state.prefetch_selection = selection
+    if st.session_state.prefetch_selection != selection:
+        prefetcher.cancel(owner)
+        return
     
-    # 6. Add TOTAL row
-    if not result.empty:
-        total_row = pd.Series({
-            'Course Owner': 'TOTAL',
-            'Referral': result['Referral'].sum(),
-            'Sales': result['Sales'].sum(),
-            'Chatbot': result['Chatbot'].sum(),
-            'Total CRM Leads': result['Total CRM Leads'].sum()
-        })
-        result = pd.concat([result, pd.DataFrame([total_row])], ignore_index=True)
-        
-    return result
+    start_date, end_date = (datetime.strptime(day, "%Y-%m-%d").date() for day in st.session_state.date_range)
+    date_field, customer_stage_ids = st.session_state.date_filter, list(st.session_state.customer_stage_ids)
+    loads = {}
+    for _ in range(PREFETCH_PERIODS):
+        start_date, end_date = calculate_previous_period(start_date, end_date)
+        loads[comparison_period_key(date_field, start_date, end_date, customer_stage_ids)] = functools.partial(
+            load_comparison_period, api_key, date_field, start_date, end_date, st.session_state.owner_mapping,
+            customer_stage_ids, st.session_state.deal_stages
+        )
+    prefetcher.request(owner, loads)
 
-# [OK] NEW: Detailed Team Metrics
-def get_detailed_team_data(metric_4):
-    """Return detailed DataFrames for each team with totals."""
-    if metric_4.empty:
-        return {}
-    
-    team_results = {}
+# [OK] NEW: Progressive loading - KPIs and lead tables from the contacts fetched so far
+PARTIAL_RENDER_SECONDS = 1.0
+
+def render_partial_contacts(progress):
+    """Loading indicator plus lead KPIs and tables for a BufferedReporter snapshot."""
+    done, total = progress['chunks_done'], progress['chunks_total']
+    df_partial = progress['contacts']
+    if df_partial is None:
+        st.progress(0.0, text=progress['status'] or "Fetching data...")
+        return
+    if done < total:
+        st.progress(done / total, text=f" Loading {done} of {total} chunks - {len(df_partial):,} contacts so far...")
+    else:
+        st.progress(1.0, text=f"[OK] All {total} contact chunks loaded - fetching deals and team performance...")
+    if df_partial.empty:
+        return
     
-    for team_name, members in TEAM_MAPPING.items():
-        # Case insensitive matching
-        team_members_lower = [m.lower() for m in members]
-        
-        # Filter data
-        if 'Course Owner' not in metric_4.columns:
-            continue
-            
-        team_df = metric_4[metric_4['Course Owner'].str.lower().isin(team_members_lower)].copy()
-        
-        if team_df.empty:
-            team_results[team_name] = pd.DataFrame()
-            continue
-            
-        # [OK] NEW: Calculate Conversion Metrics for Team Members
-        # Note: 'Hot', 'Warm', 'Cold' from contacts might not match 'Hot_Customer' from deals
-        # So we display the conversion count primarily, or ratio if possible.
-        
-        if 'Hot_Customer' in team_df.columns:
-            # Denominator: Hot Leads (Contacts) + Converted Hot (Deals) isn't perfect but best proxy
-            # If 'Hot' column exists from Metric 2 (Contacts)
-            hot_contacts = team_df['Hot'] if 'Hot' in team_df.columns else 0
-            
-            team_df['HOT-CUSTOMER CONVERSION'] = np.where(
-                (hot_contacts + team_df['Hot_Customer']) > 0,
-                (team_df['Hot_Customer'] / (hot_contacts + team_df['Hot_Customer']) * 100).round(2),
-                0
-            )
+    df_partial = df_partial[~get_owner_dimension().excluded_rows(df_partial)]
+    kpis = calculate_kpis(df_partial, None)
+    st.markdown(
+        render_kpi_row([
+            render_kpi("Total Leads", f"{kpis['total_leads']:,}", "Loading..." if done < total else "From Contacts", "kpi-box-blue"),
+            render_kpi("Qualified Leads", f"{kpis['qualified_lead']:,}", "Created & Closed", "kpi-box-orange"),
+            render_kpi("Qualified Lead Value", f"Rs.{kpis['qualified_lead_revenue']:,.0f}", "Revenue Amount", "kpi-box-teal"),
+            render_kpi("Top Course", kpis['top_course'], "By lead volume", "kpi-box-green"),
+        ]),
+        unsafe_allow_html=True
+    )
+    status_amounts = df_partial.groupby('Lead Status')['Amount'].sum().to_dict()
+    st.markdown(
+        render_lead_status_metrics(df_partial['Lead Status'].value_counts(), len(df_partial), status_amounts),
+        unsafe_allow_html=True
+    )
+    metric_1 = create_metric_1(df_partial)
+    if not metric_1.empty:
+        st.markdown("####  Course x Lead Status (partial)")
+        st.dataframe(metric_1, use_container_width=True, hide_index=True)
 
-        if 'Warm_Customer' in team_df.columns:
-            warm_contacts = team_df['Warm'] if 'Warm' in team_df.columns else 0
-            
-            team_df['WARM-CUSTOMER CONVERSION'] = np.where(
-                (warm_contacts + team_df['Warm_Customer']) > 0,
-                (team_df['Warm_Customer'] / (warm_contacts + team_df['Warm_Customer']) * 100).round(2),
-                0
-            )
+def load_dataset_progressively(key, load, area):
+    """Acquire key from the dataset registry, rendering partial contacts into area while it loads.
 
-        if 'Cold_Customer' in team_df.columns:
-            cold_contacts = team_df['Cold'] if 'Cold' in team_df.columns else 0
-            
-            team_df['COLD TO CUSTOMER CONVERSION'] = np.where(
-                (cold_contacts + team_df['Cold_Customer']) > 0,
-                (team_df['Cold_Customer'] / (cold_contacts + team_df['Cold_Customer']) * 100).round(2),
-                0
-            )
+    The load runs on a worker thread with a BufferedReporter; this (script) thread replays
+    its messages and redraws area whenever new contacts have been processed.
+    """
+    registry = get_dataset_registry()
+    reporter = BufferedReporter()
+    outcome = {}
+    
+    def run():
+        set_reporter(reporter)
+        try:
+            outcome['lease'] = registry.acquire(key, load)
+        except Exception as e:
+            outcome['error'] = e
+    
+    worker = threading.Thread(target=run, name="dataset-load", daemon=True)
+    worker.start()
+    streamlit_reporter = StreamlitReporter()
+    shown_version = None
+    while True:
+        worker.join(PARTIAL_RENDER_SECONDS)
+        for kind, message in reporter.drain():
+            getattr(streamlit_reporter, kind)(message)
+        if not worker.is_alive():
+            break
+        progress = reporter.snapshot()
+        if progress['version'] != shown_version:
+            shown_version = progress['version']
+            with area.container():
+                render_partial_contacts(progress)
+    area.empty()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('lease')
+
+@st.cache_resource
+def get_report_job_manager():
+    """Process-wide report job manager shared by all sessions."""
+    return ReportJobManager()
+
+def submit_excel_report_job(df_contacts, df_customers, metrics, kpis, date_range, date_field, api_key=None):
+    """Queue a premium Excel report build and return its job id.
+
+    The dataframes are snapshotted (copy-on-write views) so later changes in the session cannot alter the report.
+    With api_key, the job first reads the contact details of the Raw Lead Data sheet; the workbook
+    itself is written in a worker process.
+    """
+    df_contacts = df_contacts.copy(deep=False)
+    df_customers = df_customers.copy(deep=False) if df_customers is not None else None
+    metrics = {name: value.copy(deep=False) for name, value in metrics.items() if isinstance(value, pd.DataFrame)}
+    kpis = dict(kpis)
+    date_range = tuple(date_range)
+    # Looked up here, in the script run: build() runs on a worker thread without a Streamlit context
+    manager = get_report_job_manager()
+
+    def build(output_path, progress):
+        progress(0.0, "Reading contact details")
+        with fetch_priority(SECONDARY):
+            contacts = hydrate_contact_details(df_contacts, api_key)
+        manager.run_in_process(write_excel_report, output_path, contacts, df_customers, metrics,
+                               kpis, date_range, date_field, progress=progress)
+
+    return manager.submit(
+        label=f"Premium Excel report | {date_field} | {date_range[0]} to {date_range[1]}",
+        file_name=f"HubSpot_Premium_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        build=build,
+    )
 
-        # Calculate Total Row
-        total_row = pd.Series(index=team_df.columns, dtype='object')
-        total_row['Course Owner'] = 'TOTAL'
-        
-        # Sum numeric columns
-        numeric_cols = ['Grand Total', 'Customer', 'Customer_Revenue', 'Deal Leads', 
-                        'Hot', 'Warm', 'Cold', 
-                        'Hot_Customer', 'Warm_Customer', 'Cold_Customer']
-        
-        for col in numeric_cols:
-            if col in team_df.columns:
-                # Force numeric conversion to prevent string concatenation (broken totals like 000000)
-                total_row[col] = pd.to_numeric(team_df[col], errors='coerce').sum()
-        
-        # Recalculate percentages for Total row
-        grand_total = total_row.get('Grand Total', 0)
-        deal_leads = total_row.get('Deal Leads', 0)
-        customers = total_row.get('Customer', 0)
-        
-        total_row['Deal %'] = (deal_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        total_row['Customer %'] = (customers / deal_leads * 100).round(2) if deal_leads > 0 else 0
-        total_row['Lead->Deal %'] = (deal_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        total_row['Lead->Customer %'] = (customers / grand_total * 100).round(2) if grand_total > 0 else 0
-        
-        # [OK] NEW: Recalculate Conversion Metrics for Total Row
-        if 'Hot_Customer' in team_df.columns:
-            h_cust = total_row.get('Hot_Customer', 0)
-            h_lead = total_row.get('Hot', 0)
-            total_row['HOT-CUSTOMER CONVERSION'] = (h_cust / (h_lead + h_cust) * 100).round(2) if (h_lead + h_cust) > 0 else 0
-
-        if 'Warm_Customer' in team_df.columns:
-            w_cust = total_row.get('Warm_Customer', 0)
-            w_lead = total_row.get('Warm', 0)
-            total_row['WARM-CUSTOMER CONVERSION'] = (w_cust / (w_lead + w_cust) * 100).round(2) if (w_lead + w_cust) > 0 else 0
-
-        if 'Cold_Customer' in team_df.columns:
-            c_cust = total_row.get('Cold_Customer', 0)
-            c_lead = total_row.get('Cold', 0)
-            total_row['COLD TO CUSTOMER CONVERSION'] = (c_cust / (c_lead + c_cust) * 100).round(2) if (c_lead + c_cust) > 0 else 0
-        
-        # Append Total Row
-        team_df_with_total = pd.concat([team_df, pd.DataFrame([total_row])], ignore_index=True)
-        
-        # [OK] NEW: Filter columns to show only relevant metrics as requested
-        # "THESE TABLE ONLY NEED THAT OTHER METRICS NOT NEED"
-        cols_to_show = [
-            'Course Owner', 
-            'Hot', 'Warm', 'Cold',
-            'Hot_Customer', 'Warm_Customer', 'Cold_Customer',
-            'HOT-CUSTOMER CONVERSION', 'WARM-CUSTOMER CONVERSION', 'COLD TO CUSTOMER CONVERSION',
-            'Customer (Created)', # [OK] NEW: Added as requested
-            'Customer', 'Customer_Revenue' # Keep these as they are fundamental
-        ]
-        
-        # Only keep columns that actually exist
-        final_cols = [c for c in cols_to_show if c in team_df_with_total.columns]
-        
-        team_results[team_name] = team_df_with_total[final_cols]
-        
-    return team_results
+def _polling_fragment(run_every):
+    """st.fragment that reruns itself every run_every seconds (plain call on older Streamlit)."""
+    if hasattr(st, "fragment"):
+        return st.fragment(run_every=run_every)
+    return _table_fragment
+
+def render_report_jobs(polling=False):
+    """Show recent report jobs with progress bars and download buttons."""
+    jobs = get_report_job_manager().list_jobs()
+    if polling and not any(job['status'] in ('queued', 'running') for job in jobs):
+        # Last build finished - rerun the whole app once so polling stops
+        st.rerun()
+    if not jobs:
+        st.caption("No reports generated yet.")
+        return
+    for job in jobs:
+        created = datetime.fromisoformat(job['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+        st.caption(f"{job['label']} (requested {created})")
+        if job['status'] in ('queued', 'running'):
+            st.progress(job['progress'], text=job['message'])
+        elif job['status'] == 'failed':
+            st.error(f" Report failed: {job['error']}")
+        elif os.path.exists(job['path']):
+            with open(job['path'], 'rb') as report_file:
+                st.download_button(
+                    label=" Download Premium Excel Report",
+                    data=report_file,
+                    file_name=job['file_name'],
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    use_container_width=True,
+                    key=f"report_job_{job['id']}"
+                )
+        else:
+            st.warning(" Report file is no longer available")
+
+# [OK] NEW: Figure cache keyed by data fingerprint
+def frame_fingerprint(df):
+    """Cheap content hash of a DataFrame slice (values, index and column labels)."""
+    if df is None:
+        return "none"
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((df.shape, [str(c) for c in df.columns])).encode())
+    if not df.empty:
+        try:
+            row_hashes = pd.util.hash_pandas_object(df, index=True)
+        except TypeError:
+            # Unhashable cells (e.g. lists of associated IDs) - hash their text form
+            row_hashes = pd.util.hash_pandas_object(df.astype(str), index=True)
+        hasher.update(row_hashes.values.tobytes())
+    return hasher.hexdigest()
+
+def _options_fingerprint(args, kwargs):
+    """Stable hash of the non-data arguments passed to a figure builder."""
+    payload = json.dumps([list(args), kwargs], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+FIGURE_DATA_ARRAYS = ('x', 'y', 'z', 'values', 'labels', 'text', 'customdata', 'r', 'theta', 'ids', 'parents',
+                      'hovertext')
+FIGURE_OVERHEAD_BYTES = 4096   # layout, templates and per-trace settings
+
+def _array_nbytes(values):
+    """Rough size of a trace data array (numpy array or nested tuples/lists) without copying it."""
+    if values is None:
+        return 0
+    if isinstance(values, np.ndarray):
+        return values.nbytes
+    if isinstance(values, str):
+        return len(values)
+    if isinstance(values, (tuple, list)):
+        if values and isinstance(values[0], (tuple, list, np.ndarray)):
+            return sum(_array_nbytes(v) for v in values)
+        return 8 * len(values)
+    return 8
+
+def _estimate_figure_nbytes(value):
+    """Approximate memory held by a cached builder result.
+
+    Figures are sized from the lengths of their trace data arrays - serializing them
+    to measure would cost about as much as building them.
+    """
+    if isinstance(value, go.Figure):
+        return FIGURE_OVERHEAD_BYTES + sum(_array_nbytes(getattr(trace, name, None))
+                                           for trace in value.data for name in FIGURE_DATA_ARRAYS
+                                           if name in trace)
+    if isinstance(value, (tuple, list)):
+        return sum(_estimate_figure_nbytes(v) for v in value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, str):
+        return len(value)
+    return 64
+
+def _private_copy(value):
+    """Copy of a cached builder result that the caller may modify without touching the cache."""
+    if isinstance(value, go.Figure):
+        return go.Figure(value)
+    if isinstance(value, (tuple, list)):
+        return type(value)(_private_copy(v) for v in value)
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return value
+
+class FigureCache:
+    """Thread-safe LRU cache of built figures bounded by entry count and bytes.
+
+    Every caller gets its own copy of the stored result, so updating a returned
+    figure (update_layout, add_trace, ...) never changes what other sessions see.
+    """
 
-def get_detailed_team_data_temp_logic(metric_4):
-    """Return detailed DataFrames for each team with extra temp metrics."""
-    if metric_4.empty:
-        return {}
-    
-    team_results = {}
-    
-    for team_name, members in TEAM_MAPPING.items():
-        team_members_lower = [m.lower() for m in members]
-        
-        if 'Course Owner' not in metric_4.columns:
-            continue
-            
-        team_df = metric_4[metric_4['Course Owner'].str.lower().isin(team_members_lower)].copy()
-        
-        if team_df.empty:
-            team_results[team_name] = pd.DataFrame()
-            continue
-            
-        # Initialize percentage columns
-        for col in ['Deal %', 'Customer %', 'Lead->Deal %', 'Lead->Customer %']:
-            if col not in team_df.columns:
-                team_df[col] = 0.0
-
-        for idx in team_df.index:
-            gt = team_df.loc[idx, 'Grand Total'] if 'Grand Total' in team_df.columns else 0
-            dl = team_df.loc[idx, 'Deal Leads'] if 'Deal Leads' in team_df.columns else 0
-            cu = team_df.loc[idx, 'Customer'] if 'Customer' in team_df.columns else 0
-
-            team_df.loc[idx, 'Deal %'] = (dl / gt * 100).round(2) if gt > 0 else 0
-            team_df.loc[idx, 'Customer %'] = (cu / dl * 100).round(2) if dl > 0 else 0
-            team_df.loc[idx, 'Lead->Deal %'] = (dl / gt * 100).round(2) if gt > 0 else 0
-            team_df.loc[idx, 'Lead->Customer %'] = (cu / gt * 100).round(2) if gt > 0 else 0
-
-        # Calculate Total Row
-        total_row = pd.Series(index=team_df.columns, dtype='object')
-        total_row['Course Owner'] = 'TOTAL'
-        
-        numeric_cols = ['Grand Total', 'Customer', 'Customer_Revenue', 'Deal Leads', 'Hot', 'Warm', 'Cold']
-        for col in numeric_cols:
-            if col in team_df.columns:
-                total_row[col] = pd.to_numeric(team_df[col], errors='coerce').sum()
-        
-        # Recalculate percentages for Total row
-        grand_total = total_row.get('Grand Total', 0)
-        deal_leads = total_row.get('Deal Leads', 0)
-        customers = total_row.get('Customer', 0)
-        
-        total_row['Deal %'] = (deal_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        total_row['Customer %'] = (customers / deal_leads * 100).round(2) if deal_leads > 0 else 0
-        total_row['Lead->Deal %'] = (deal_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        total_row['Lead->Customer %'] = (customers / grand_total * 100).round(2) if grand_total > 0 else 0
-        
-        # Append Total Row
-        team_df_with_total = pd.concat([team_df, pd.DataFrame([total_row])], ignore_index=True)
-        
-        cols_to_show = [
-            'Course Owner', 
-            'Hot', 'Warm', 'Cold',
-            'Customer', 'Customer_Revenue',
-            'Deal Leads', 'Deal %', 'Customer %',
-            'Lead->Customer %', 'Lead->Deal %', 'Grand Total'
-        ]
-        
-        final_cols = [c for c in cols_to_show if c in team_df_with_total.columns]
-        team_results[team_name] = team_df_with_total[final_cols]
-        
-    return team_results
+    def __init__(self, max_entries=FIGURE_CACHE_MAX_ENTRIES, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            return _private_copy(entry[0])
+
+        value = build()
+        nbytes = _estimate_figure_nbytes(value)
+        if nbytes > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, nbytes)
+                self._total_bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+        return _private_copy(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+@st.cache_resource
+def get_figure_cache():
+    """One figure cache per server process, shared across sessions and reruns."""
+    return FigureCache()
+
+def cached_figure(builder, data, *args, **kwargs):
+    """Return builder(data, *args, **kwargs), reusing the cached result for unchanged inputs.
+
+    The result is a private copy; callers may modify it.
+    """
+    key = (
+        f"{builder.__module__}.{builder.__qualname__}",
+        frame_fingerprint(data),
+        _options_fingerprint(args, kwargs),
+    )
+    return get_figure_cache().get_or_build(key, lambda: builder(data, *args, **kwargs))
+
+def build_bar_chart(data, x, y, traces=None, layout=None, **px_kwargs):
+    """Plotly bar chart with optional trace/layout updates (cache-friendly builder)."""
+    fig = px.bar(data, x=x, y=y, **px_kwargs)
+    if traces:
+        fig.update_traces(**traces)
+    if layout:
+        fig.update_layout(**layout)
+    return fig
 
-def get_this_month_lead_performance(metric_4):
-    """Return detailed DataFrames substituting Customer with Qualified Lead."""
-    if metric_4.empty:
-        return {}
-    
-    team_results = {}
-    
-    for team_name, members in TEAM_MAPPING.items():
-        team_members_lower = [m.lower() for m in members]
-        if 'Course Owner' not in metric_4.columns: continue
-        team_df = metric_4[metric_4['Course Owner'].str.lower().isin(team_members_lower)].copy()
-        
-        if team_df.empty:
-            team_results[team_name] = pd.DataFrame()
-            continue
-            
-        # Ensure Qualified Lead column exists
-        if 'Qualified Lead' not in team_df.columns:
-            team_df['Qualified Lead'] = 0.0
-
-        # Initialize percentage columns
-        for col in ['Deal %', 'Qualified Lead %', 'Lead->Deal %', 'Lead->Qualified Lead %']:
-            if col not in team_df.columns:
-                team_df[col] = 0.0
-
-        for idx in team_df.index:
-            gt = team_df.loc[idx, 'Grand Total'] if 'Grand Total' in team_df.columns else 0
-            dl = team_df.loc[idx, 'Deal Leads'] if 'Deal Leads' in team_df.columns else 0
-            ql = team_df.loc[idx, 'Qualified Lead'] if 'Qualified Lead' in team_df.columns else 0
-
-            team_df.loc[idx, 'Deal %'] = (dl / gt * 100).round(2) if gt > 0 else 0
-            team_df.loc[idx, 'Qualified Lead %'] = (ql / dl * 100).round(2) if dl > 0 else 0
-            team_df.loc[idx, 'Lead->Deal %'] = (dl / gt * 100).round(2) if gt > 0 else 0
-            team_df.loc[idx, 'Lead->Qualified Lead %'] = (ql / gt * 100).round(2) if gt > 0 else 0
-
-        # Calculate Total Row
-        total_row = pd.Series(index=team_df.columns, dtype='object')
-        total_row['Course Owner'] = 'TOTAL'
-        
-        numeric_cols = ['Grand Total', 'Qualified Lead', 'Deal Leads', 'Hot', 'Warm', 'Cold']
-        for col in numeric_cols:
-            if col in team_df.columns:
-                total_row[col] = pd.to_numeric(team_df[col], errors='coerce').sum()
-        
-        # Recalculate percentages for Total row
-        grand_total = total_row.get('Grand Total', 0)
-        deal_leads = total_row.get('Deal Leads', 0)
-        qualified_leads = total_row.get('Qualified Lead', 0)
-        
-        total_row['Deal %'] = (deal_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        total_row['Qualified Lead %'] = (qualified_leads / deal_leads * 100).round(2) if deal_leads > 0 else 0
-        total_row['Lead->Deal %'] = (deal_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        total_row['Lead->Qualified Lead %'] = (qualified_leads / grand_total * 100).round(2) if grand_total > 0 else 0
-        
-        # Append Total Row
-        team_df_with_total = pd.concat([team_df, pd.DataFrame([total_row])], ignore_index=True)
-        
-        cols_to_show = [
-            'Course Owner', 
-            'Hot', 'Warm', 'Cold',
-            'Qualified Lead',
-            'Deal Leads', 'Deal %', 'Qualified Lead %',
-            'Lead->Qualified Lead %', 'Lead->Deal %', 'Grand Total'
-        ]
-        
-        final_cols = [c for c in cols_to_show if c in team_df_with_total.columns]
-        team_results[team_name] = team_df_with_total[final_cols]
-        
-    return team_results
+def build_pie_chart(data, values, names, traces=None, layout=None, **px_kwargs):
+    """Plotly pie chart with optional trace/layout updates (cache-friendly builder)."""
+    fig = px.pie(data, values=values, names=names, **px_kwargs)
+    if traces:
+        fig.update_traces(**traces)
+    if layout:
+        fig.update_layout(**layout)
+    return fig
+
+def build_heatmap_chart(data, layout=None, **px_kwargs):
+    """Plotly imshow heatmap with optional layout updates (cache-friendly builder)."""
+    fig = px.imshow(data, **px_kwargs)
+    if layout:
+        fig.update_layout(**layout)
+    return fig
 
 # [OK] NEW: Attractive Owner Visualization Functions
 def create_owner_performance_heatmap(metric_4):
@@ -1393,7 +1377,7 @@ def create_owner_performance_heatmap(metric_4):
     top_owners = metric_4.nlargest(15, 'Grand Total') if 'Grand Total' in metric_4.columns else metric_4.head(15)
     
     # Prepare data for heatmap - use key metrics
-    heatmap_data = top_owners[['Course Owner', 'Lead->Customer %', 'Lead->Deal %', 'Customer %']].copy()
+    heatmap_data = top_owners[['Course Owner', 'Lead->Customer %', 'Lead->Deal %', 'Customer %']]
     heatmap_data = heatmap_data.set_index('Course Owner')
     
     # Truncate owner names for better display
@@ -1408,10 +1392,10 @@ def create_owner_radar_chart(metric_4, selected_owners=None):
     
     # Select owners to compare
     if selected_owners and len(selected_owners) > 0:
-        compare_owners = metric_4[metric_4['Course Owner'].isin(selected_owners)].copy()
+        compare_owners = metric_4[metric_4['Course Owner'].isin(selected_owners)]
     else:
         # Default: top 3 owners by Grand Total
-        compare_owners = metric_4.nlargest(4, 'Grand Total').copy() if 'Grand Total' in metric_4.columns else metric_4.head(4).copy()
+        compare_owners = metric_4.nlargest(4, 'Grand Total') if 'Grand Total' in metric_4.columns else metric_4.head(4)
     
     if len(compare_owners) < 2:
         return None, None
@@ -1486,7 +1470,7 @@ def create_owner_scorecards(metric_4, top_n=6):
         return []
     
     # Get top owners by conversion rate
-    top_owners = metric_4.nlargest(top_n, 'Lead->Customer %').copy() if 'Lead->Customer %' in metric_4.columns else metric_4.head(top_n).copy()
+    top_owners = metric_4.nlargest(top_n, 'Lead->Customer %') if 'Lead->Customer %' in metric_4.columns else metric_4.head(top_n)
     
     scorecards = []
     color_classes = ['owner-scorecard-green', 'owner-scorecard-blue', 'owner-scorecard-orange', 
@@ -1544,9 +1528,9 @@ def create_owner_funnel_chart(metric_4, selected_owners=None):
         return None
     
     if selected_owners and len(selected_owners) > 0:
-        compare_data = metric_4[metric_4['Course Owner'].isin(selected_owners)].copy()
+        compare_data = metric_4[metric_4['Course Owner'].isin(selected_owners)]
     else:
-        compare_data = metric_4.nlargest(3, 'Grand Total').copy() if 'Grand Total' in metric_4.columns else metric_4.head(3).copy()
+        compare_data = metric_4.nlargest(3, 'Grand Total') if 'Grand Total' in metric_4.columns else metric_4.head(3)
     
     if compare_data.empty:
         return None
@@ -1574,2003 +1558,133 @@ def create_owner_funnel_chart(metric_4, selected_owners=None):
             x=values,
             textinfo="value+percent initial",
             opacity=0.8
-        ))
-    
-    fig.update_layout(
-        title="Owner Funnel Comparison",
-        funnelmode="stack",
-        height=500,
-        showlegend=True,
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=1.05
-        )
-    )
-    
-    return fig
-
-def create_owner_performance_grid(metric_4):
-    """Create a grid view of owner performance."""
-    if metric_4.empty:
-        return None
-    
-    # Sort by Lead->Customer %
-    performance_grid = metric_4.copy()
-    if 'Lead->Customer %' in performance_grid.columns:
-        performance_grid = performance_grid.sort_values('Lead->Customer %', ascending=False)
-    
-    # Select top 12 owners
-    performance_grid = performance_grid.head(12)
-    
-    # Create grid HTML
-    grid_html = """
-    <div style="display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 15px; margin: 20px 0;">
-    """
-    
-    for idx, (_, owner_row) in enumerate(performance_grid.iterrows()):
-        owner_name = owner_row['Course Owner']
-        conversion_rate = owner_row.get('Lead->Customer %', 0)
-        total_leads = owner_row.get('Grand Total', 0)
-        customers = owner_row.get('Customer', 0)
-        
-        # Determine color based on conversion rate
-        if conversion_rate >= 10:
-            bg_color = "linear-gradient(135deg, #d4edda, #c3e6cb)"
-            border_color = "#28a745"
-        elif conversion_rate >= 5:
-            bg_color = "linear-gradient(135deg, #fff3cd, #ffeaa7)"
-            border_color = "#ffc107"
-        else:
-            bg_color = "linear-gradient(135deg, #f8d7da, #f5c6cb)"
-            border_color = "#dc3545"
-        
-        # Rank indicator
-        rank = idx + 1
-        rank_emoji = "" if rank == 1 else "" if rank == 2 else "" if rank == 3 else f"#{rank}"
-        
-        grid_html += f"""
-        <div style="background: {bg_color}; border: 2px solid {border_color}; border-radius: 10px; padding: 15px;">
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                <div style="font-size: 1.5rem; font-weight: bold;">{rank_emoji}</div>
-                <div style="font-size: 1.8rem; font-weight: bold; color: #2c3e50;">{conversion_rate}%</div>
-            </div>
-            <div style="font-weight: bold; font-size: 1.1rem; margin-bottom: 5px;">{owner_name[:20]}{'...' if len(owner_name) > 20 else ''}</div>
-            <div style="display: flex; justify-content: space-between; font-size: 0.9rem; color: #666;">
-                <div> {total_leads:,} leads</div>
-                <div> {customers} customers</div>
-            </div>
-            <div style="margin-top: 10px; height: 8px; background: #e9ecef; border-radius: 4px; overflow: hidden;">
-                <div style="width: {min(conversion_rate, 100)}%; height: 100%; background: {border_color};"></div>
-            </div>
-        </div>
-        """
-    
-    grid_html += "</div>"
-    return grid_html
-
-# [OK] CRITICAL FIX: Fetch Deal Pipeline Stages to get correct Stage IDs
-@st.cache_data(ttl=86400)
-def fetch_deal_pipeline_stages(api_key):
-    """Fetch deal pipeline stages to get correct stage IDs (not labels)."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"{HUBSPOT_API_BASE}/crm/v3/pipelines/deals"
-    
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            pipelines = data.get("results", [])
-            
-            if not pipelines:
-                st.error(" No deal pipelines found in HubSpot")
-                return {}
-            
-            all_stages = {}
-            
-            for pipeline in pipelines:
-                pipeline_id = pipeline.get("id", "")
-                pipeline_label = pipeline.get("label", "")
-                stages = pipeline.get("stages", [])
-                
-                for stage in stages:
-                    stage_id = stage.get("id", "")
-                    stage_label = stage.get("label", "")
-                    stage_metadata = stage.get("metadata", {})
-                    probability = stage_metadata.get("probability", "0")
-                    
-                    all_stages[stage_id] = {
-                        "stage_id": stage_id,
-                        "stage_label": stage_label,
-                        "pipeline_id": pipeline_id,
-                        "pipeline_label": pipeline_label,
-                        "probability": probability,
-                        "full_info": f"{stage_label} (ID: {stage_id}, Probability: {probability})"
-                    }
-            
-            st.success(f"[OK] Loaded {len(all_stages)} deal stages from {len(pipelines)} pipelines")
-            return all_stages
-            
-        elif response.status_code == 403:
-            st.error("""
-             Missing required scope: crm.pipelines.read
-            Please update your API key permissions to include:
-            - crm.objects.deals.read
-            - crm.objects.contacts.read  
-            - crm.pipelines.read
-            """)
-            return {}
-        else:
-            st.error(f" Failed to fetch deal pipelines: {response.status_code}")
-            return {}
-            
-    except requests.exceptions.RequestException as e:
-        st.error(f" Error fetching deal pipelines: {e}")
-        return {}
-
-# [OK] Auto-detect Admission Confirmed stage ID
-def detect_admission_confirmed_stage(all_stages):
-    """Auto-detect Admission Confirmed stage from pipeline stages."""
-    target_labels = [
-        "admission confirmed",
-        "admission_confirmed", 
-        "confirmed",
-        "closed won",
-        "closedwon",
-        "won",
-        "customer"
-    ]
-    
-    detected_stages = []
-    
-    for stage_id, stage_info in all_stages.items():
-        stage_label = stage_info.get("stage_label", "").lower()
-        probability = stage_info.get("probability", "0")
-        
-        # [OK] Skip upselling stages - they should NOT count as customer stages
-        if 'upselling' in stage_label:
-            continue
-        
-        # [OK] NEW: Explicit check for known IDs
-        if stage_id in ['closedwon', '1884422889']:
-             detected_stages.append({
-                "stage_id": stage_id,
-                "stage_label": stage_info.get("stage_label"),
-                "probability": probability,
-                "pipeline": stage_info.get("pipeline_label"),
-                "match_reason": f"Explicit ID Match: {stage_id}"
-            })
-             continue
-
-        for target in target_labels:
-            if target in stage_label:
-                try:
-                    prob_float = float(probability)
-                    if prob_float >= 0.9:
-                        detected_stages.append({
-                            "stage_id": stage_id,
-                            "stage_label": stage_info.get("stage_label"),
-                            "probability": probability,
-                            "pipeline": stage_info.get("pipeline_label"),
-                            "match_reason": f"Label contains '{target}', probability: {probability}"
-                        })
-                        break
-                except:
-                    detected_stages.append({
-                        "stage_id": stage_id,
-                        "stage_label": stage_info.get("stage_label"),
-                        "probability": probability,
-                        "pipeline": stage_info.get("pipeline_label"),
-                        "match_reason": f"Label contains '{target}'"
-                    })
-                    break
-    
-    return detected_stages
-
-# [OK] CRITICAL FIX: UPDATED normalize_lead_status function
-def normalize_lead_status(raw_status, close_date=None, start_date=None, end_date=None):
-    """
-    Normalize lead status - ABSOLUTELY NO CUSTOMER HERE!
-    This function MUST NEVER return "Customer" for any lead status.
-    If close_date is provided and outside the start/end range, 
-    "Qualified Lead" will be downgraded to "Hot" or "Warm".
-    """
-    if not raw_status:
-        return "Unknown"
-    
-    status = str(raw_status).strip().lower()
-    
-    # [OK] CRITICAL FIX: "Closed Lost" is VALID, but "Closed Won" is CUSTOMER
-    # Must check for "Closed Lost" BEFORE the blocklist check
-    if "closed lost" in status or "closed_lost" in status:
-        return "Closed Lost"
-    
-    # [OK] FIRST: Check if this contains any customer keywords - BLOCK THEM!
-    for keyword in CUSTOMER_KEYWORDS_BLOCKLIST:
-        if keyword in status:
-            # [OK] SPECIAL: If Close Date is provided, it MUST BE in the reporting range
-            # to be counted as a "Qualified Lead". Otherwise downgrade it.
-            # This ensures only leads closed IN RANGE are counted as Qualified.
-            is_in_range = True
-            if close_date and start_date and end_date:
-                try:
-                    # Parse close_date if it's a string
-                    if isinstance(close_date, str):
-                        c_date = datetime.strptime(close_date[:10], "%Y-%m-%d").date()
-                    else:
-                        c_date = close_date
-                    
-                    if not (start_date <= c_date <= end_date):
-                        is_in_range = False
-                except:
-                    pass
-            
-            if is_in_range:
-                return "Qualified Lead"
-            
-            # This is PROBABLY a customer deal stage that leaked into contacts
-            if "hot" in status:
-                return "Hot"
-            elif "warm" in status:
-                return "Warm"
-            else:
-                return "Hot" # Fallback to Hot if out of date range
-    
-    # Now handle normal lead statuses
-    if "prospect" in status:
-        if "hot" in status:
-            return "Hot"
-        elif "warm" in status:
-            return "Warm"
-        elif "neutral" in status or "cold" in status:
-            return "Cold"
-        else:
-            return "Warm"
-    
-    if "not_connect" in status or "nc" in status.lower() or "not connected" in status:
-        return "Not Connected (NC)"
-    
-    if "not_interest" in status:
-        return "Not Interested"
-    
-    if "not_qualif" in status or "unqualif" in status:
-        return "Not Qualified"
-    
-    if "duplicate" in status or "junk" in status:
-        return "Duplicate"
-    
-    if "new" in status or "open" in status:
-        return "New Lead"
-    
-    if "qualified" in status:
-        return "Not Qualified"
-    
-    if "upselling" in status:
-        return "Upselling"
-    
-    if "course shifting" in status or "course_shifting" in status:
-        return "Course Shifting"
-    
-    if status in LEAD_STATUS_MAP:
-        return LEAD_STATUS_MAP[status]
-    
-    # If we get here and it's still a customer-like term, map to Not Qualified (as per user request)
-    if any(keyword in status for keyword in ["deal", "converted"]):
-        return "Not Qualified"
-    
-    return status.replace("_", " ").title()
-
-# [OK] CRITICAL FIX: Debug function to see what's being converted to "Customer"
-def debug_lead_status_conversion(df):
-    """Debug function to identify what's being incorrectly marked as Customer."""
-    if df.empty:
-        return
-    
-    # Find all rows where Lead Status is "Customer"
-    customer_rows = df[df['Lead Status'] == 'Customer']
-    
-    if not customer_rows.empty:
-        st.error(f" FOUND {len(customer_rows)} ROWS MARKED AS 'CUSTOMER' IN LEADS!")
-        st.write("This should be ZERO. Showing samples:")
-        
-        # Show raw values that got converted to Customer
-        st.write("**Raw Lead Status values that became 'Customer':**")
-        unique_raw_values = customer_rows['Lead Status Raw'].dropna().unique()
-        
-        for raw_val in unique_raw_values[:10]:  # Show first 10
-            st.write(f"- `{raw_val}` -> Customer")
-        
-        if len(unique_raw_values) > 10:
-            st.write(f"... and {len(unique_raw_values) - 10} more")
-        
-        # Show sample rows
-        st.write("**Sample rows with issue:**")
-        st.dataframe(customer_rows[['Full Name', 'Lead Status', 'Lead Status Raw', 'Course/Program']].head(10))
-        
-        # Let user manually fix these
-        st.markdown("""
-        <div class="data-fix-card">
-        <strong> QUICK FIX OPTION:</strong><br>
-        You can manually remap these incorrect "Customer" entries:
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Provide a quick fix option
-        if st.button(" Auto-fix 'Customer' in leads (map to 'Qualified Lead')"):
-            # Fix the dataframe
-            df_fixed = df.copy()
-            df_fixed['Lead Status'] = df_fixed['Lead Status'].replace('Customer', 'Qualified Lead')
-            
-            # Update session state
-            st.session_state.contacts_df = df_fixed
-            st.success("[OK] Fixed! 'Customer' entries in leads now mapped to 'Qualified Lead'")
-            st.rerun()
-
-def validate_api_key(api_key):
-    """Validate the HubSpot API key format."""
-    if not api_key:
-        return False, " API key is empty"
-    
-    if not api_key.startswith("pat-"):
-        return False, " Invalid API key format. Should start with 'pat-'"
-    
-    if len(api_key) < 20:
-        return False, " API key appears too short"
-    
-    return True, "[OK] API key format looks valid"
-
-def test_hubspot_connection(api_key):
-    """Test if the HubSpot API key is valid."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts?limit=1"
-    
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return True, "[OK] Connection successful! API key is valid."
-        elif response.status_code == 401:
-            error_data = response.json()
-            error_message = error_data.get('message', 'Unknown error')
-            
-            if "Invalid token" in error_message or "expired" in error_message:
-                return False, " API key is invalid or expired. Please check your API key."
-            elif "scope" in error_message.lower():
-                return False, f" Missing required scopes. Error: {error_message}"
-            else:
-                return False, f" Authentication failed. Status: {response.status_code}"
-        else:
-            return False, f" Connection failed. Status: {response.status_code}"
-    except requests.exceptions.RequestException as e:
-        return False, f" Connection error: {str(e)}"
-
-@st.cache_data(ttl=3600)
-def fetch_owner_mapping(api_key):
-    """Fetch ALL owner ID to name mapping with pagination."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    url = f"{HUBSPOT_API_BASE}/crm/v3/owners"
-    params = {"limit": 100}
-    mapping = {}
-    page_count = 0
-    total_owners = 0
-
-    try:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        while True:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
-
-            data = response.json()
-            owners = data.get("results", [])
-            
-            for owner in owners:
-                owner_id = str(owner.get("id", ""))
-
-                first_name = owner.get("firstName", "")
-                last_name = owner.get("lastName", "")
-                email = owner.get("email", "")
-
-                name = f"{first_name} {last_name}".strip() if first_name or last_name else email.split("@")[0] if email else f"Owner {owner_id}"
-                mapping[owner_id] = name
-
-            page_count += 1
-            total_owners += len(owners)
-            
-            if page_count <= 5:
-                progress_bar.progress(min(page_count / 5, 0.9))
-            status_text.text(f" Fetched {total_owners} owners (page {page_count})...")
-
-            paging = data.get("paging", {})
-            next_link = paging.get("next", {}).get("link")
-
-            if not next_link:
-                progress_bar.progress(1.0)
-                status_text.text(f"[OK] Owner mapping complete! Total: {total_owners} owners")
-                break
-
-            url = next_link
-            params = None
-            time.sleep(0.1)
-            
-    except requests.exceptions.RequestException as e:
-        st.warning(f" Partial owner mapping loaded. Error: {str(e)[:100]}")
-    except Exception as e:
-        st.warning(f" Could not fetch owner mapping: {str(e)[:100]}")
-
-    return mapping
-
-def date_to_hubspot_timestamp(date_obj, is_end_date=False):
-    """Convert date to HubSpot timestamp (milliseconds)."""
-    if isinstance(date_obj, str):
-        date_obj = datetime.strptime(date_obj, "%Y-%m-%d").date()
-    
-    if is_end_date:
-        dt = datetime.combine(date_obj, datetime.max.time())
-    else:
-        dt = datetime.combine(date_obj, datetime.min.time())
-    
-    dt_ist = IST.localize(dt)
-    dt_utc = dt_ist.astimezone(pytz.UTC)
-    return int(dt_utc.timestamp() * 1000)
-
-@st.cache_data(ttl=900, show_spinner=False)
-def fetch_hubspot_contacts_with_date_filter(api_key, date_field, start_date, end_date):
-    """Fetch ALL contacts from HubSpot with server-side date filtering (Cached 15 mins)."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts/search"
-    
-    all_properties = [
-        "hs_lead_status", "lead_status", 
-        "hubspot_owner_id", "hs_assigned_owner_id",
-        "course", "program", "product", "service", "offering",
-        "course_name", "program_name", "product_name",
-        "enquired_course", "interested_course", "course_interested",
-        "program_of_interest", "course_of_interest", "product_of_interest",
-        "which_course_do_you_prefer", "which_course_are_you_interested_in",
-        "select_your_preferred_course_mode", "which_type_of_oet_course__do_you_prefer",
-        "firstname", "lastname", "email", "phone", 
-        "createdate", "lastmodifieddate", "closedate", "hs_object_id",
-        "company", "jobtitle", "country", "amount", "total_revenue",
-        "hs_analytics_source_data_1", "refferal_lead_", "refferred_by", "servicecustomer",
-        "utm_campaign", "campaign_name", "hs_analytics_source_data_2"
-    ]
-    
-    all_contacts = []
-    
-    date_chunks = []
-    curr_start = start_date
-    while curr_start <= end_date:
-        curr_end = min(curr_start + timedelta(days=35), end_date)
-        date_chunks.append((curr_start, curr_end))
-        curr_start = curr_end + timedelta(days=1)
-        
-    def fetch_chunk(chunk_start, chunk_end):
-        chunk_contacts = []
-        start_timestamp = date_to_hubspot_timestamp(chunk_start, is_end_date=False)
-        safe_end_date = chunk_end + timedelta(days=1)
-        end_timestamp = date_to_hubspot_timestamp(safe_end_date, is_end_date=False)
-        
-        if date_field == "Created Date":
-            filter_groups = [{"filters": [
-                {"propertyName": "createdate", "operator": "GTE", "value": start_timestamp},
-                {"propertyName": "createdate", "operator": "LTE", "value": end_timestamp}
-            ]}]
-        elif date_field == "Last Modified Date":
-            filter_groups = [{"filters": [
-                {"propertyName": "lastmodifieddate", "operator": "GTE", "value": start_timestamp},
-                {"propertyName": "lastmodifieddate", "operator": "LTE", "value": end_timestamp}
-            ]}]
-        else:
-            filter_groups = [
-                {"filters": [
-                    {"propertyName": "createdate", "operator": "GTE", "value": start_timestamp},
-                    {"propertyName": "createdate", "operator": "LTE", "value": end_timestamp}
-                ]},
-                {"filters": [
-                    {"propertyName": "lastmodifieddate", "operator": "GTE", "value": start_timestamp},
-                    {"propertyName": "lastmodifieddate", "operator": "LTE", "value": end_timestamp}
-                ]}
-            ]
-        
-        after = None
-        while True:
-            body = {
-                "filterGroups": filter_groups,
-                "properties": all_properties,
-                "associations": ["owners"],
-                "limit": 100,
-                "sorts": [{
-                    "propertyName": "createdate" if date_field == "Created Date" else "lastmodifieddate",
-                    "direction": "ASCENDING"
-                }]
-            }
-            if after: body["after"] = after
-            
-            try:
-                response = requests.post(url, headers=headers, json=body, timeout=30)
-                if response.status_code == 429:
-                    time.sleep(3)
-                    continue
-                if response.status_code == 400:
-                    break
-                response.raise_for_status()
-                data = response.json()
-                batch = data.get("results", [])
-                if batch:
-                    chunk_contacts.extend(batch)
-                    after = data.get("paging", {}).get("next", {}).get("after")
-                    if not after:
-                        break
-                else:
-                    break
-            except Exception:
-                break
-        return chunk_contacts
-
-    try:
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_chunk = {executor.submit(fetch_chunk, start, end): (start, end) for start, end in date_chunks}
-            for future in as_completed(future_to_chunk):
-                all_contacts.extend(future.result())
-        return all_contacts, len(all_contacts)
-    except Exception as e:
-        st.error(f" Error fetching contacts: {e}")
-        return [], 0
-
-# [OK] Fetch DEALS using CORRECT Stage IDs
-@st.cache_data(ttl=900, show_spinner=False)
-def fetch_hubspot_deals(api_key, start_date, end_date, customer_stage_ids):
-    """Fetch DEALS from HubSpot using CORRECT stage IDs (Cached 15 mins)."""
-    if not customer_stage_ids:
-        st.error(" No customer stage IDs configured.")
-        return [], 0
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals/search"
-    
-    deal_properties = [
-        "dealname", "dealstage", "amount", "hubspot_owner_id", "closedate", "createdate",
-        "course", "program", "product", "service", "offering", "course_name", "program_name",
-        "partial_amount", "hs_v2_date_entered_2107527928", "hs_v2_date_entered_2171957962",
-        "hs_v2_date_entered_contractsent", "hs_v2_date_entered_presentationscheduled",
-        "hs_v2_date_entered_decisionmakerboughtin", "hs_analytics_source"
-    ]
-    
-    all_deals = []
-    
-    date_chunks = []
-    curr_start = start_date
-    while curr_start <= end_date:
-        curr_end = min(curr_start + timedelta(days=35), end_date)
-        date_chunks.append((curr_start, curr_end))
-        curr_start = curr_end + timedelta(days=1)
-        
-    def fetch_deal_chunk(chunk_start, chunk_end):
-        chunk_deals = []
-        start_timestamp = date_to_hubspot_timestamp(chunk_start, is_end_date=False)
-        end_timestamp = date_to_hubspot_timestamp(chunk_end, is_end_date=True)
-        
-        filter_groups = [{
-            "filters": [
-                {"propertyName": "dealstage", "operator": "IN", "values": customer_stage_ids},
-                {"propertyName": "closedate", "operator": "GTE", "value": start_timestamp},
-                {"propertyName": "closedate", "operator": "LTE", "value": end_timestamp}
-            ]
-        }]
-        
-        after = None
-        while True:
-            body = {
-                "filterGroups": filter_groups,
-                "properties": deal_properties,
-                "associations": ["owners", "contacts"],
-                "limit": 100,
-                "sorts": [{"propertyName": "closedate", "direction": "DESCENDING"}]
-            }
-            if after: body["after"] = after
-            
-            try:
-                response = requests.post(url, headers=headers, json=body, timeout=30)
-                if response.status_code == 429:
-                    time.sleep(3)
-                    continue
-                if response.status_code == 400: break
-                response.raise_for_status()
-                data = response.json()
-                
-                batch = data.get("results", [])
-                if batch:
-                    chunk_deals.extend(batch)
-                    after = data.get("paging", {}).get("next", {}).get("after")
-                    if not after: break
-                else: break
-            except Exception:
-                break
-        return chunk_deals
-
-    try:
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_chunk = {executor.submit(fetch_deal_chunk, start, end): (start, end) for start, end in date_chunks}
-            for future in as_completed(future_to_chunk):
-                all_deals.extend(future.result())
-
-        if all_deals:
-            try:
-                assoc_url = f"{HUBSPOT_API_BASE}/crm/v3/associations/deals/contacts/batch/read"
-                deal_contact_map = {}
-                deal_ids = [str(d.get("id")) for d in all_deals if d.get("id")]
-                
-                def fetch_associations(batch_ids):
-                    assoc_body = {"inputs": [{"id": did} for did in batch_ids]}
-                    assoc_resp = requests.post(assoc_url, headers=headers, json=assoc_body, timeout=30)
-                    if assoc_resp.status_code in [200, 207]:
-                        return assoc_resp.json().get("results", [])
-                    return []
-
-                batches = [deal_ids[i:i+100] for i in range(0, len(deal_ids), 100)]
-                
-                with ThreadPoolExecutor(max_workers=5) as assoc_exec:
-                    for result_batch in assoc_exec.map(fetch_associations, batches):
-                        for result in result_batch:
-                            from_id = str(result.get("from", {}).get("id"))
-                            to_items = result.get("to", [])
-                            if to_items:
-                                contact_id = str(to_items[0].get("id"))
-                                if from_id not in deal_contact_map:
-                                    deal_contact_map[from_id] = []
-                                deal_contact_map[from_id].append({"id": contact_id})
-                
-                for deal in all_deals:
-                    deal_id = str(deal.get("id"))
-                    if deal_id in deal_contact_map:
-                        if "associations" not in deal: deal["associations"] = {}
-                        if "contacts" not in deal["associations"]: deal["associations"]["contacts"] = {"results": []}
-                        for c in deal_contact_map[deal_id]:
-                            deal["associations"]["contacts"]["results"].append({"id": c["id"]})
-                            
-            except Exception as e:
-                pass
-                
-        return all_deals, len(all_deals)
-    except Exception as e:
-        st.error(f" Unexpected error fetching deals: {e}")
-        return [], 0
-
-# [OK] NEW: Fetch partial payment deals that entered partial stage in current month
-@st.cache_data(ttl=900, show_spinner=False)
-def fetch_partial_payment_deals(api_key, start_date, end_date):
-    """Fetch deals that ENTERED partial payment stage during the reporting period."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals/search"
-    
-    ist = pytz.timezone('Asia/Kolkata')
-    start_utc = datetime.combine(start_date, datetime.min.time())
-    start_utc = ist.localize(start_utc).astimezone(pytz.UTC).strftime('%Y-%m-%dT%H:%M:%S.000Z')
-    end_utc = datetime.combine(end_date, datetime.max.time())
-    end_utc = ist.localize(end_utc).astimezone(pytz.UTC).strftime('%Y-%m-%dT%H:%M:%S.000Z')
-    
-    properties = [
-        "dealname", "dealstage", "amount", "partial_amount",
-        "hubspot_owner_id", "closedate", "createdate",
-        "course", "program", "course_name", "program_name",
-        "hs_v2_date_entered_2107527928", "hs_v2_date_entered_2171957962",
-    ]
-    
-    all_deals = []
-    
-    for stage_id in PARTIAL_STAGE_IDS:
-        prop_name = f"hs_v2_date_entered_{stage_id}"
-        after = None
-        while True:
-            body = {
-                "filterGroups": [{
-                    "filters": [
-                        {"propertyName": prop_name, "operator": "GTE", "value": start_utc},
-                        {"propertyName": prop_name, "operator": "LTE", "value": end_utc}
-                    ]
-                }],
-                "properties": properties,
-                "limit": 100,
-            }
-            if after:
-                body["after"] = after
-            try:
-                response = requests.post(url, headers=headers, json=body, timeout=30)
-                if response.status_code == 429:
-                    time.sleep(3)
-                    continue
-                if response.status_code == 400:
-                    break
-                response.raise_for_status()
-                data = response.json()
-                batch = data.get("results", [])
-                all_deals.extend(batch)
-                after = data.get("paging", {}).get("next", {}).get("after")
-                if not after:
-                    break
-            except Exception:
-                break
-    
-    return all_deals
-
-def calculate_partial_revenue(partial_deals, admission_deal_ids, owner_mapping, start_date, end_date):
-    """Calculate revenue from partial payment deals that are NOT yet admission confirmed.
-    Only counts partial_amount (not full amount) and does NOT add to customer count."""
-    
-    seen_ids = set()
-    partial_online_total = 0
-    partial_offline_total = 0
-    partial_online_count = 0
-    partial_offline_count = 0
-    
-    for deal in partial_deals:
-        deal_id = str(deal.get("id"))
-        
-        # Skip if already counted in Admission Confirmed
-        if deal_id in admission_deal_ids:
-            continue
-        # Skip duplicates
-        if deal_id in seen_ids:
-            continue
-        seen_ids.add(deal_id)
-        
-        props = deal.get("properties", {})
-
-        # [EXCLUDED] Skip Vacation Batch partial payment deals
-        deal_name_raw = str(props.get("dealname", "") or "").lower().strip()
-        if any(kw in deal_name_raw for kw in EXCLUDED_DEAL_KEYWORDS):
-            continue
-
-        owner_id = str(props.get("hubspot_owner_id", ""))
-        owner_name = owner_mapping.get(owner_id, f"Unknown ({owner_id})")
-        if owner_name in EXCLUDED_OWNERS:
-            continue
-        
-        partial_amount_str = props.get("partial_amount", "0")
-        partial_amount = 0
-        if partial_amount_str:
-            try:
-                partial_amount = float(str(partial_amount_str).replace(",", ""))
-            except:
-                partial_amount = 0
-        
-        if partial_amount <= 0:
-            continue
-        
-        # Determine which pipeline
-        partial_ts_online = props.get("hs_v2_date_entered_2107527928", "")
-        partial_ts_offline = props.get("hs_v2_date_entered_2171957962", "")
-        
-        partial_ts = partial_ts_online or partial_ts_offline
-        if not partial_ts:
-            continue
-        
-        try:
-            partial_dt = datetime.fromisoformat(partial_ts.replace('Z', '+00:00'))
-            if start_date.month <= partial_dt.month and partial_dt.year == start_date.year:
-                if partial_ts_online:
-                    partial_online_total += partial_amount
-                    partial_online_count += 1
-                else:
-                    partial_offline_total += partial_amount
-                    partial_offline_count += 1
-        except:
-            pass
-    
-    return {
-        'online_total': partial_online_total,
-        'offline_total': partial_offline_total,
-        'online_count': partial_online_count,
-        'offline_count': partial_offline_count,
-        'total': partial_online_total + partial_offline_total,
-        'count': partial_online_count + partial_offline_count
-    }
-
-def detect_key_stages(all_stages):
-    """
-    Dynamically identify Stage IDs for Hot, Warm, Cold.
-    STRICTLY returns specific "Admission Confirmed" IDs for Online/Offline.
-    """
-    stage_map = {}
-
-    # Strict Admission Confirmed IDs (Online: closedwon, Offline: 1884422889)
-    # We do NOT want "Partial Payment" or other weird won stages unless explicitly requested.
-    stage_map['Admission Confirmed'] = ['closedwon', '1884422889']
-
-    for stage_id, stage_info in all_stages.items():
-        label = stage_info.get("stage_label", "").lower()
-        
-        # Hot
-        if "hot" in label:
-            stage_map['Hot'] = stage_id
-        
-        # Warm
-        elif "warm" in label:
-            stage_map['Warm'] = stage_id
-            
-        # Cold
-        elif "cold" in label:
-            stage_map['Cold'] = stage_id
-            
-    return stage_map
-
-def get_hubspot_iso_timestamp(date_obj, is_end_date=False):
-    """
-    Convert a local date (IST) to a HubSpot-compatible UTC ISO timestamp string.
-    """
-    if not date_obj:
-        return None
-        
-    # Define IST timezone
-    ist = pytz.timezone('Asia/Kolkata')
-    
-    if is_end_date:
-        # Create datetime at end of day IST
-        dt = datetime.combine(date_obj, datetime.max.time())
-        dt_ist = ist.localize(dt)
-    else:
-        # Create datetime at start of day IST
-        dt = datetime.combine(date_obj, datetime.min.time())
-        dt_ist = ist.localize(dt)
-        
-    # Convert to UTC
-    dt_utc = dt_ist.astimezone(pytz.UTC)
-    
-    # Format as ISO 8601 string with milliseconds and Z
-    return dt_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-
-@st.cache_data(ttl=900, show_spinner=False)
-def fetch_team_performance_deals(api_key, start_date, end_date, stage_ids_map):
-    """
-    Fetch deals using 3 SEPARATE queries for Hot, Warm, Cold in parallel chunks.
-    """
-    if not stage_ids_map: return [], 0
-        
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals/search"
-    all_deals_map = {}
-    
-    properties = [
-        "dealname", "dealstage", "amount", "hubspot_owner_id", "closedate", "createdate",
-        "course", "program", "program_name", "course_name"
-    ]
-    for stage_name, stage_id in stage_ids_map.items():
-        properties.append(f"hs_v2_date_entered_{stage_id}")
-
-    date_chunks = []
-    curr_start = start_date
-    while curr_start <= end_date:
-        curr_end = min(curr_start + timedelta(days=35), end_date)
-        date_chunks.append((curr_start, curr_end))
-        curr_start = curr_end + timedelta(days=1)
-        
-    def fetch_cohort(prop, operator1, val1, operator2, val2):
-        cohort_deals = []
-        try:
-            after = None
-            while True:
-                body = {
-                    "filterGroups": [{
-                        "filters": [
-                            {"propertyName": prop, "operator": operator1, "value": val1},
-                            {"propertyName": prop, "operator": operator2, "value": val2}
-                        ]
-                    }],
-                    "properties": properties,
-                    "limit": 100
-                }
-                if after: body['after'] = after
-                response = requests.post(url, headers=headers, json=body, timeout=30)
-                if response.status_code == 429:
-                    time.sleep(2)
-                    continue
-                if response.status_code == 400: break
-                response.raise_for_status()
-                data = response.json()
-                cohort_deals.extend(data.get('results', []))
-                
-                after = data.get('paging', {}).get('next', {}).get('after')
-                if not after: break
-            return cohort_deals
-        except Exception as e:
-            return []
-
-    def fetch_all_cohorts_for_chunk(chunk_start, chunk_end):
-        start_utc = get_hubspot_iso_timestamp(chunk_start, is_end_date=False)
-        end_utc = get_hubspot_iso_timestamp(chunk_end, is_end_date=True)
-        results = []
-        if 'Hot' in stage_ids_map:
-            results.extend(fetch_cohort(f"hs_v2_date_entered_{stage_ids_map['Hot']}", "GTE", start_utc, "LTE", end_utc))
-        if 'Warm' in stage_ids_map:
-            results.extend(fetch_cohort(f"hs_v2_date_entered_{stage_ids_map['Warm']}", "GTE", start_utc, "LTE", end_utc))
-        if 'Cold' in stage_ids_map:
-            results.extend(fetch_cohort(f"hs_v2_date_entered_{stage_ids_map['Cold']}", "GTE", start_utc, "LTE", end_utc))
-        return results
-
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for chunk_results in executor.map(lambda c: fetch_all_cohorts_for_chunk(c[0], c[1]), date_chunks):
-            for d in chunk_results:
-                all_deals_map[d['id']] = d
-
-    unique_deals = list(all_deals_map.values())
-    return unique_deals, len(unique_deals)
-
-@st.cache_data(show_spinner=False)
-def process_contacts_data(contacts, owner_mapping=None, api_key=None, start_date=None, end_date=None):
-    """Process raw contacts data into a clean DataFrame - ABSOLUTELY NO CUSTOMER HERE."""
-    if not contacts:
-        return pd.DataFrame()
-    
-    processed_data = []
-    
-    for contact in contacts:
-        properties = contact.get("properties", {})
-
-        # Extract course information
-        course_info = ""
-        course_fields = [
-            "course", "program", "product", "service", "offering",
-            "course_name", "program_name", "product_name",
-            "enquired_course", "interested_course", "course_interested",
-            "program_of_interest", "course_of_interest", "product_of_interest",
-            "which_course_do_you_prefer", "which_course_are_you_interested_in",
-            "select_your_preferred_course_mode", "which_type_of_oet_course__do_you_prefer"
-        ]
-
-        for field in course_fields:
-            if field in properties and properties[field] and str(properties[field]).strip():
-                course_info = properties[field]
-                break
-
-        # [EXCLUDED] Skip ALL Vacation Batch contacts â€” no leads, no qualified leads, nothing
-        if any(kw in str(course_info).lower().strip() for kw in EXCLUDED_DEAL_KEYWORDS):
-            continue
-
-        # [EXCLUDED] Also check raw property values directly in case course_info missed it
-        _all_course_vals = " ".join(
-            str(properties.get(f, "")).lower()
-            for f in course_fields
-        )
-        if any(kw in _all_course_vals for kw in EXCLUDED_DEAL_KEYWORDS):
-            continue
-        
-        # Owner ID extraction
-        owner_id = (
-            properties.get("hubspot_owner_id")
-            or properties.get("hs_assigned_owner_id")
-            or ""
-        )
-        
-        if not owner_id:
-            associations = contact.get("associations", {})
-            owners = associations.get("owners", {}).get("results", [])
-            if owners:
-                owner_id = str(owners[0].get("id", ""))
-        
-        owner_id = str(owner_id)
-        
-        # Map owner ID to name
-        owner_name = ""
-        if owner_mapping:
-            if owner_id in owner_mapping:
-                owner_name = owner_mapping[owner_id]
-            else:
-                owner_name = f" Unassigned ({owner_id})" if owner_id else " Unassigned"
-        else:
-            owner_name = owner_id
-        
-        # [OK] CRITICAL: Get raw lead status
-        raw_lead_status = properties.get("hs_lead_status", "") or properties.get("lead_status", "")
-        
-        # [OK] CRITICAL: Normalize lead status - WILL NEVER RETURN "CUSTOMER"
-        # Passing dates to ensure intersection check (Created Range AND Close Range)
-        close_date_raw = properties.get("closedate", "")
-        lead_status = normalize_lead_status(raw_lead_status, close_date=close_date_raw, start_date=start_date, end_date=end_date)
-        
-        # Create full name
-        full_name = f"{properties.get('firstname', '')} {properties.get('lastname', '')}".strip()
-        
-        # [OK] NEW: CORRECTLY GET AMOUNT OR TOTAL REVENUE
-        amount_val = properties.get("amount")
-        total_rev_val = properties.get("total_revenue")
-        
-        # Use total_revenue if it exists and is not None, else use amount if it exists
-        raw_val = total_rev_val if total_rev_val else amount_val
-        
-        try:
-            parsed_amount = float(str(raw_val).replace(",", "")) if raw_val else 0.0
-        except ValueError:
-            parsed_amount = 0.0
-            
-        # [OK] NEW: Extract Campaign
-        campaign = (
-            properties.get("utm_campaign") or 
-            properties.get("campaign_name") or 
-            properties.get("hs_analytics_source_data_2") or 
-            "Unknown"
-        )
-        if not campaign or str(campaign).strip() == "":
-            campaign = "Unknown"
-            
-        # [OK] NEW: Extract Grouped Course
-        c_lower = str(course_info).lower()
-        if "oet" in c_lower:
-            course_grouped = "OET"
-        elif "german" in c_lower:
-            course_grouped = "German"
-        elif "ielts" in c_lower:
-            course_grouped = "IELTS"
-        elif "haad" in c_lower:
-            course_grouped = "HAAD"
-        elif "dha" in c_lower:
-            course_grouped = "DHA"
-        elif "prometric" in c_lower:
-            course_grouped = "Prometric"
-        elif "pte" in c_lower:
-            course_grouped = "PTE"
-        else:
-            course_grouped = str(course_info).strip() if course_info and str(course_info).strip() else "Unknown"
-            
-        processed_data.append({
-            "ID": contact.get("id", ""),
-            "Full Name": full_name,
-            "Email": properties.get("email", ""),
-            "Phone": properties.get("phone", ""),
-            "Company": properties.get("company", ""),
-            "Job Title": properties.get("jobtitle", ""),
-            "Country": properties.get("country", ""),
-            "Course/Program": str(course_info).strip() if course_info and str(course_info).strip() else "Unknown",
-            "Course Owner": owner_name,
-            "Lead Status": lead_status,  # [OK] NO CUSTOMER HERE
-            "Created Date": properties.get("createdate", ""),
-            "Close Date": properties.get("closedate", ""),
-            "Lead Status Raw": raw_lead_status,
-            "Owner ID": owner_id,
-            "Amount": parsed_amount,
-            "Traffic Source Drill-Down 1": properties.get("hs_analytics_source_data_1", ""),
-            "Referral Lead": properties.get("refferal_lead_", ""),
-            "Referred By": properties.get("refferred_by", ""),
-            "Service-Customer": properties.get("servicecustomer", ""),
-            "Campaign": campaign,
-            "Course Grouped": course_grouped
-        })
-    
-    df = pd.DataFrame(processed_data)
-    
-    # [OK] No longer filtering out "CUSTOMER_IGNORE" as we map them to "Qualified Lead"
-    if not df.empty:
-        initial_count = len(df)
-        pass  # Kept structure to minimize diff, but logic is effectively disabled for now
-    
-    return df
-
-@st.cache_data(show_spinner=False)
-def process_deals_as_customers(deals, owner_mapping=None, api_key=None, all_stages=None, start_date=None):
-    """Process raw deals data into customer DataFrame."""
-    if not deals:
-        return pd.DataFrame()
-    
-    processed_data = []
-    stage_label_map = {}
-    
-    if all_stages:
-        stage_label_map = {stage_id: info.get("stage_label", stage_id) 
-                          for stage_id, info in all_stages.items()}
-    
-    for deal in deals:
-        properties = deal.get("properties", {})
-
-        # [EXCLUDED] Skip Vacation Batch deals - must not appear anywhere in counts or revenue
-        deal_name_raw = str(properties.get("dealname", "") or "").lower().strip()
-        if any(kw in deal_name_raw for kw in EXCLUDED_DEAL_KEYWORDS):
-            continue
-        
-        # Extract course information from deal
-        course_info = ""
-        course_fields = [
-            "course", "program", "product", "service", "offering",
-            "course_name", "program_name", "product_name"
-        ]
-        
-        for field in course_fields:
-            if field in properties and properties[field] and str(properties[field]).strip():
-                course_info = properties[field]
-                break
-
-        # [EXCLUDED] Also skip if course_info itself is a vacation batch keyword
-        if any(kw in str(course_info).lower().strip() for kw in EXCLUDED_DEAL_KEYWORDS):
-            continue
-        
-        # Owner ID extraction from deal
-        owner_id = properties.get("hubspot_owner_id", "")
-        
-        if not owner_id:
-            associations = deal.get("associations", {})
-            owners = associations.get("owners", {}).get("results", [])
-            if owners:
-                owner_id = str(owners[0].get("id", ""))
-
-        # [OK] NEW: Extract ALL associated contact IDs
-        associated_contact_ids = []
-        associations = deal.get("associations", {})
-        contacts_assoc = associations.get("contacts", {}).get("results", [])
-        if contacts_assoc:
-            associated_contact_ids = [str(c.get("id", "")) for c in contacts_assoc]
-        
-        owner_id = str(owner_id)
-        
-        # Map owner ID to name
-        owner_name = ""
-        if owner_mapping:
-            if owner_id in owner_mapping:
-                owner_name = owner_mapping[owner_id]
-            else:
-                owner_name = f" Unassigned ({owner_id})" if owner_id else " Unassigned"
-        else:
-            owner_name = owner_id
-        
-        # [OK] Skip excluded owners - deals from these owners are completely excluded
-        if owner_name in EXCLUDED_OWNERS:
-            continue
-        
-        # Parse amount
-        amount = 0
-        amount_str = properties.get("amount", "0")
-        if amount_str:
-            try:
-                amount = float(str(amount_str).replace(",", ""))
-            except:
-                amount = 0
-        
-        # [OK] Partial Payment Deduction Logic
-        partial_amount = 0
-        partial_amount_str = properties.get("partial_amount", "0")
-        if partial_amount_str:
-            try:
-                partial_amount = float(str(partial_amount_str).replace(",", ""))
-            except:
-                partial_amount = 0
-        
-        if partial_amount > 0:
-            # Check partial payment timestamps (Online and Offline pipeline)
-            partial_ts_online = properties.get("hs_v2_date_entered_2107527928", "")
-            partial_ts_offline = properties.get("hs_v2_date_entered_2171957962", "")
-            partial_ts = partial_ts_online or partial_ts_offline
-            
-            if partial_ts:
-                try:
-                    from datetime import datetime
-                    # Parse the HubSpot timestamp
-                    if isinstance(partial_ts, str) and partial_ts:
-                        partial_dt = datetime.fromisoformat(partial_ts.replace('Z', '+00:00'))
-                        start_ts = datetime.combine(start_date, datetime.min.time()).replace(tzinfo=partial_dt.tzinfo) if hasattr(partial_dt, 'tzinfo') and partial_dt.tzinfo else datetime.combine(start_date, datetime.min.time())
-                        
-                        # Deduct if partial payment was before reporting period start
-                        if partial_dt < start_ts:
-                            amount = amount - partial_amount
-                except Exception:
-                    pass  # If timestamp parsing fails, use full amount
-        
-        # Get close date
-        close_date = properties.get("closedate", "")
-        
-        # Get deal stage (ID)
-        deal_stage_id = properties.get("dealstage", "")
-        
-        # Convert stage ID to label if possible
-        deal_stage_label = stage_label_map.get(deal_stage_id, deal_stage_id)
-        
-        # [OK] NEW: Extract Stage History
-        date_entered_hot = properties.get("hs_v2_date_entered_contractsent", "")
-        date_entered_warm = properties.get("hs_v2_date_entered_presentationscheduled", "")
-        date_entered_cold = properties.get("hs_v2_date_entered_decisionmakerboughtin", "")
-        
-        source = properties.get("hs_analytics_source", "")
-
-        processed_data.append({
-            "Customer ID": deal.get("id", ""),
-            "Deal Name": properties.get("dealname", ""),
-            "Course/Program": course_info,
-            "Course Owner": owner_name,
-            "Amount": amount,
-            "Close Date": close_date,
-            "Deal Stage ID": deal_stage_id,
-            "Deal Stage Label": deal_stage_label,
-            "Associated Contact IDs": associated_contact_ids, # [OK] NEW: Link to contact
-            "Is Customer": 1,  # [OK] ALL these deals are customers
-            "Was_Hot": 1 if date_entered_hot else 0,
-            "Was_Warm": 1 if date_entered_warm else 0,
-            "Was_Cold": 1 if date_entered_cold else 0,
-            "Analytics Source": source
-        })
-    
-    df = pd.DataFrame(processed_data)
-    
-    return df
-
-def process_team_performance_metrics(deals, start_date, end_date, stage_ids_map, owner_mapping):
-    """
-    Process deals strictly based on 'Date Entered Stage' using separate ISO timestamps.
-    Implements DIRECT CONVERSION logic: Hot->Customer only if Hot was the LAST stage before Admission Confirmed.
-    """
-    if not deals:
-         return pd.DataFrame(columns=['Course Owner', 'Hot', 'Warm', 'Cold', 'Hot_Customer', 'Warm_Customer', 'Cold_Customer', 'HOT-CUSTOMER CONVERSION', 'WARM-CUSTOMER CONVERSION', 'COLD-CUSTOMER CONVERSION'])
-
-    # Convert start/end to UTC ISO strings for comparison
-    start_iso = get_hubspot_iso_timestamp(start_date, is_end_date=False)
-    end_iso = get_hubspot_iso_timestamp(end_date, is_end_date=True)
-    
-    owner_metrics = {}
-    
-    hot_id = stage_ids_map.get('Hot')
-    warm_id = stage_ids_map.get('Warm')
-    cold_id = stage_ids_map.get('Cold')
-    
-    # Strict list of Won IDs
-    won_ids = stage_ids_map.get('Admission Confirmed', [])
-    if isinstance(won_ids, str):
-        won_ids = [won_ids]
-    
-    for deal in deals:
-        props = deal.get('properties', {})
-
-        # [EXCLUDED] Skip Vacation Batch deals from team performance metrics
-        deal_name_raw = str(props.get("dealname", "") or "").lower().strip()
-        if any(kw in deal_name_raw for kw in EXCLUDED_DEAL_KEYWORDS):
-            continue
-
-        owner_id = props.get('hubspot_owner_id')
-        owner_name = owner_mapping.get(owner_id, "Unknown Owner") if owner_mapping else str(owner_id)
-        current_stage = props.get('dealstage')
-        
-        if owner_name not in owner_metrics:
-            owner_metrics[owner_name] = {
-                'Hot': 0, 'Warm': 0, 'Cold': 0,
-                'Hot_Customer': 0, 'Warm_Customer': 0, 'Cold_Customer': 0
-            }
-            
-        def is_in_range_iso(val):
-            if not val: return False
-            return start_iso <= val <= end_iso
-
-        # Get Entry Dates using v2 properties
-        date_hot = props.get(f"hs_v2_date_entered_{hot_id}") if hot_id else None
-        date_warm = props.get(f"hs_v2_date_entered_{warm_id}") if warm_id else None
-        date_cold = props.get(f"hs_v2_date_entered_{cold_id}") if cold_id else None
-        
-        # Check basic cohort counts (Entered Stage in Range)
-        hot_in_range = is_in_range_iso(date_hot)
-        warm_in_range = is_in_range_iso(date_warm)
-        cold_in_range = is_in_range_iso(date_cold)
-        
-        if hot_in_range:
-            owner_metrics[owner_name]['Hot'] += 1
-        if warm_in_range:
-            owner_metrics[owner_name]['Warm'] += 1
-        if cold_in_range:
-            owner_metrics[owner_name]['Cold'] += 1
-            
-        # DIRECT CONVERSION LOGIC
-        # Only check if currently in a Won stage (Admission Confirmed)
-        if current_stage in won_ids:
-            # Determine "Latest Stage" among Hot/Warm/Cold
-            # We compare the entry timestamps. The largest timestamp is the latest.
-            
-            stages_with_dates = []
-            if date_hot: stages_with_dates.append(('Hot', date_hot))
-            if date_warm: stages_with_dates.append(('Warm', date_warm))
-            if date_cold: stages_with_dates.append(('Cold', date_cold))
-            
-            if stages_with_dates:
-                # Sort by date descending (latest first)
-                stages_with_dates.sort(key=lambda x: x[1], reverse=True)
-                latest_stage = stages_with_dates[0][0]
-                
-                # Attribute conversion to the latest stage IF that stage's entry was in range
-                if latest_stage == 'Hot' and hot_in_range:
-                    owner_metrics[owner_name]['Hot_Customer'] += 1
-                elif latest_stage == 'Warm' and warm_in_range:
-                    owner_metrics[owner_name]['Warm_Customer'] += 1
-                elif latest_stage == 'Cold' and cold_in_range:
-                    owner_metrics[owner_name]['Cold_Customer'] += 1
-                     
-    # Create DataFrame
-    data = []
-    for owner, metrics in owner_metrics.items():
-        row = {'Course Owner': owner}
-        row.update(metrics)
-        
-        # Calculate percentages
-        row['HOT-CUSTOMER CONVERSION'] = (row['Hot_Customer'] / row['Hot'] * 100) if row['Hot'] > 0 else 0
-        row['WARM-CUSTOMER CONVERSION'] = (row['Warm_Customer'] / row['Warm'] * 100) if row['Warm'] > 0 else 0
-        row['COLD-CUSTOMER CONVERSION'] = (row['Cold_Customer'] / row['Cold'] * 100) if row['Cold'] > 0 else 0
-        
-        data.append(row)
-        
-    df = pd.DataFrame(data)
-    
-    # Sort by total Hot desc
-    if not df.empty and 'Hot' in df.columns:
-        df = df.sort_values('Hot', ascending=False)
-        
-    return df
-
-def group_team_performance_metrics(performance_df):
-    """
-    Split the full performance DataFrame into team-specific DataFrames.
-    Adds a TOTAL row to each team DataFrame.
-    """
-    if performance_df.empty:
-        return {}
-        
-    team_results = {}
-    
-    # Ensure all columns exist
-    cols = ['Course Owner', 'Hot', 'Warm', 'Cold', 
-            'Hot_Customer', 'Warm_Customer', 'Cold_Customer',
-            'HOT-CUSTOMER CONVERSION', 'WARM-CUSTOMER CONVERSION', 'COLD-CUSTOMER CONVERSION',
-            'Customer Count', 'Customer Revenue']
-            
-    for col in cols:
-        if col not in performance_df.columns:
-            performance_df[col] = 0
-            
-    for team_name, members in TEAM_MAPPING.items():
-        # Case insensitive matching
-        team_members_lower = [m.lower() for m in members]
-        
-        # Filter data
-        team_df = performance_df[performance_df['Course Owner'].str.lower().isin(team_members_lower)].copy()
-        
-        if team_df.empty:
-            continue
-            
-        # Calculate Total Row
-        total_row = {'Course Owner': 'TOTAL'}
-        
-        # Sum counts
-        sum_cols = ['Hot', 'Warm', 'Cold', 'Hot_Customer', 'Warm_Customer', 'Cold_Customer', 
-                    'Customer Count', 'Customer Revenue']
-        for col in sum_cols:
-            if col in team_df.columns:
-                total_row[col] = team_df[col].sum()
-            
-        # Recalculate percentages for TOTAL row
-        total_hot = total_row.get('Hot', 0)
-        total_hot_cust = total_row.get('Hot_Customer', 0)
-        total_row['HOT-CUSTOMER CONVERSION'] = (total_hot_cust / total_hot * 100) if total_hot > 0 else 0
-        
-        total_warm = total_row.get('Warm', 0)
-        total_warm_cust = total_row.get('Warm_Customer', 0)
-        total_row['WARM-CUSTOMER CONVERSION'] = (total_warm_cust / total_warm * 100) if total_warm > 0 else 0
-        
-        total_cold = total_row.get('Cold', 0)
-        total_cold_cust = total_row.get('Cold_Customer', 0)
-        total_row['COLD-CUSTOMER CONVERSION'] = (total_cold_cust / total_cold * 100) if total_cold > 0 else 0
-        
-        # Append total row
-        total_df = pd.DataFrame([total_row])
-        team_df = pd.concat([team_df, total_df], ignore_index=True)
-        
-        team_results[team_name] = team_df
-        
-    return team_results
-
-def create_metric_1(df):
-    """METRIC 1: Course x Lead Status - NO CUSTOMER"""
-    if df.empty or 'Course/Program' not in df.columns:
-        return pd.DataFrame()
-    
-    df_course = df[df['Course/Program'].notna() & (df['Course/Program'] != '')].copy()
-    
-    if df_course.empty:
-        return pd.DataFrame()
-    
-    df_course['Course_Clean'] = df_course['Course/Program'].str.strip()
-    
-    pivot_counts = pd.pivot_table(df_course, index='Course_Clean', columns='Lead Status', values='ID', aggfunc='count', fill_value=0)
-    pivot_amounts = pd.pivot_table(df_course[df_course['Lead Status'] == 'Qualified Lead'], index='Course_Clean', values='Amount', aggfunc='sum', fill_value=0)
-    
-    pivot = pivot_counts.reset_index().rename(columns={'Course_Clean': 'Course'})
-    if not pivot_amounts.empty:
-        pivot = pd.merge(pivot, pivot_amounts.rename(columns={'Amount': 'Qualified Lead Amount'}).reset_index().rename(columns={'Course_Clean': 'Course'}), on='Course', how='left').fillna(0)
-    else:
-        pivot['Qualified Lead Amount'] = 0
-    
-    if len(pivot.columns) > 1:
-        status_cols = [col for col in pivot.columns if col != 'Course']
-        pivot['Total'] = pivot[status_cols].sum(axis=1)
-    
-    return pivot
-
-def create_metric_2(df):
-    """METRIC 2: Course Owner x Lead Status - NO CUSTOMER"""
-    if df.empty or 'Course Owner' not in df.columns:
-        return pd.DataFrame()
-    
-    df_owner = df[df['Course Owner'].notna() & (df['Course Owner'] != '')].copy()
-    
-    if df_owner.empty:
-        return pd.DataFrame()
-    
-    pivot = pd.pivot_table(
-        df_owner,
-        index='Course Owner',
-        columns='Lead Status',
-        values=['ID', 'Amount'],
-        aggfunc={'ID': 'count', 'Amount': 'sum'},
-        fill_value=0
-    )
-    
-    # Flatten multi-index columns
-    if isinstance(pivot.columns, pd.MultiIndex):
-        # We want: Status_Count or Status_Amount
-        # Actually, simpler: keep standard pivot for counts, and separate for amounts
-        pass
-    
-    # Let's do it cleaner for Metric 4/5 integration
-    pivot_counts = pd.pivot_table(df_owner, index='Course Owner', columns='Lead Status', values='ID', aggfunc='count', fill_value=0)
-    pivot_amounts = pd.pivot_table(df_owner[df_owner['Lead Status'] == 'Qualified Lead'], index='Course Owner', values='Amount', aggfunc='sum', fill_value=0)
-    
-    pivot = pivot_counts.reset_index()
-    if not pivot_amounts.empty:
-        pivot = pd.merge(pivot, pivot_amounts.rename(columns={'Amount': 'Qualified Lead Amount'}), on='Course Owner', how='left').fillna(0)
-    else:
-        pivot['Qualified Lead Amount'] = 0
-    
-    if len(pivot.columns) > 2: # Owner + Lead Statuses + Amount
-        status_cols = [col for col in pivot.columns if col not in ['Course Owner', 'Qualified Lead Amount']]
-        pivot['Total'] = pivot[status_cols].sum(axis=1)
-    
-    return pivot
-
-def create_metric_4(df_contacts, df_customers):
-    """METRIC 4: Course Owner Performance SUMMARY"""
-    if df_contacts.empty or 'Course Owner' not in df_contacts.columns:
-        return pd.DataFrame()
-    
-    owner_lead_pivot = create_metric_2(df_contacts)
-    
-    if owner_lead_pivot.empty:
-        return pd.DataFrame()
-    
-    # Get customer data from deals
-    if df_customers is not None and not df_customers.empty and 'Course Owner' in df_customers.columns:
-        customer_by_owner = df_customers.groupby('Course Owner').agg(
-            Customer_Count=('Is Customer', 'sum'),
-            Customer_Revenue=('Amount', 'sum'),
-            # [OK] NEW: Count by Stage History
-            Hot_Customer=('Was_Hot', 'sum'),
-            Warm_Customer=('Was_Warm', 'sum'),
-            Cold_Customer=('Was_Cold', 'sum')
-        ).reset_index()
-    else:
-        customer_by_owner = pd.DataFrame(columns=['Course Owner', 'Customer_Count', 'Customer_Revenue'])
-    
-    # Merge lead data with customer data
-    result_df = owner_lead_pivot.copy()
-    result_df['Customer'] = 0
-    
-    if not customer_by_owner.empty:
-        result_df = pd.merge(result_df, customer_by_owner, on='Course Owner', how='left')
-        result_df['Customer_Count'] = result_df['Customer_Count'].fillna(0)
-        result_df['Customer_Revenue'] = result_df['Customer_Revenue'].fillna(0)
-        result_df['Customer'] = result_df['Customer_Count']
-        # [OK] Revenue from qualified leads (CONTACTS) is already in result_df as 'Qualified Lead Amount'
-    else:
-        result_df['Customer_Count'] = 0
-        result_df['Customer_Revenue'] = 0
-    
-    # Deal Leads = Hot + Warm + Cold + Customer
-    deal_statuses = ['Cold', 'Warm', 'Hot']
-    result_df['Deal Leads'] = 0
-    
-    for status in deal_statuses:
-        if status in result_df.columns:
-            result_df['Deal Leads'] += result_df[status].fillna(0)
-    
-    result_df['Deal Leads'] += result_df['Customer']
-    
-    # Calculate percentages
-    if 'Total' in result_df.columns:
-        result_df = result_df.rename(columns={'Total': 'Grand Total'})
-        result_df['Deal %'] = np.where(
-            result_df['Grand Total'] > 0,
-            (result_df['Deal Leads'] / result_df['Grand Total'] * 100).round(2),
-            0
-        )
-    else:
-        result_df['Deal %'] = 0
-    
-    result_df['Customer %'] = np.where(
-        result_df['Deal Leads'] > 0,
-        (result_df['Customer'] / result_df['Deal Leads'] * 100).round(2),
-        0
-    )
-    
-    if 'Grand Total' in result_df.columns:
-        result_df['Lead->Customer %'] = np.where(
-            result_df['Grand Total'] > 0,
-            (result_df['Customer'] / result_df['Grand Total'] * 100).round(2),
-            0
-        )
-        result_df['Lead->Deal %'] = np.where(
-            result_df['Grand Total'] > 0,
-            (result_df['Deal Leads'] / result_df['Grand Total'] * 100).round(2),
-            0
-        )
-    else:
-        result_df['Lead->Customer %'] = 0
-        result_df['Lead->Deal %'] = 0
-    
-    # Select columns
-    base_cols = ['Course Owner']
-    status_cols = ['Cold', 'Hot', 'Warm', 'Qualified Lead']
-    existing_status_cols = [col for col in status_cols if col in result_df.columns]
-    
-    # [OK] NEW: Add Conversion Columns
-    conversion_cols = ['Hot_Customer', 'Warm_Customer', 'Cold_Customer']
-    existing_conversion_cols = [col for col in conversion_cols if col in result_df.columns]
-    
-    final_cols = base_cols + existing_status_cols + existing_conversion_cols + [
-        'Qualified Lead Amount',
-        'Customer', 
-        'Customer_Revenue',
-        'Deal Leads', 
-        'Deal %', 
-        'Customer %',
-        'Lead->Customer %',
-        'Lead->Deal %',
-        'Grand Total'
-    ]
-    
-    final_df = result_df[final_cols].copy()
-    
-    if 'Grand Total' in final_df.columns:
-        final_df = final_df.sort_values('Grand Total', ascending=False)
-    
-    return final_df
-
-# [OK] NEW: METRIC 5 - Course Performance KPI Table (Same as Owner Performance but for Courses)
-def create_metric_5(df_contacts, df_customers):
-    """METRIC 5: Course Performance KPI Table"""
-    if df_contacts.empty or 'Course/Program' not in df_contacts.columns:
-        return pd.DataFrame()
-    
-    course_lead_pivot = create_metric_1(df_contacts)
-    
-    if course_lead_pivot.empty:
-        return pd.DataFrame()
-    
-    # Get customer data from deals by course
-    if df_customers is not None and not df_customers.empty and 'Course/Program' in df_customers.columns:
-        customer_by_course = df_customers.groupby('Course/Program').agg(
-            Customer_Count=('Is Customer', 'sum'),
-            Customer_Revenue=('Amount', 'sum')
-        ).reset_index()
-    else:
-        customer_by_course = pd.DataFrame(columns=['Course/Program', 'Customer_Count', 'Customer_Revenue'])
-    
-    # Merge lead data with customer data
-    result_df = course_lead_pivot.copy()
-    result_df = result_df.rename(columns={'Course': 'Course'})
-    result_df['Customer'] = 0
-    
-    if not customer_by_course.empty:
-        result_df = pd.merge(result_df, customer_by_course, left_on='Course', right_on='Course/Program', how='left')
-        result_df['Customer_Count'] = result_df['Customer_Count'].fillna(0)
-        result_df['Customer_Revenue'] = result_df['Customer_Revenue'].fillna(0)
-        result_df['Customer'] = result_df['Customer_Count']
-        # [OK] Qualified Lead Amount already present in result_df
-        # Drop the extra course column from merge
-        result_df = result_df.drop(columns=['Course/Program'], errors='ignore')
-    else:
-        result_df['Customer_Count'] = 0
-        result_df['Customer_Revenue'] = 0
-    
-    # Deal Leads = Hot + Warm + Cold + Customer
-    deal_statuses = ['Cold', 'Warm', 'Hot']
-    result_df['Deal Leads'] = 0
-    
-    for status in deal_statuses:
-        if status in result_df.columns:
-            result_df['Deal Leads'] += result_df[status].fillna(0)
-    
-    result_df['Deal Leads'] += result_df['Customer']
-    
-    # Calculate percentages
-    if 'Total' in result_df.columns:
-        result_df = result_df.rename(columns={'Total': 'Grand Total'})
-        result_df['Deal %'] = np.where(
-            result_df['Grand Total'] > 0,
-            (result_df['Deal Leads'] / result_df['Grand Total'] * 100).round(2),
-            0
-        )
-    else:
-        result_df['Deal %'] = 0
-    
-    result_df['Customer %'] = np.where(
-        result_df['Deal Leads'] > 0,
-        (result_df['Customer'] / result_df['Deal Leads'] * 100).round(2),
-        0
-    )
-    
-    if 'Grand Total' in result_df.columns:
-        result_df['Lead->Customer %'] = np.where(
-            result_df['Grand Total'] > 0,
-            (result_df['Customer'] / result_df['Grand Total'] * 100).round(2),
-            0
-        )
-        result_df['Lead->Deal %'] = np.where(
-            result_df['Grand Total'] > 0,
-            (result_df['Deal Leads'] / result_df['Grand Total'] * 100).round(2),
-            0
-        )
-    else:
-        result_df['Lead->Customer %'] = 0
-        result_df['Lead->Deal %'] = 0
-    
-    # Select columns
-    base_cols = ['Course']
-    status_cols = ['Cold', 'Hot', 'Warm']
-    existing_status_cols = [col for col in status_cols if col in result_df.columns]
-    
-    final_cols = base_cols + existing_status_cols + [
-        'Customer', 
-        'Customer_Revenue',
-        'Deal Leads', 
-        'Deal %', 
-        'Customer %',
-        'Lead->Customer %',
-        'Lead->Deal %',
-        'Grand Total'
-    ]
-    
-    final_df = result_df[final_cols].copy()
-    
-    if 'Grand Total' in final_df.columns:
-        final_df = final_df.sort_values('Grand Total', ascending=False)
-    
-    return final_df
-
-# [OK] NEW: Course Revenue Analysis
-def create_course_revenue(df_customers):
-    """Calculate revenue by course from customer data."""
-    if df_customers is None or df_customers.empty or 'Course/Program' not in df_customers.columns or 'Amount' not in df_customers.columns:
-        return pd.DataFrame()
-    
-    # Filter only courses with revenue
-    customer_df = df_customers[(df_customers['Course/Program'].notna()) & (df_customers['Course/Program'] != '')].copy()
-    
-    if customer_df.empty:
-        return pd.DataFrame()
-    
-    # Clean course names
-    customer_df['Course_Clean'] = customer_df['Course/Program'].str.strip()
-    
-    # Group by course
-    revenue_df = customer_df.groupby('Course_Clean').agg(
-        Customers=('Is Customer', 'sum'),
-        Revenue=('Amount', 'sum')
-    ).reset_index().rename(columns={'Course_Clean': 'Course'})
+        ))
     
-    # Calculate revenue per customer
-    revenue_df['Revenue per Customer'] = np.where(
-        revenue_df['Customers'] > 0,
-        (revenue_df['Revenue'] / revenue_df['Customers']).round(0),
-        0
+    fig.update_layout(
+        title="Owner Funnel Comparison",
+        funnelmode="stack",
+        height=500,
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=1.05
+        )
     )
     
-    # Sort by revenue
-    revenue_df = revenue_df.sort_values('Revenue', ascending=False)
-    
-    return revenue_df
+    return fig
 
-# [OK] NEW: Volume vs Conversion Matrix
-def create_volume_conversion_matrix(metric_1, df_contacts, df_customers):
-    """Create a 2x2 matrix to classify courses based on volume and conversion."""
-    if metric_1.empty or 'Total' not in metric_1.columns:
-        return pd.DataFrame()
+def create_owner_performance_grid(metric_4):
+    """Create a grid view of owner performance."""
+    if metric_4.empty:
+        return None
+    
+    # Sort by Lead->Customer %
+    performance_grid = metric_4.copy(deep=False)
+    if 'Lead->Customer %' in performance_grid.columns:
+        performance_grid = performance_grid.sort_values('Lead->Customer %', ascending=False)
     
-    # Get customer data by course
-    customer_by_course = {}
-    if df_customers is not None and not df_customers.empty and 'Course/Program' in df_customers.columns:
-        for _, row in df_customers.iterrows():
-            course = row['Course/Program']
-            if pd.notna(course) and course != '':
-                course_clean = str(course).strip()
-                customer_by_course[course_clean] = customer_by_course.get(course_clean, 0) + 1
+    # Select top 12 owners
+    performance_grid = performance_grid.head(12)
     
-    # Calculate conversion % for each course
-    matrix_data = []
+    # Create grid HTML
+    grid_html = """
+    <div style="display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 15px; margin: 20px 0;">
+    """
     
-    for _, row in metric_1.iterrows():
-        course = row['Course']
-        total = row.get('Total', 0)
+    for idx, (_, owner_row) in enumerate(performance_grid.iterrows()):
+        owner_name = owner_row['Course Owner']
+        conversion_rate = owner_row.get('Lead->Customer %', 0)
+        total_leads = owner_row.get('Grand Total', 0)
+        customers = owner_row.get('Customer', 0)
         
-        # Get customer count for this course
-        customer_count = customer_by_course.get(course, 0)
+        # Determine color based on conversion rate
+        if conversion_rate >= 10:
+            bg_color = "linear-gradient(135deg, #d4edda, #c3e6cb)"
+            border_color = "#28a745"
+        elif conversion_rate >= 5:
+            bg_color = "linear-gradient(135deg, #fff3cd, #ffeaa7)"
+            border_color = "#ffc107"
+        else:
+            bg_color = "linear-gradient(135deg, #f8d7da, #f5c6cb)"
+            border_color = "#dc3545"
         
-        # Calculate conversion %
-        conversion_pct = (customer_count / total * 100) if total > 0 else 0
+        # Rank indicator
+        rank = idx + 1
+        rank_emoji = "" if rank == 1 else "" if rank == 2 else "" if rank == 3 else f"#{rank}"
         
-        matrix_data.append({
-            'Course': course,
-            'Volume': total,
-            'Conversion %': round(conversion_pct, 1),
-            'Customer Count': customer_count
-        })
-    
-    matrix_df = pd.DataFrame(matrix_data)
-    
-    if len(matrix_df) < 2:
-        return matrix_df
-    
-    # Calculate thresholds (median)
-    volume_threshold = matrix_df['Volume'].median()
-    conversion_threshold = matrix_df['Conversion %'].median()
-    
-    # Classify each course
-    def classify_course(row):
-        if row['Volume'] >= volume_threshold and row['Conversion %'] >= conversion_threshold:
-            return " Star"
-        elif row['Volume'] < volume_threshold and row['Conversion %'] >= conversion_threshold:
-            return " Potential"
-        elif row['Volume'] >= volume_threshold and row['Conversion %'] < conversion_threshold:
-            return " Burn (High Volume, Low Conversion)"
-        else:
-            return " Weak"
-    
-    matrix_df['Segment'] = matrix_df.apply(classify_course, axis=1)
-    
-    return matrix_df
-
-def calculate_previous_period(start_date, end_date):
-    """Calculate the previous period based on the current date range."""
-    # If starts on 1st of month, compare to previous FULL month
-    if start_date.day == 1:
-        # Previous month end is start_date - 1 day
-        prev_end = start_date - timedelta(days=1)
-        # Previous month start is 1st of that month
-        prev_start = prev_end.replace(day=1)
-        return prev_start, prev_end
-    
-    # Otherwise just shift specific number of days back
-    delta = end_date - start_date
-    days_diff = delta.days + 1
+        grid_html += f"""
+        <div style="background: {bg_color}; border: 2px solid {border_color}; border-radius: 10px; padding: 15px;">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                <div style="font-size: 1.5rem; font-weight: bold;">{rank_emoji}</div>
+                <div style="font-size: 1.8rem; font-weight: bold; color: #2c3e50;">{conversion_rate}%</div>
+            </div>
+            <div style="font-weight: bold; font-size: 1.1rem; margin-bottom: 5px;">{owner_name[:20]}{'...' if len(owner_name) > 20 else ''}</div>
+            <div style="display: flex; justify-content: space-between; font-size: 0.9rem; color: #666;">
+                <div> {total_leads:,} leads</div>
+                <div> {customers} customers</div>
+            </div>
+            <div style="margin-top: 10px; height: 8px; background: #e9ecef; border-radius: 4px; overflow: hidden;">
+                <div style="width: {min(conversion_rate, 100)}%; height: 100%; background: {border_color};"></div>
+            </div>
+        </div>
+        """
     
-    prev_end = start_date - timedelta(days=1)
-    prev_start = prev_end - timedelta(days=days_diff - 1)
-        
-    return prev_start, prev_end
+    grid_html += "</div>"
+    return grid_html
 
-def create_comparison_data(df_contacts, df_customers, comparison_type, item1, item2):
-    """Create comparison data for different comparison types."""
-    if df_contacts.empty:
-        return None
-    
-    results = {}
-    
-    if comparison_type == "Course vs Course":
-        # Get course data
-        metric_1 = create_metric_1(df_contacts)
-        if not metric_1.empty:
-            # Filter for selected courses
-            course1_data = metric_1[metric_1['Course'] == item1] if item1 in metric_1['Course'].values else pd.DataFrame()
-            course2_data = metric_1[metric_1['Course'] == item2] if item2 in metric_1['Course'].values else pd.DataFrame()
-            
-            results['type'] = 'course_vs_course'
-            results['item1'] = item1
-            results['item2'] = item2
-            results['data1'] = course1_data
-            results['data2'] = course2_data
-            
-            # Calculate comparison metrics
-            if not course1_data.empty and not course2_data.empty:
-                # Deal Leads (Cold + Warm + Hot)
-                deal_cols = ['Cold', 'Warm', 'Hot']
-                deal1 = course1_data[deal_cols].sum(axis=1).values[0] if all(col in course1_data.columns for col in deal_cols) else 0
-                total1 = course1_data['Total'].values[0] if 'Total' in course1_data.columns else 1
-                deal_pct1 = (deal1 / total1 * 100) if total1 > 0 else 0
-                
-                deal2 = course2_data[deal_cols].sum(axis=1).values[0] if all(col in course2_data.columns for col in deal_cols) else 0
-                total2 = course2_data['Total'].values[0] if 'Total' in course2_data.columns else 1
-                deal_pct2 = (deal2 / total2 * 100) if total2 > 0 else 0
-                
-                results['deal_pct1'] = round(deal_pct1, 1)
-                results['deal_pct2'] = round(deal_pct2, 1)
+# [OK] CRITICAL FIX: Debug function to see what's being converted to "Customer"
+def debug_lead_status_conversion(df):
+    """Debug function to identify what's being incorrectly marked as Customer."""
+    if df.empty:
+        return
     
-    elif comparison_type == "Owner vs Owner":
-        # Get owner data
-        metric_4 = create_metric_4(df_contacts, df_customers)
-        if not metric_4.empty:
-            # Filter for selected owners
-            owner1_data = metric_4[metric_4['Course Owner'] == item1] if item1 in metric_4['Course Owner'].values else pd.DataFrame()
-            owner2_data = metric_4[metric_4['Course Owner'] == item2] if item2 in metric_4['Course Owner'].values else pd.DataFrame()
-            
-            results['type'] = 'owner_vs_owner'
-            results['item1'] = item1
-            results['item2'] = item2
-            results['data1'] = owner1_data
-            results['data2'] = owner2_data
+    # Find all rows where Lead Status is "Customer"
+    customer_rows = df[df['Lead Status'] == 'Customer']
     
-    elif comparison_type == "Course vs Owner":
-        # This is more complex - need to get course data for specific owner
-        results['type'] = 'course_vs_owner'
-        results['item1'] = item1  # Course
-        results['item2'] = item2  # Owner
+    if not customer_rows.empty:
+        st.error(f" FOUND {len(customer_rows)} ROWS MARKED AS 'CUSTOMER' IN LEADS!")
+        st.write("This should be ZERO. Showing samples:")
         
-        # Get courses for this owner
-        owner_courses = df_contacts[(df_contacts['Course Owner'] == item2) & (df_contacts['Course/Program'].notna()) & (df_contacts['Course/Program'] != '')].copy()
+        # Show raw values that got converted to Customer
+        st.write("**Raw Lead Status values that became 'Customer':**")
+        unique_raw_values = customer_rows['Lead Status Raw'].dropna().unique()
         
-        if not owner_courses.empty:
-            # Create pivot for owner's courses
-            pivot = pd.pivot_table(
-                owner_courses,
-                index='Course/Program',
-                columns='Lead Status',
-                values='ID',
-                aggfunc='count',
-                fill_value=0
-            )
-            
-            results['owner_courses'] = pivot.reset_index()
-    
-    return results
-
-def calculate_kpis(df_contacts, df_customers):
-    """Calculate key performance indicators."""
-    if df_contacts.empty:
-        return {
-            'total_leads': 0, 'deal_leads': 0, 'cold': 0, 'warm': 0, 'hot': 0,
-            'customer': 0, 'customer_in_leads': 0, 'new_lead': 0, 'not_connected': 0,
-            'not_interested': 0, 'not_qualified': 0, 'duplicate': 0, 'qualified_lead': 0,
-            'upselling': 0, 'course_shifting': 0, 'closed_lost': 0,
-            'lead_to_customer_pct': 0, 'lead_to_deal_pct': 0, 'deal_to_customer_pct': 0,
-            'total_revenue': 0, 'avg_revenue_per_customer': 0,
-            'top_course': "N/A", 'top_owner': "N/A", 'top_revenue_course': "N/A",
-            'top_revenue_amount': 0, 'dropoff_ratio': 0
-        }
-    
-    # Total metrics from CONTACTS
-    total_leads = len(df_contacts)
-    
-    # Lead status breakdown from CONTACTS
-    status_counts = df_contacts['Lead Status'].value_counts()
-    
-    cold = status_counts.get('Cold', 0)
-    warm = status_counts.get('Warm', 0)
-    hot = status_counts.get('Hot', 0)
-    new_lead = status_counts.get('New Lead', 0)
-    not_connected = status_counts.get('Not Connected (NC)', 0)
-    not_interested = status_counts.get('Not Interested', 0)
-    not_qualified = status_counts.get('Not Qualified', 0)
-    duplicate = status_counts.get('Duplicate', 0)
-    qualified_lead = status_counts.get('Qualified Lead', 0)
-    
-    # [OK] NEW: Calculate Qualified Lead Revenue (from contacts)
-    qualified_lead_revenue = df_contacts[df_contacts['Lead Status'] == 'Qualified Lead']['Amount'].sum()
-    
-    upselling = status_counts.get('Upselling', 0)
-    course_shifting = status_counts.get('Course Shifting', 0)
-    closed_lost = status_counts.get('Closed Lost', 0)
-    
-    # [OK] Check for any "Customer" in leads (should be 0)
-    customer_in_leads = status_counts.get('Customer', 0)
-    
-    # CUSTOMER metrics from DEALS
-    if df_customers is not None and not df_customers.empty:
-        customer = len(df_customers)  # Customer count = ONLY Admission Confirmed
-        admission_revenue = df_customers['Amount'].sum()
+        for raw_val in unique_raw_values[:10]:  # Show first 10
+            st.write(f"- `{raw_val}` -> Customer")
         
-        # [OK] NEW: Add partial payment revenue from current month (non-confirmed deals)
-        partial_rev = st.session_state.get('partial_revenue', {}).get('total', 0) if 'partial_revenue' in st.session_state else 0
-        total_revenue = admission_revenue + partial_rev
+        if len(unique_raw_values) > 10:
+            st.write(f"... and {len(unique_raw_values) - 10} more")
         
-        avg_revenue_per_customer = round((admission_revenue / customer), 0) if customer > 0 else 0
-    else:
-        customer = 0
-        total_revenue = 0
-        avg_revenue_per_customer = 0
-    
-    # Deal Leads = Hot + Warm + Cold + Customer
-    deal_leads = hot + warm + cold + customer
-    
-    # Conversion metrics
-    lead_to_customer_pct = round((customer / total_leads * 100), 1) if total_leads > 0 else 0
-    lead_to_deal_pct = round((deal_leads / total_leads * 100), 1) if total_leads > 0 else 0
-    deal_to_customer_pct = round((customer / deal_leads * 100), 1) if deal_leads > 0 else 0
-    
-    # Top performing metrics
-    top_course = ""
-    top_owner = ""
-    top_revenue_course = ""
-    top_revenue_amount = 0
-    
-    if 'Course/Program' in df_contacts.columns:
-        course_counts = df_contacts['Course/Program'].value_counts()
-        if not course_counts.empty:
-            top_course = str(course_counts.index[0])
-            top_course_count = course_counts.iloc[0]
-    
-    if 'Course Owner' in df_contacts.columns:
-        owner_counts = df_contacts['Course Owner'].value_counts()
-        if not owner_counts.empty:
-            top_owner = str(owner_counts.index[0])
-            top_owner_count = owner_counts.iloc[0]
-    
-    # Best Revenue Course
-    if df_customers is not None and not df_customers.empty and 'Course/Program' in df_customers.columns:
-        revenue_by_course = df_customers.groupby('Course/Program')['Amount'].sum()
-        if not revenue_by_course.empty:
-            top_revenue_course = str(revenue_by_course.index[0])
-            top_revenue_amount = revenue_by_course.iloc[0]
-    
-    # Drop-off ratio
-    # Drop-off ratio
-    dropoff_ratio = round((not_interested + not_qualified + not_connected + closed_lost) / total_leads * 100, 1) if total_leads > 0 else 0
-    
-    return {
-        'total_leads': total_leads,
-        'deal_leads': deal_leads,
-        'cold': cold,
-        'warm': warm,
-        'hot': hot,
-        'customer': customer,  # FROM DEALS ONLY
-        'customer_in_leads': customer_in_leads,  # This should be 0!
-        'new_lead': new_lead,
-        'not_connected': not_connected,
-        'not_interested': not_interested,
-        'not_qualified': not_qualified,
-        'duplicate': duplicate,
-        'qualified_lead': qualified_lead,
-        'qualified_lead_revenue': qualified_lead_revenue,
-        'upselling': upselling,
-        'course_shifting': course_shifting,
-        'closed_lost': closed_lost,
-        'lead_to_customer_pct': lead_to_customer_pct,
-        'lead_to_deal_pct': lead_to_deal_pct,
-        'deal_to_customer_pct': deal_to_customer_pct,
-        'total_revenue': total_revenue,
-        'avg_revenue_per_customer': avg_revenue_per_customer,
-        'top_course': top_course[:20] if top_course else "N/A",
-        'top_owner': top_owner[:20] if top_owner else "N/A",
-        'top_revenue_course': top_revenue_course[:20] if top_revenue_course else "N/A",
-        'top_revenue_amount': top_revenue_amount,
-        'dropoff_ratio': dropoff_ratio
-    }
+        # Show sample rows
+        st.write("**Sample rows with issue:**")
+        st.dataframe(customer_rows[['Full Name', 'Lead Status', 'Lead Status Raw', 'Course/Program']].head(10))
+        
+        # Let user manually fix these
+        st.markdown("""
+        <div class="data-fix-card">
+        <strong> QUICK FIX OPTION:</strong><br>
+        You can manually remap these incorrect "Customer" entries:
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Provide a quick fix option
+        if st.button(" Auto-fix 'Customer' in leads (map to 'Qualified Lead')"):
+            # Fix the dataframe
+            df_fixed = df.copy(deep=False)
+            df_fixed['Lead Status'] = df_fixed['Lead Status'].replace('Customer', 'Qualified Lead')
+            
+            # Update session state
+            st.session_state.contacts_df = df_fixed
+            st.success("[OK] Fixed! 'Customer' entries in leads now mapped to 'Qualified Lead'")
+            st.rerun()
 
 def main():
+    # Pipeline status messages from the core package go to this page
+    set_reporter(StreamlitReporter())
+    sync_business_rules()
+    
     # [OK] SECURITY: Get API key from secrets
     api_key = get_api_key()
     
@@ -3625,12 +1739,23 @@ def main():
     if 'partial_revenue' not in st.session_state:
         st.session_state.partial_revenue = {'total': 0, 'online_total': 0, 'offline_total': 0, 'count': 0}
     
+    swap_in_newer_dataset()
+    
+    # [OK] NEW: Open new sessions on the current month kept warm by the background scheduler
+    if 'auto_attach_done' not in st.session_state:
+        st.session_state.auto_attach_done = True
+        if st.session_state.contacts_df is None:
+            attach_scheduled_dataset()
+    
     # [OK] Fetch Deal Pipeline Stages FIRST
     if 'deal_stages' not in st.session_state or st.session_state.deal_stages is None:
         with st.spinner(" Loading deal pipeline stages..."):
             deal_stages = fetch_deal_pipeline_stages(api_key)
             st.session_state.deal_stages = deal_stages
     
+    # Partial results of a running "Fetch ALL Data" are drawn here
+    loading_area = st.empty()
+    
     # Create sidebar
     with st.sidebar:
         st.markdown("##  Configuration")
@@ -3772,6 +1897,11 @@ def main():
                 # Add explicit cache clearing option
                 if st.button(" Clear Cache & Refresh", type="secondary", use_container_width=True):
                     st.cache_data.clear()
+                    for cached_step in SHARED_CACHED_STEPS:
+                        cached_step.clear()
+                    get_range_cache().clear()
+                    get_detail_cache().clear()
+                    get_dataset_registry().invalidate()
                     st.rerun()
 
                 with st.spinner("Fetching data..."):
@@ -3783,92 +1913,34 @@ def main():
                         st.session_state.date_range = (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
                         st.session_state.deal_date_range = (deal_start_date.strftime("%Y-%m-%d"), deal_end_date.strftime("%Y-%m-%d"))
                         
-                        # Fetch owners
-                        owner_mapping = fetch_owner_mapping(api_key)
-                        st.session_state.owner_mapping = owner_mapping
-                        
-                        # Fetch CONTACTS (Leads)
-                        contacts, total_contacts = fetch_hubspot_contacts_with_date_filter(
-                            api_key, date_field, start_date, end_date
-                        )
-                        
-                        # [OK] Fetch DEALS using Stage IDs
-                        deals, total_deals = fetch_hubspot_deals(
-                            api_key, deal_start_date, deal_end_date, CUSTOMER_DEAL_STAGES
-                        )
-                        
-                        # [OK] NEW: Fetch Team Performance Deals (Date Entered Logic)
-                        stage_ids_map = detect_key_stages(st.session_state.deal_stages)
-                        team_perf_deals, count_tp = fetch_team_performance_deals(
-                            api_key, deal_start_date, deal_end_date, stage_ids_map
-                        )
-                        
-                        if contacts:
-                            # Process contacts (leads) - Passing dates for Qualified Lead intersection check
-                            df_contacts = process_contacts_data(contacts, owner_mapping, api_key, start_date=start_date, end_date=end_date)
-                            st.session_state.contacts_df = df_contacts
-                            
-                            # Process deals (customers)
-                            df_customers = process_deals_as_customers(deals, owner_mapping, api_key, st.session_state.deal_stages, start_date=deal_start_date)
-                            
-                            # [OK] NEW: Fetch partial payment deals for current month revenue
-                            partial_deals = fetch_partial_payment_deals(api_key, deal_start_date, deal_end_date)
-                            admission_deal_ids = set(str(d.get('id')) for d in deals)
-                            partial_rev = calculate_partial_revenue(
-                                partial_deals, admission_deal_ids, owner_mapping, deal_start_date, deal_end_date
-                            )
-                            st.session_state.partial_revenue = partial_rev
-                            
-                            # [OK] FILTER OUT EXCLUDED OWNERS
-                            if df_contacts is not None and not df_contacts.empty:
-                                df_contacts = df_contacts[~df_contacts['Course Owner'].isin(EXCLUDED_OWNERS)]
-                                
-                            if df_customers is not None and not df_customers.empty:
-                                df_customers = df_customers[~df_customers['Course Owner'].isin(EXCLUDED_OWNERS)]
-                            
-                            st.session_state.contacts_df = df_contacts
-                            st.session_state.customers_df = df_customers
-                            
-                            # Calculate metrics - ADD NEW METRIC 6
-                            metric_4_data = create_metric_4(df_contacts, df_customers)
-                            
-                            # [OK] NEW: Process Team Performance Metrics
-                            stage_ids_map = detect_key_stages(st.session_state.deal_stages)
-                            df_team_perf = process_team_performance_metrics(team_perf_deals, deal_start_date, deal_end_date, stage_ids_map, owner_mapping)
-                            
-                            # [OK] NEW: Merge Customer Count/Revenue from metric_4 (Sales Performance)
-                            if not metric_4_data.empty:
-                                cust_data = metric_4_data[['Course Owner', 'Customer', 'Customer_Revenue']].copy()
-                                cust_data = cust_data.rename(columns={'Customer': 'Customer Count', 'Customer_Revenue': 'Customer Revenue'})
-                                
-                                # Merge
-                                df_team_perf = pd.merge(df_team_perf, cust_data, on='Course Owner', how='left')
-                                df_team_perf['Customer Count'] = df_team_perf['Customer Count'].fillna(0)
-                                df_team_perf['Customer Revenue'] = df_team_perf['Customer Revenue'].fillna(0)
-
-                            st.session_state.team_performance_df = df_team_perf
-
-                            st.session_state.metrics = {
-                                'metric_1': create_metric_1(df_contacts),
-                                'metric_2': create_metric_2(df_contacts),
-                                'metric_4': metric_4_data,
-                                'metric_5': create_metric_5(df_contacts, df_customers),
-                                'metric_6': create_metric_6(df_contacts),  # [OK] NEW LEAD STATUS METRIC
-                                'metric_7': group_team_performance_metrics(df_team_perf) # [OK] NEW TEAM METRIC DICT
-                            }
-                            
-                            # [OK] NEW: Calculate revenue data
-                            st.session_state.revenue_data = create_course_revenue(df_customers)
-                            
-                            # [OK] NEW: Calculate matrix data
-                            st.session_state.matrix_data = create_volume_conversion_matrix(
-                                st.session_state.metrics['metric_1'], df_contacts, df_customers
+                        # Sessions asking for the same ranges and stages share one registered dataset;
+                        # the loader may also run on a background thread, so it must not touch session_state
+                        customer_stage_ids = list(CUSTOMER_DEAL_STAGES)
+                        deal_stages = st.session_state.deal_stages
+                        lease, interrupted = None, None
+                        try:
+                            lease = load_dataset_progressively(
+                                dataset_key(date_field, start_date, end_date, deal_start_date, deal_end_date, customer_stage_ids),
+                                lambda: run_dashboard_pipeline(
+                                    api_key, date_field, start_date, end_date, deal_start_date, deal_end_date,
+                                    customer_stage_ids, deal_stages, steps=CACHED_PIPELINE_STEPS
+                                ),
+                                loading_area
                             )
+                        except FetchIncomplete as e:
+                            interrupted = e
+                        
+                        if interrupted is not None:
+                            st.error(f" Fetch interrupted: {interrupted}. Progress is saved - click Fetch ALL Data again to resume.")
+                        elif lease:
+                            result = lease.data
+                            use_dataset_lease(lease)
+                            st.session_state.snapshot_run_dir = None
                             
                             st.success(f"""
                             [OK] Successfully loaded:
-                              {len(contacts)} contacts (leads)
-                              {len(deals)} customers (from deals)
+                              {result['contacts_count']} contacts (leads)
+                              {result['deals_count']} customers (from deals)
                             """)
                             st.rerun()
                         else:
@@ -3876,42 +1948,56 @@ def main():
                     else:
                         st.error(f"Connection failed: {message}")
         
+        # [OK] NEW: Load data precomputed by the nightly headless run (python -m hubspot_analytics run ...)
+        snapshot_run_dir = find_latest_snapshot(get_snapshot_dir())
+        if snapshot_run_dir and st.button(" Load Nightly Snapshot", use_container_width=True):
+            try:
+                lease = get_dataset_registry().acquire(('snapshot', snapshot_run_dir),
+                                                       lambda: load_pipeline_snapshot(snapshot_run_dir))
+                use_dataset_lease(lease)
+                st.session_state.snapshot_run_dir = snapshot_run_dir
+                manifest = lease.data['manifest']
+                st.session_state.date_filter = manifest['date_field']
+                st.session_state.date_range = tuple(manifest['date_range'])
+                st.session_state.deal_date_range = tuple(manifest['deal_date_range'])
+                st.rerun()
+            except Exception as e:
+                st.error(f" Could not load snapshot: {str(e)}")
+        
         if st.button(" Refresh Analysis", use_container_width=True, 
                     disabled=st.session_state.contacts_df is None):
             if st.session_state.contacts_df is not None:
                 # [OK] RE-FILTER just in case
                 df_contacts = st.session_state.contacts_df
-                df_contacts = df_contacts[~df_contacts['Course Owner'].isin(EXCLUDED_OWNERS)]
+                df_contacts = df_contacts[~get_owner_dimension().excluded_rows(df_contacts)]
                 
                 df_customers = st.session_state.customers_df
-                df_customers = df_customers[~df_customers['Course Owner'].isin(EXCLUDED_OWNERS)]
+                df_customers = df_customers[~get_owner_dimension().excluded_rows(df_customers)]
 
                 
-                metric_4_data = create_metric_4(df_contacts, df_customers)
-                
-                st.session_state.metrics = {
-                    'metric_1': create_metric_1(df_contacts),
-                    'metric_2': create_metric_2(df_contacts),
-                    'metric_4': metric_4_data,
-                    'metric_5': create_metric_5(df_contacts, df_customers),
-                    'metric_6': create_metric_6(df_contacts),  # [OK] NEW METRIC
-                    'metric_7': group_team_performance_metrics(st.session_state.team_performance_df) if st.session_state.team_performance_df is not None else {}
-                }
-                
-                # [OK] NEW: Refresh revenue data
-                st.session_state.revenue_data = create_course_revenue(df_customers)
-                
-                # [OK] NEW: Refresh matrix data
-                st.session_state.matrix_data = create_volume_conversion_matrix(
-                    st.session_state.metrics['metric_1'], df_contacts, df_customers
-                )
+                snapshot_metrics = get_snapshot_metrics()
+                if snapshot_metrics is not None:
+                    tables = snapshot_metrics.dashboard_metrics(st.session_state.team_performance_df)
+                else:
+                    tables = compute_dashboard_metrics(df_contacts, df_customers, st.session_state.team_performance_df)
+                st.session_state.metrics = tables['metrics']
+                st.session_state.revenue_data = tables['revenue_data']
+                st.session_state.matrix_data = tables['matrix_data']
                 
                 st.success("Analysis refreshed!")
                 st.rerun()
         
         if st.button("--' Clear All Data", use_container_width=True):
             st.session_state.clear()
+            st.session_state.auto_attach_done = True
             st.rerun()
+        
+        scheduler = get_refresh_scheduler()
+        if scheduler is not None:
+            status = f"as of {scheduler.current['as_of']:%d %b %H:%M}" if scheduler.current else "first run in progress"
+            st.caption(f" Current month auto-refreshes every {max(scheduler.interval // 60, 1)} min ({status})")
+            if scheduler.last_error:
+                st.caption(f" Last auto-refresh failed: {scheduler.last_error}")
             
         st.divider()
         
@@ -3938,16 +2024,24 @@ def main():
           Weak: Low volume + Low conversion
         """)
 
+    sync_comparison_prefetch(api_key, (date_field, start_date, end_date, deal_start_date, deal_end_date))
+    
     # Main content area
     if st.session_state.contacts_df is not None and not st.session_state.contacts_df.empty:
-        df_contacts = st.session_state.contacts_df.copy()
-        df_customers = st.session_state.customers_df.copy() if st.session_state.customers_df is not None else None
+        # Shared registry data - filtered below into new frames, never modified in place
+        df_contacts = st.session_state.contacts_df
+        df_customers = st.session_state.customers_df
+        
+        # [OK] NEW: Stale data is shown at once and swapped for the background reload when it lands
+        lease = st.session_state.get('dataset_lease')
+        if lease is not None:
+            refreshing = lease.stale and get_dataset_registry().revalidating(lease.key)
+            _polling_fragment(DATASET_POLL_SECONDS if refreshing else None)(render_dataset_freshness)(polling=refreshing)
         
         # [OK] NEW: Global Owner Exclusion to match Owner Dashboard Totals (5426 -> 5422)
-        global_excluded_owners = ['Aneesha S', 'Sonia William']
-        df_contacts = df_contacts[~df_contacts['Course Owner'].isin(global_excluded_owners)]
+        df_contacts = df_contacts[~get_owner_dimension().excluded_rows(df_contacts)]
         if df_customers is not None and not df_customers.empty:
-            df_customers = df_customers[~df_customers['Course Owner'].isin(global_excluded_owners)]
+            df_customers = df_customers[~get_owner_dimension().excluded_rows(df_customers)]
             
         metrics = st.session_state.metrics
         revenue_data = st.session_state.revenue_data
@@ -3972,7 +2066,7 @@ def main():
             
             # Auto-fix option
             if st.button(" Auto-fix: Convert 'Customer' to 'Qualified Lead'"):
-                df_contacts_fixed = df_contacts.copy()
+                df_contacts_fixed = df_contacts.copy(deep=False)
                 df_contacts_fixed['Lead Status'] = df_contacts_fixed['Lead Status'].replace('Customer', 'Qualified Lead')
                 st.session_state.contacts_df = df_contacts_fixed
                 st.success("[OK] Fixed! 'Customer' entries converted to 'Qualified Lead'")
@@ -3988,16 +2082,18 @@ def main():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            # Download Raw Data
-            csv_raw = df_contacts.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label=" Download Raw Data (CSV)",
-                data=csv_raw,
-                file_name=f"hubspot_raw_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv",
-                use_container_width=True,
-                help="All contact records with complete details"
-            )
+            # Download Raw Data - built on request, once the contact details of every row are read
+            if st.button(" Prepare Raw Data (CSV)", use_container_width=True,
+                         help="All contact records with complete details"):
+                with st.spinner("Reading contact details..."):
+                    csv_raw = hydrate_contact_details(df_contacts, api_key).to_csv(index=False).encode('utf-8')
+                st.download_button(
+                    label=" Download Raw Data (CSV)",
+                    data=csv_raw,
+                    file_name=f"hubspot_raw_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
         
         with col2:
             # Download Course KPI Dashboard (NEW)
@@ -4013,30 +2109,53 @@ def main():
                 )
         
         with col3:
-            # Premium Excel Report Button
+            # Premium Excel Report Button - built in the background so the dashboard stays usable
             if st.button(" Generate Premium Excel Report", use_container_width=True, type="primary"):
-                with st.spinner(" Creating premium Excel report with formatting..."):
-                    try:
-                        kpis = calculate_kpis(df_contacts, df_customers)
-                        excel_data = create_excel_report(
-                            df_contacts, 
-                            df_customers,
-                            metrics, 
-                            kpis, 
-                            st.session_state.date_range,
-                            st.session_state.date_filter
+                try:
+                    kpis = calculate_kpis(df_contacts, df_customers, partial_revenue=st.session_state.partial_revenue)
+                    submit_excel_report_job(
+                        df_contacts, 
+                        df_customers,
+                        metrics, 
+                        kpis, 
+                        st.session_state.date_range,
+                        st.session_state.date_filter,
+                        api_key=api_key
+                    )
+                    st.success("[OK] Premium Excel report queued - it will appear below when ready")
+                except Exception as e:
+                    st.error(f" Error: {str(e)}")
+            
+            # Poll for progress only while a report is being built
+            report_poll_seconds = 2 if get_report_job_manager().has_active_jobs() else None
+            _polling_fragment(report_poll_seconds)(render_report_jobs)(polling=report_poll_seconds is not None)
+        
+        # [OK] NEW: Columnar export for notebooks - dtypes preserved, much faster to reload than CSV
+        with st.expander(" Columnar Export (Parquet / Arrow IPC)"):
+            export_dir = get_export_dir()
+            export_fmt = st.radio("Format:", list(COLUMNAR_EXPORT_FORMATS), horizontal=True, key="columnar_export_format")
+            st.caption(f"Files are also saved under `{export_dir}`")
+            if st.button(f" Export {export_fmt}", use_container_width=True):
+                try:
+                    with st.spinner(f"Writing {export_fmt} files..."):
+                        frames = collect_export_frames(
+                            hydrate_contact_details(df_contacts, api_key), df_customers,
+                            st.session_state.team_performance_df, metrics,
+                            extra_frames={'course_revenue': st.session_state.get('revenue_data'),
+                                          'volume_matrix': st.session_state.get('matrix_data')}
                         )
-                        
+                        folder, zip_path = write_columnar_export(frames, export_dir, export_fmt)
+                    st.success(f"[OK] Wrote {len(frames)} tables to `{folder}`")
+                    with open(zip_path, 'rb') as export_file:
                         st.download_button(
-                            label=" Download Premium Excel Report",
-                            data=excel_data,
-                            file_name=f"HubSpot_Premium_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            label=f" Download {export_fmt} Export (ZIP)",
+                            data=export_file,
+                            file_name=os.path.basename(zip_path),
+                            mime="application/zip",
                             use_container_width=True
                         )
-                        st.success("[OK] Premium Excel report ready for download!")
-                    except Exception as e:
-                        st.error(f" Error: {str(e)}")
+                except Exception as e:
+                    st.error(f" Error: {str(e)}")
         
         st.divider()
         
@@ -4078,8 +2197,8 @@ def main():
             )
         
         # Apply filters
-        filtered_df = df_contacts.copy()
-        filtered_customers = df_customers.copy() if df_customers is not None else None
+        filtered_df = df_contacts.copy(deep=False)
+        filtered_customers = df_customers.copy(deep=False) if df_customers is not None else None
         
         if selected_courses:
             filtered_df = filtered_df[filtered_df['Course/Program'].isin(selected_courses)]
@@ -4098,21 +2217,35 @@ def main():
             # unless the user specifically wants to see cohorts. 
             # For now, we only filter leads by status as requested by the UI labels.
         
+        # [OK] NEW: Snapshot data can be aggregated by DuckDB straight from the Parquet files
+        snapshot_metrics = get_snapshot_metrics(
+            filters={'Course/Program': selected_courses, 'Course Owner': selected_owners, 'Lead Status': selected_statuses},
+            customer_filters={'Course/Program': selected_courses, 'Course Owner': selected_owners}
+        )
+        
         # Update metrics with filtered data
-        filtered_metrics = {
-            'metric_1': create_metric_1(filtered_df),
-            'metric_2': create_metric_2(filtered_df),
-            'metric_4': create_metric_4(filtered_df, filtered_customers),
-            'metric_5': create_metric_5(filtered_df, filtered_customers),
-            'metric_6': create_metric_6(filtered_df)
-        }
+        if snapshot_metrics is not None:
+            filtered_metrics = {
+                'metric_1': snapshot_metrics.create_metric_1(),
+                'metric_2': snapshot_metrics.create_metric_2(),
+                'metric_4': snapshot_metrics.create_metric_4(),
+                'metric_5': snapshot_metrics.create_metric_5(),
+                'metric_6': snapshot_metrics.create_metric_6()
+            }
+        else:
+            filtered_metrics = {
+                'metric_1': create_metric_1(filtered_df),
+                'metric_2': create_metric_2(filtered_df),
+                'metric_4': create_metric_4(filtered_df, filtered_customers),
+                'metric_5': create_metric_5(filtered_df, filtered_customers),
+                'metric_6': create_metric_6(filtered_df)
+            }
         # [OK] NEW: Use Team Performance DF (Separate Fetch) for Metric 7
         if st.session_state.team_performance_df is not None and not st.session_state.team_performance_df.empty:
-            temp_team_df = st.session_state.team_performance_df.copy()
+            temp_team_df = st.session_state.team_performance_df.copy(deep=False)
             
             # Apply global exclusion here as well to ensure total consistency across identical structures
-            global_excluded_owners = ['Aneesha S', 'Sonia William']
-            temp_team_df = temp_team_df[~temp_team_df['Course Owner'].isin(global_excluded_owners)]
+            temp_team_df = temp_team_df[~get_owner_dimension().excluded_rows(temp_team_df)]
             
             if selected_owners:
                 temp_team_df = temp_team_df[temp_team_df['Course Owner'].isin(selected_owners)]
@@ -4172,7 +2305,7 @@ def main():
         st.markdown('<div class="section-header"><h2> Executive Business Dashboard</h2></div>', unsafe_allow_html=True)
         
         # Calculate TOTAL KPIs (Unfiltered)
-        kpis = calculate_kpis(df_contacts, df_customers)
+        kpis = calculate_kpis(df_contacts, df_customers, partial_revenue=st.session_state.partial_revenue)
         
         # [OK] NEW: Get partial revenue info for display
         partial_rev_info = st.session_state.get('partial_revenue', {'total': 0, 'count': 0})
@@ -4210,7 +2343,7 @@ def main():
         
         # [OK] NEW: Filtered KPI Cards
         if selected_courses or selected_owners or selected_statuses:
-            filtered_kpis = calculate_kpis(filtered_df, filtered_customers)
+            filtered_kpis = calculate_kpis(filtered_df, filtered_customers, partial_revenue=st.session_state.partial_revenue)
             
             st.markdown('<div class="section-header"><h3> Filtered View KPIs</h3></div>', unsafe_allow_html=True)
             
@@ -4229,14 +2362,16 @@ def main():
             col_f1, col_f2 = st.columns(2)
             
             with col_f1:
-                csv_filtered = filtered_df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label=" Download Filtered Data (CSV)",
-                    data=csv_filtered,
-                    file_name=f"hubspot_filtered_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                if st.button(" Prepare Filtered Data (CSV)", use_container_width=True):
+                    with st.spinner("Reading contact details..."):
+                        csv_filtered = hydrate_contact_details(filtered_df, api_key).to_csv(index=False).encode('utf-8')
+                    st.download_button(
+                        label=" Download Filtered Data (CSV)",
+                        data=csv_filtered,
+                        file_name=f"hubspot_filtered_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
         
         st.divider()
         
@@ -4281,15 +2416,16 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.pie(
+                fig = cached_figure(
+                    build_pie_chart,
                     safe_data,
                     values='Count',
                     names='Lead Status',
                     title='Lead Status Distribution',
                     hole=0.3,
-                    color_discrete_sequence=COLOR_PALETTE
+                    color_discrete_sequence=COLOR_PALETTE,
+                    traces=dict(textposition='inside', textinfo='percent+label')
                 )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
                 st.plotly_chart(fig, width='stretch')
             
             with col2:
@@ -4298,15 +2434,16 @@ def main():
                     course_counts = filtered_df['Course/Program'].value_counts().head(10).reset_index()
                     course_counts.columns = ['Course', 'Count']
                     
-                    fig = px.bar(
+                    fig = cached_figure(
+                        build_bar_chart,
                         course_counts,
                         x='Course',
                         y='Count',
                         title='Top 10 Courses by Lead Volume',
                         color='Count',
-                        color_continuous_scale='Viridis'
+                        color_continuous_scale='Viridis',
+                        layout=dict(xaxis_tickangle=-45, height=400)
                     )
-                    fig.update_layout(xaxis_tickangle=-45, height=400)
                     st.plotly_chart(fig, width='stretch')
             
             # ── Course Owner × Lead Status Table (NC + All) ──────────────────
@@ -4403,14 +2540,16 @@ def main():
                         styles.loc[total_mask, nc_pct_col] = 'background-color: #c1a8e4; font-weight: bold'
                     return styles
 
-                # Format NC% cells with % sign using Styler.format
+                # Format NC% cells with % sign - styling/formatting runs on the visible page only
                 fmt = {nc_pct_col: '{:.1f}%'} if nc_pct_col in owner_pivot_table.columns else {}
-                styled_owner_pivot = (
-                    owner_pivot_table.style
-                    .apply(style_owner_status, axis=None)
-                    .format(fmt)
+                render_paginated_table(
+                    owner_pivot_table,
+                    key="owner_lead_status",
+                    style_fn=style_owner_status,
+                    formats=fmt,
+                    pinned_fn=lambda df: df['Course Owner'] == '🔢 TOTAL',
+                    height=420
                 )
-                st.dataframe(styled_owner_pivot, use_container_width=True, height=420)
 
                 # Download button
                 csv_owner_status = owner_pivot_table.to_csv(index=False).encode('utf-8')
@@ -4428,7 +2567,8 @@ def main():
 
             # Lead Data Table
             st.markdown("#### Lead Data")
-            st.dataframe(filtered_df, width='stretch', height=300)
+            render_paginated_table(filtered_df, key="lead_data", height=300,
+                                   hydrate=functools.partial(hydrate_contact_details, api_key=api_key))
         
         # SECTION 2: Customer Analysis
         with tab2:
@@ -4457,28 +2597,28 @@ def main():
                     revenue_by_course = filtered_customers.groupby('Course/Program')['Amount'].sum().reset_index()
                     revenue_by_course = revenue_by_course.sort_values('Amount', ascending=False).head(10)
                     
-                    fig = px.bar(
+                    fig = cached_figure(
+                        build_bar_chart,
                         revenue_by_course,
                         x='Course/Program',
                         y='Amount',
                         title='Top 10 Courses by Revenue',
                         color='Amount',
                         color_continuous_scale='Viridis',
-                        text='Amount'
-                    )
-                    fig.update_traces(
-                        texttemplate='Rs.%{text:,.0f}',
-                        textposition='outside'
+                        text='Amount',
+                        traces=dict(texttemplate='Rs.%{text:,.0f}', textposition='outside'),
+                        layout=dict(xaxis_tickangle=-45, height=400)
                     )
-                    fig.update_layout(xaxis_tickangle=-45, height=400)
                     st.plotly_chart(fig, width='stretch')
                 
                 # Customer Data Table
                 st.markdown("#### Customer Deal Data")
-                display_df = filtered_customers.copy()
-                if 'Amount' in display_df.columns:
-                    display_df['Amount'] = display_df['Amount'].apply(lambda x: f"Rs.{x:,.0f}")
-                st.dataframe(display_df, width='stretch', height=300)
+                render_paginated_table(
+                    filtered_customers,
+                    key="customer_deals",
+                    formats={'Amount': "Rs.{:,.0f}"},
+                    height=300
+                )
             else:
                 st.info("No customer data available")
         
@@ -4498,8 +2638,7 @@ def main():
                 display_cols = [c for c in metric_4.columns if c not in cols_to_hide]
                 
                 # Filter out specific owners
-                owners_to_exclude = ['Aneesha S', 'Sonia William']
-                display_df = metric_4[~metric_4['Course Owner'].isin(owners_to_exclude)].copy()
+                display_df = metric_4[~get_owner_dimension().excluded_rows(metric_4)]
                 
                 # Calculate TOTAL Row dynamically
                 total_row = pd.Series(index=display_df.columns, dtype='object')
@@ -4522,24 +2661,18 @@ def main():
                 display_df = pd.concat([display_df, pd.DataFrame([total_row])], ignore_index=True)
                 display_df = display_df[display_cols]
                 
-                def highlight_lead_to_customer(val):
-                    if isinstance(val, (int, float)):
-                        if val < 3:
-                            return 'background-color: #f8d7da; color: #721c24; font-weight: bold'
-                        elif val < 8:
-                            return 'background-color: #fff3cd; color: #856404; font-weight: bold'
-                        else:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold'
-                    return ''
-                    
-                def highlight_total_row(s):
-                    is_total = s['Course Owner'] == 'TOTAL'
-                    return ['background-color: #d4edda; font-weight: bold' if is_total else '' for _ in s]
-                
-                # Apply styling to the filtered dataframe
-                styled_df = display_df.style.apply(highlight_total_row, axis=1).map(highlight_lead_to_customer, subset=['Lead->Customer %'])
+                def style_owner_kpis(df):
+                    styles = style_total_rows(df)
+                    styles['Lead->Customer %'] = conversion_band_styles(df['Lead->Customer %'])
+                    return styles
                 
-                st.dataframe(styled_df, use_container_width=True, height=400)
+                render_paginated_table(
+                    display_df,
+                    key="owner_kpi",
+                    style_fn=style_owner_kpis,
+                    pinned_fn=lambda df: df['Course Owner'] == 'TOTAL',
+                    height=400
+                )
         
         # SECTION 4: Course Performance KPI Dashboard
         with tab4:
@@ -4551,26 +2684,14 @@ def main():
                 # KPI Table with conditional formatting
                 st.markdown("#### Course Performance KPI Table")
                 
-                def highlight_course_performance(val):
-                    if isinstance(val, (int, float)):
-                        if val < 3:
-                            return 'background-color: #f8d7da; color: #721c24; font-weight: bold'
-                        elif val < 8:
-                            return 'background-color: #fff3cd; color: #856404; font-weight: bold'
-                        else:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold'
-                    return ''
-                
-                # Apply conditional formatting
-                styled_df = metric_5.style.map(
-                    highlight_course_performance, 
-                    subset=['Lead->Customer %']
-                ).map(
-                    highlight_course_performance, 
-                    subset=['Customer %']
-                )
+                def style_course_kpis(df):
+                    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+                    for col in ['Lead->Customer %', 'Customer %']:
+                        styles[col] = conversion_band_styles(df[col])
+                    return styles
                 
-                st.dataframe(styled_df, use_container_width=True, height=400)
+                # Conditional formatting is computed for the visible page only
+                render_paginated_table(metric_5, key="course_kpi", style_fn=style_course_kpis, height=400)
                 
                 # Download Course KPI Data
                 st.markdown("###  Export Course KPI Data")
@@ -4629,7 +2750,7 @@ def main():
                     # 2. Owner Comparison Radar Chart
                     st.markdown("###  Owner Performance Comparison")
                     
-                    radar_fig, radar_owners = create_owner_radar_chart(metric_4, selected_owners_visual)
+                    radar_fig, radar_owners = cached_figure(create_owner_radar_chart, metric_4, selected_owners_visual)
                     
                     if radar_fig:
                         st.plotly_chart(radar_fig, use_container_width=True)
@@ -4646,7 +2767,7 @@ def main():
                     # 3. Owner Funnel Comparison
                     st.markdown("###  Owner Funnel Comparison")
                     
-                    funnel_fig = create_owner_funnel_chart(metric_4, selected_owners_visual)
+                    funnel_fig = cached_figure(create_owner_funnel_chart, metric_4, selected_owners_visual)
                     
                     if funnel_fig:
                         st.plotly_chart(funnel_fig, use_container_width=True)
@@ -4663,7 +2784,7 @@ def main():
                     # 4. Owner Performance Grid
                     st.markdown("###  Owner Leaderboard")
                     
-                    performance_grid = create_owner_performance_grid(metric_4[metric_4['Course Owner'].isin(selected_owners_visual)])
+                    performance_grid = cached_figure(create_owner_performance_grid, metric_4[metric_4['Course Owner'].isin(selected_owners_visual)])
                     
                     if performance_grid:
                         st.markdown(performance_grid, unsafe_allow_html=True)
@@ -4671,17 +2792,18 @@ def main():
                     # 5. Performance Heatmap
                     st.markdown("###  Performance Heatmap")
                     
-                    heatmap_data = create_owner_performance_heatmap(metric_4[metric_4['Course Owner'].isin(selected_owners_visual)])
+                    heatmap_data = cached_figure(create_owner_performance_heatmap, metric_4[metric_4['Course Owner'].isin(selected_owners_visual)])
                     
                     if heatmap_data is not None and not heatmap_data.empty:
-                        fig = px.imshow(
+                        fig = cached_figure(
+                            build_heatmap_chart,
                             heatmap_data,
                             title="Owner Performance Heatmap",
                             color_continuous_scale='RdYlGn',
                             aspect="auto",
-                            labels=dict(color="Performance Score")
+                            labels=dict(color="Performance Score"),
+                            layout=dict(height=400)
                         )
-                        fig.update_layout(height=400)
                         st.plotly_chart(fig, width='stretch')
                         
                         st.markdown("""
@@ -4701,7 +2823,7 @@ def main():
                     
                     with col_vis1:
                         # Create summary of selected owners
-                        owner_summary = metric_4[metric_4['Course Owner'].isin(selected_owners_visual)].copy()
+                        owner_summary = metric_4[metric_4['Course Owner'].isin(selected_owners_visual)]
                         if not owner_summary.empty:
                             csv_owner = owner_summary.to_csv(index=False)
                             st.download_button(
@@ -4770,7 +2892,7 @@ def main():
                     ]
                 
                 # Display the table with styling
-                display_df = metric_6.copy()
+                display_df = metric_6.copy(deep=False)
                 if not display_df.empty:
                     # Format percentages
                     display_df['Percentage'] = display_df['Percentage'].apply(lambda x: f"{x:.2f}%")
@@ -4859,15 +2981,16 @@ def main():
                             'Count': chart_data['Count'].tolist()
                         })
                         
-                        fig = px.bar(
+                        fig = cached_figure(
+                            build_bar_chart,
                             safe_data,
                             x='Lead Status',
                             y='Count',
                             title='Lead Status Distribution',
                             color='Lead Status',
-                            color_discrete_sequence=px.colors.qualitative.Set3
+                            color_discrete_sequence=px.colors.qualitative.Set3,
+                            layout=dict(xaxis_tickangle=-45, height=400)
                         )
-                        fig.update_layout(xaxis_tickangle=-45, height=400)
                         st.plotly_chart(fig, width='stretch')
             else:
                 st.info("No lead status data available")
@@ -4921,23 +3044,26 @@ def main():
             
             if filtered_matrix_data is not None and not filtered_matrix_data.empty:
                 # Apply conditional formatting for the matrix
-                def color_matrix(val):
-                    if val == " Star":
-                        return 'background-color: #d4edda; color: #155724; font-weight: bold'
-                    elif val == " Potential":
-                        return 'background-color: #cce5ff; color: #004085; font-weight: bold'
-                    elif " Burn" in val:
-                        return 'background-color: #fff3cd; color: #856404; font-weight: bold'
-                    elif val == " Weak":
-                        return 'background-color: #f8d7da; color: #721c24; font-weight: bold'
-                    return ''
-                
-                # Display with styling
-                styled_matrix = filtered_matrix_data.style.map(color_matrix, subset=['Segment'])
+                def style_matrix(df):
+                    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+                    if 'Segment' in df.columns:
+                        segment = df['Segment'].astype(str)
+                        styles['Segment'] = np.select(
+                            [segment == " Star", segment == " Potential",
+                             segment.str.contains(" Burn", regex=False), segment == " Weak"],
+                            [
+                                'background-color: #d4edda; color: #155724; font-weight: bold',
+                                'background-color: #cce5ff; color: #004085; font-weight: bold',
+                                'background-color: #fff3cd; color: #856404; font-weight: bold',
+                                'background-color: #f8d7da; color: #721c24; font-weight: bold',
+                            ],
+                            default=''
+                        )
+                    return styles
                 
                 col_mat1, col_mat2 = st.columns([3, 1])
                 with col_mat1:
-                    st.dataframe(styled_matrix, use_container_width=True, height=350)
+                    render_paginated_table(filtered_matrix_data, key="volume_matrix", style_fn=style_matrix, height=350)
             
                 with col_mat2:
                     st.markdown("####  Matrix Legend")
@@ -4989,40 +3115,39 @@ def main():
                 # Revenue Distribution Chart
                 st.markdown("#### Revenue Distribution by Course")
                 
-                top_revenue_chart = filtered_revenue_data.head(10).copy()
+                top_revenue_chart = filtered_revenue_data.head(10)
                 top_revenue_chart['Course'] = top_revenue_chart['Course'].str.slice(0, 25)
                 
-                fig1 = px.bar(
+                fig1 = cached_figure(
+                    build_bar_chart,
                     top_revenue_chart,
                     x='Course',
                     y='Revenue',
                     title='Top 10 Courses by Revenue',
                     color='Revenue',
                     color_continuous_scale='Viridis',
-                    text='Revenue'
-                )
-                fig1.update_traces(
-                    texttemplate='Rs.%{text:,.0f}',
-                    textposition='outside'
-                )
-                fig1.update_layout(
-                    xaxis_tickangle=-45,
-                    xaxis_title="",
-                    yaxis_title="Revenue (Rs.)",
-                    height=400,
-                    coloraxis_showscale=False
+                    text='Revenue',
+                    traces=dict(texttemplate='Rs.%{text:,.0f}', textposition='outside'),
+                    layout=dict(
+                        xaxis_tickangle=-45,
+                        xaxis_title="",
+                        yaxis_title="Revenue (Rs.)",
+                        height=400,
+                        coloraxis_showscale=False
+                    )
                 )
                 st.plotly_chart(fig1, use_container_width=True)
                 
                 # Revenue Data Table
                 st.markdown("#### Detailed Revenue Data")
                 
-                # Format revenue columns
-                display_revenue = filtered_revenue_data.copy()
-                display_revenue['Revenue'] = display_revenue['Revenue'].apply(lambda x: f"Rs.{x:,.0f}")
-                display_revenue['Revenue per Customer'] = display_revenue['Revenue per Customer'].apply(lambda x: f"Rs.{x:,.0f}")
-                
-                st.dataframe(display_revenue, use_container_width=True, height=350)
+                # Format revenue columns (visible page only)
+                render_paginated_table(
+                    filtered_revenue_data,
+                    key="course_revenue",
+                    formats={'Revenue': "Rs.{:,.0f}", 'Revenue per Customer': "Rs.{:,.0f}"},
+                    height=350
+                )
                 
                 # Download revenue data
                 st.markdown("####  Export Revenue Data")
@@ -5150,7 +3275,8 @@ def main():
                                 item2[:20]: [comparison_results['deal_pct2']]
                             })
                             
-                            fig = px.bar(
+                            fig = cached_figure(
+                                build_bar_chart,
                                 comp_data.melt(id_vars=['Metric'], var_name='Item', value_name='Percentage'),
                                 x='Metric',
                                 y='Percentage',
@@ -5158,13 +3284,9 @@ def main():
                                 barmode='group',
                                 title='Performance Comparison (%)',
                                 text='Percentage',
-                                color_discrete_sequence=COLOR_PALETTE
-                            )
-                            fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-                            fig.update_layout(
-                                xaxis_title="",
-                                yaxis_title="Percentage (%)",
-                                height=400
+                                color_discrete_sequence=COLOR_PALETTE,
+                                traces=dict(texttemplate='%{text:.1f}%', textposition='outside'),
+                                layout=dict(xaxis_title="", yaxis_title="Percentage (%)", height=400)
                             )
                             st.plotly_chart(fig, width='stretch')
                     
@@ -5190,7 +3312,8 @@ def main():
                                 melted_df = radar_df.melt(id_vars=['Stage'], var_name='Owner', value_name='Count')
                                 
                                 # Create grouped bar chart instead of radar
-                                fig = px.bar(
+                                fig = cached_figure(
+                                    build_bar_chart,
                                     melted_df,
                                     x='Stage',
                                     y='Count',
@@ -5198,14 +3321,10 @@ def main():
                                     barmode='group',
                                     title='Funnel Comparison',
                                     text='Count',
-                                    color_discrete_sequence=COLOR_PALETTE
-                                )
-                                fig.update_layout(
-                                    xaxis_title="Lead Stage",
-                                    yaxis_title="Count",
-                                    height=400
+                                    color_discrete_sequence=COLOR_PALETTE,
+                                    traces=dict(texttemplate='%{text}', textposition='outside'),
+                                    layout=dict(xaxis_title="Lead Stage", yaxis_title="Count", height=400)
                                 )
-                                fig.update_traces(texttemplate='%{text}', textposition='outside')
                                 st.plotly_chart(fig, width='stretch')
                     
                     elif comparison_results['type'] == 'course_vs_owner':
@@ -5214,14 +3333,15 @@ def main():
                             # Heatmap showing this owner's performance across courses
                             heatmap_df = comparison_results['owner_courses'].set_index('Course/Program')
                             
-                            fig = px.imshow(
+                            fig = cached_figure(
+                                build_heatmap_chart,
                                 heatmap_df,
                                 labels=dict(x="Lead Status", y="Course", color="Count"),
                                 aspect="auto",
                                 title=f"{item2}'s Performance by Course",
-                                color_continuous_scale='RdYlGn'
+                                color_continuous_scale='RdYlGn',
+                                layout=dict(height=400)
                             )
-                            fig.update_layout(height=400)
                             st.plotly_chart(fig, width='stretch')
             else:
                 st.info("Select two items to compare")
@@ -5344,18 +3464,17 @@ def main():
                 st.markdown("#### Qualified Leads by Traffic Source & Referral Status")
                 
                 # Highlight CRM, Referral and TOTAL categories
-                def highlight_special_sources(s):
-                    is_special = str(s['Source Category']).upper() in ['CRM', 'REFERRAL']
-                    is_total = str(s['Source Category']).upper() == 'TOTAL'
-                    
-                    if is_total:
-                        return ['background-color: #d4edda; font-weight: bold' for _ in s]
-                    if is_special:
-                        return ['background-color: #e8f5e9; font-weight: bold' if is_special else '' for _ in s]
-                    return ['' for _ in s]
-                st.dataframe(
-                    ql_drilldown.style.apply(highlight_special_sources, axis=1),
-                    use_container_width=True
+                def style_special_sources(df):
+                    category = df['Source Category'].astype(str).str.upper()
+                    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+                    styles.loc[category.isin(['CRM', 'REFERRAL']).to_numpy(), :] = 'background-color: #e8f5e9; font-weight: bold'
+                    styles.loc[(category == 'TOTAL').to_numpy(), :] = TOTAL_ROW_CSS
+                    return styles
+                render_paginated_table(
+                    ql_drilldown,
+                    key="ql_drilldown",
+                    style_fn=style_special_sources,
+                    pinned_fn=lambda df: df['Source Category'].astype(str).str.upper() == 'TOTAL'
                 )
                 
                 # [OK] NEW: CRM Owner Breakdown Section
@@ -5364,14 +3483,11 @@ def main():
                 crm_owner_breakdown = create_crm_owner_breakdown(st.session_state.contacts_df)
                 
                 if not crm_owner_breakdown.empty:
-                    def highlight_owner_total(s):
-                        if str(s['Course Owner']).upper() == 'TOTAL':
-                            return ['background-color: #d4edda; font-weight: bold' for _ in s]
-                        return ['' for _ in s]
-                        
-                    st.dataframe(
-                        crm_owner_breakdown.style.apply(highlight_owner_total, axis=1),
-                        use_container_width=True
+                    render_paginated_table(
+                        crm_owner_breakdown,
+                        key="crm_owner_breakdown",
+                        style_fn=style_total_rows,
+                        pinned_fn=lambda df: df['Course Owner'].astype(str).str.upper() == 'TOTAL'
                     )
                 else:
                     st.info("No CRM-sourced Qualified Lead data available for owner breakdown.")
@@ -5416,29 +3532,43 @@ def main():
                 
                 st.info(f" Comparing **Current Period:** {current_start} to {current_end}  vs  **Previous Period:** {prev_start} to {prev_end}")
                 
+                # [OK] NEW: A finished background prefetch of this period is shown without a click
+                prefetched = get_prefetcher().get(comparison_period_key(
+                    st.session_state.date_filter, prev_start, prev_end, st.session_state.customer_stage_ids
+                ))
+                use_prefetched = (prefetched is not None and prefetched.succeeded()
+                                  and st.session_state.get('prev_data_range') != (prev_start, prev_end))
+                
                 # Fetch Button
-                if st.button(" Load Previous Period Data for Comparison", type="primary", use_container_width=True):
+                if st.button(" Load Previous Period Data for Comparison", type="primary", use_container_width=True) or use_prefetched:
                     with st.spinner("Fetching data for previous period..."):
                         # Fetch Data for Previous Period
-                        prev_contacts, _ = fetch_hubspot_contacts_with_date_filter(
-                            api_key, st.session_state.date_filter, prev_start, prev_end
-                        )
-                        
-                        prev_deals, _ = fetch_hubspot_deals(
-                            api_key, prev_start, prev_end, st.session_state.customer_stage_ids
-                        )
+                        interrupted = None
+                        try:
+                            if use_prefetched:
+                                prev_df_contacts, prev_contacts_count, prev_deals, prev_df_customers = prefetched.result()
+                            else:
+                                # A prefetch still running is stopped first; this fetch resumes from its checkpoints
+                                get_prefetcher().cancel(get_prefetch_owner(), wait=True)
+                                # The comparison period queues behind every session's current-period searches
+                                with fetch_priority(SECONDARY):
+                                    prev_df_contacts, prev_contacts_count, prev_deals, prev_df_customers = load_comparison_period(
+                                        api_key, st.session_state.date_filter, prev_start, prev_end, st.session_state.owner_mapping,
+                                        st.session_state.customer_stage_ids, st.session_state.deal_stages
+                                    )
+                        except FetchIncomplete as e:
+                            interrupted = e
                         
                         # Process Data (Load if either contacts or deals found)
-                        if prev_contacts or prev_deals:
-                            prev_df_contacts = process_contacts_data(prev_contacts, st.session_state.owner_mapping, api_key, start_date=prev_start, end_date=prev_end)
-                            prev_df_customers = process_deals_as_customers(prev_deals, st.session_state.owner_mapping, api_key, st.session_state.deal_stages, start_date=prev_start)
-                            
+                        if interrupted is not None:
+                            st.error(f" Fetch interrupted: {interrupted}. Progress is saved - click the button again to resume.")
+                        elif prev_contacts_count or prev_deals:
                             # [OK] FILTER OUT EXCLUDED OWNERS (Previous Period)
                             if prev_df_contacts is not None and not prev_df_contacts.empty:
-                                prev_df_contacts = prev_df_contacts[~prev_df_contacts['Course Owner'].isin(EXCLUDED_OWNERS)]
+                                prev_df_contacts = prev_df_contacts[~get_owner_dimension().excluded_rows(prev_df_contacts)]
                             
                             if prev_df_customers is not None and not prev_df_customers.empty:
-                                prev_df_customers = prev_df_customers[~prev_df_customers['Course Owner'].isin(EXCLUDED_OWNERS)]
+                                prev_df_customers = prev_df_customers[~get_owner_dimension().excluded_rows(prev_df_customers)]
                             
                             # Calculate Metrics
                             prev_metric_1 = create_metric_1(prev_df_contacts) # Course Data
@@ -5447,18 +3577,23 @@ def main():
                             st.session_state['prev_metric_1'] = prev_metric_1
                             st.session_state['prev_metric_4'] = prev_metric_4
                             st.session_state['prev_data_loaded'] = True
-                            st.success(" Previous period data loaded!")
+                            st.session_state['prev_data_range'] = (prev_start, prev_end)
+                            if not use_prefetched:
+                                st.success(" Previous period data loaded!")
                         else:
+                            st.session_state['prev_data_loaded'] = False
+                            st.session_state['prev_data_range'] = (prev_start, prev_end)
                             st.warning("No data found for previous period.")
             
-            # Display Comparison if Loaded
-            if st.session_state.get('prev_data_loaded', False):
+            # Display Comparison if Loaded (for the period before the range shown now)
+            if (st.session_state.get('prev_data_loaded', False) and st.session_state.date_range
+                    and st.session_state.get('prev_data_range') == (prev_start, prev_end)):
                 
                 # 1. Course Performance Comparison
                 st.markdown("###  Course Performance: This Month vs Previous")
                 
-                curr_metric_1 = filtered_metrics['metric_1'].copy()
-                prev_metric_1 = st.session_state.get('prev_metric_1', pd.DataFrame()).copy()
+                curr_metric_1 = filtered_metrics['metric_1'].copy(deep=False)
+                prev_metric_1 = st.session_state.get('prev_metric_1', pd.DataFrame()).copy(deep=False)
                 
                 if not curr_metric_1.empty and not prev_metric_1.empty:
                     # Prepare comparison dataframe
@@ -5504,14 +3639,10 @@ def main():
                     # Sort by volume
                     comp_df = comp_df.sort_values('Current Leads', ascending=False)
                     
-                    # Styling
-                    def highlight_change(val):
-                        color = 'green' if val > 0 else 'red' if val < 0 else 'black'
-                        return f'color: {color}; font-weight: bold'
-                    
-                    st.dataframe(
-                        comp_df.style.map(highlight_change, subset=['Lead Change', 'Deal % Change']),
-                        use_container_width=True
+                    render_paginated_table(
+                        comp_df,
+                        key="month_course_comparison",
+                        style_fn=lambda df: change_direction_styles(df, ['Lead Change', 'Deal % Change'])
                     )
                 else:
                     st.info("Insufficient data for Comparison")
@@ -5521,8 +3652,8 @@ def main():
                 # 2. Owner Performance Comparison
                 st.markdown("###  Owner Performance: This Month vs Previous")
                 
-                curr_metric_4 = filtered_metrics['metric_4'].copy()
-                prev_metric_4 = st.session_state.get('prev_metric_4', pd.DataFrame()).copy()
+                curr_metric_4 = filtered_metrics['metric_4'].copy(deep=False)
+                prev_metric_4 = st.session_state.get('prev_metric_4', pd.DataFrame()).copy(deep=False)
                 
                 if not curr_metric_4.empty and not prev_metric_4.empty:
                      # Prepare comparison
@@ -5554,14 +3685,10 @@ def main():
                     owner_comp_df = pd.DataFrame(owner_comp_data)
                     owner_comp_df = owner_comp_df.sort_values('Current Leads', ascending=False)
                     
-                    # Styling
-                    def highlight_change(val):
-                        color = 'green' if val > 0 else 'red' if val < 0 else 'black'
-                        return f'color: {color}; font-weight: bold'
-                        
-                    st.dataframe(
-                        owner_comp_df.style.map(highlight_change, subset=['Lead Change', 'Conv % Change']),
-                        use_container_width=True
+                    render_paginated_table(
+                        owner_comp_df,
+                        key="month_owner_comparison",
+                        style_fn=lambda df: change_direction_styles(df, ['Lead Change', 'Conv % Change'])
                     )
                 else:
                     st.info("Insufficient data for Owner Comparison")
@@ -5583,13 +3710,13 @@ def main():
                     return False
                 
                 mask = st.session_state.customers_df['Associated Contact IDs'].apply(has_valid_contact)
-                cohort_customers = st.session_state.customers_df[mask].copy()
+                cohort_customers = st.session_state.customers_df[mask]
                 
                 if not cohort_customers.empty:
                     # Convert to datetime and properly extract month
                     cohort_customers['Close Date DT'] = pd.to_datetime(cohort_customers['Close Date'], format='mixed', utc=True)
                     # Filter out NaT
-                    valid_dates = cohort_customers.dropna(subset=['Close Date DT']).copy()
+                    valid_dates = cohort_customers.dropna(subset=['Close Date DT'])
                     
                     if not valid_dates.empty:
                         valid_dates['Close Month'] = valid_dates['Close Date DT'].dt.to_period('M').astype(str)
@@ -5611,15 +3738,16 @@ def main():
                             st.markdown(render_kpi("Cohort Conversion", f"{conversion_rate:.1f}%", "Lead to Customer", "kpi-box-purple"), unsafe_allow_html=True)
                             
                         st.markdown("### Customers by Close Month")
-                        fig = px.bar(
+                        fig = cached_figure(
+                            build_bar_chart,
                             cohort_summary, x='Close Month', y='Customers',
                             text='Customers', labels={'Close Month': 'Month Customer Closed', 'Customers': 'Number of Customers'},
-                            color_discrete_sequence=['#2ca02c']
+                            color_discrete_sequence=['#2ca02c'],
+                            traces=dict(textposition='outside')
                         )
-                        fig.update_traces(textposition='outside')
                         st.plotly_chart(fig, use_container_width=True)
                         
-                        st.dataframe(cohort_summary, use_container_width=True)
+                        render_paginated_table(cohort_summary, key="cohort_summary")
                     else:
                         st.info("No valid close dates found for cohort customers.")
                 else:
@@ -5634,29 +3762,13 @@ def main():
             if filtered_df.empty:
                 st.warning("No data available for the selected filters.")
             else:
-                camp_df = filtered_df.copy()
-                camp_grouped = camp_df.groupby('Campaign').agg(
-                    Total_Leads=('ID', 'count'),
-                    Customers=('Lead Status Raw', lambda x: x.str.lower().isin(['customer']).sum())
-                ).reset_index()
-                
-                # Check for Customers mapped to "Customer" in standard Lead Status map
-                if 'Lead Status' in camp_df.columns:
-                    cust2 = camp_df.groupby('Campaign').agg(
-                        Customers2=('Lead Status', lambda x: x.isin(['Customer', 'customer']).sum())
-                    ).reset_index()
-                    camp_grouped['Customers'] = camp_grouped['Customers'] + cust2['Customers2']
-                
-                camp_grouped['Conversion %'] = (camp_grouped['Customers'] / camp_grouped['Total_Leads'] * 100).round(2)
-                camp_grouped = camp_grouped.sort_values('Total_Leads', ascending=False)
-                
-                camp_grouped.rename(columns={'Total_Leads': 'Total Leads', 'Customers': 'Converted Customers'}, inplace=True)
+                if snapshot_metrics is not None:
+                    camp_grouped = snapshot_metrics.create_campaign_performance()
+                else:
+                    camp_grouped = create_campaign_performance(filtered_df)
                 
                 st.markdown("#### Performance by Campaign")
-                st.dataframe(
-                    camp_grouped,
-                    use_container_width=True
-                )
+                render_paginated_table(camp_grouped, key="campaign_performance")
                 
         # SECTION 17: Course Analysis (Grouped + Cold Leads)
         with tab17:
@@ -5665,38 +3777,17 @@ def main():
             if filtered_df.empty:
                 st.warning("No data available for the selected filters.")
             else:
-                c_df = filtered_df.copy()
-                
-                course_grouped = c_df.groupby('Course Grouped').agg(
-                    Total_Leads=('ID', 'count'),
-                    Cold_Leads=('Lead Status Raw', lambda x: x.str.lower().isin(['neutral prospect', 'cold', 'neutral_prospect']).sum())
-                ).reset_index()
-                
-                cust_grouped = c_df.groupby('Course Grouped').agg(
-                    Customers=('Lead Status Raw', lambda x: x.str.lower().isin(['customer']).sum())
-                ).reset_index()
-                
-                course_grouped['Customers'] = cust_grouped['Customers']
-                
-                if 'Lead Status' in c_df.columns:
-                    cust2 = c_df.groupby('Course Grouped').agg(
-                        Customers2=('Lead Status', lambda x: x.isin(['Customer', 'customer']).sum())
-                    ).reset_index()
-                    course_grouped['Customers'] = course_grouped['Customers'] + cust2['Customers2']
-                    
-                course_grouped['Conversion %'] = (course_grouped['Customers'] / course_grouped['Total_Leads'] * 100).round(2)
-                course_grouped = course_grouped.sort_values('Total_Leads', ascending=False)
-                
-                course_grouped.rename(columns={'Total_Leads': 'Total Leads', 'Customers': 'Converted Customers', 'Cold_Leads': 'Cold Leads'}, inplace=True)
+                if snapshot_metrics is not None:
+                    course_grouped = snapshot_metrics.create_course_grouped_performance()
+                else:
+                    course_grouped = create_course_grouped_performance(filtered_df)
                 
                 st.markdown("#### Performance by Grouped Course")
-                st.dataframe(
-                    course_grouped,
-                    use_container_width=True
-                )
+                render_paginated_table(course_grouped, key="course_grouped_performance")
                 
                 if not course_grouped.empty:
-                    fig = px.bar(
+                    fig = cached_figure(
+                        build_bar_chart,
                         course_grouped.head(10),
                         x='Course Grouped',
                         y='Cold Leads',
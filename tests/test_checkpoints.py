@@ -0,0 +1,61 @@
+import os
+
+from hubspot_analytics.checkpoints import CheckpointStore
+
+KEY = ('portal', '/crm/v3/objects/contacts/search', {'filterGroups': []})
+
+def test_interrupted_search_resumes_from_the_last_cursor(tmp_path):
+    store = CheckpointStore(directory=str(tmp_path))
+    checkpoint = store.checkpoint(*KEY)
+    checkpoint.save_page([{'id': '1'}, {'id': '2'}], '2')
+    checkpoint.save_page([{'id': '3'}], '3')
+    checkpoint.release()
+
+    resumed = store.checkpoint(*KEY)
+    assert resumed.load() == ([[{'id': '1'}, {'id': '2'}], [{'id': '3'}]], '3')
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    store = CheckpointStore(directory=str(tmp_path))
+    checkpoint = store.checkpoint(*KEY)
+    checkpoint.save_page([{'id': '1'}], '1')
+    with open(checkpoint.path, 'a') as f:
+        f.write('{"after": "2", "results": [{"id"')
+    assert checkpoint.load() == ([[{'id': '1'}]], '1')
+
+def test_completed_search_leaves_nothing_to_resume(tmp_path):
+    store = CheckpointStore(directory=str(tmp_path))
+    checkpoint = store.checkpoint(*KEY)
+    checkpoint.save_page([{'id': '1'}], '1')
+    checkpoint.complete()
+    checkpoint.release()
+    assert not os.path.exists(checkpoint.path)
+    assert store.checkpoint(*KEY).load() == ([], None)
+
+def test_expired_checkpoint_is_discarded(tmp_path):
+    store = CheckpointStore(directory=str(tmp_path), max_age=60)
+    checkpoint = store.checkpoint(*KEY)
+    checkpoint.save_page([{'id': '1'}], '1')
+    old = os.path.getmtime(checkpoint.path) - 61
+    os.utime(checkpoint.path, (old, old))
+    assert checkpoint.load() == ([], None)
+    assert not os.path.exists(checkpoint.path)
+
+def test_cleanup_removes_only_expired_checkpoints(tmp_path):
+    store = CheckpointStore(directory=str(tmp_path), max_age=60)
+    stale, fresh = store.checkpoint('stale'), store.checkpoint('fresh')
+    stale.save_page([{'id': '1'}], '1')
+    fresh.save_page([{'id': '2'}], '2')
+    old = os.path.getmtime(stale.path) - 61
+    os.utime(stale.path, (old, old))
+    store.cleanup()
+    assert not os.path.exists(stale.path)
+    assert os.path.exists(fresh.path)
+
+def test_same_search_running_twice_checkpoints_once(tmp_path):
+    store = CheckpointStore(directory=str(tmp_path))
+    first = store.checkpoint(*KEY)
+    second = store.checkpoint(*KEY)
+    second.save_page([{'id': '9'}], '9')
+    assert first.load() == ([], None)
+    first.release()
+    assert isinstance(store.checkpoint(*KEY).path, str)
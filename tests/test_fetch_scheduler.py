@@ -0,0 +1,83 @@
+import contextlib
+import threading
+import time
+
+import pytest
+
+from hubspot_analytics.fetch_scheduler import (BACKGROUND, INTERACTIVE, FetchCancelled, FetchScheduler, cancel_scope,
+                                               current_priority, fetch_priority)
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+def start(scheduler, priority, admitted, release, event=None, errors=None):
+    """Thread taking a slot of priority, recording its admission and holding the slot until release is set."""
+    def run():
+        try:
+            with cancel_scope(event) if event else contextlib.nullcontext(), scheduler.slot(priority):
+                admitted.append(priority)
+                release.wait(5)
+        except FetchCancelled as e:
+            errors.append(e)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def test_background_requests_leave_the_reserved_slots_free():
+    scheduler = FetchScheduler(max_concurrent=3, reserved=2)
+    admitted, release = [], threading.Event()
+    start(scheduler, BACKGROUND, admitted, release)
+    wait_until(lambda: admitted == [BACKGROUND])
+    start(scheduler, BACKGROUND, admitted, release)
+    wait_until(lambda: scheduler.stats()['background']['waiting'] == 1)
+    # The waiting background request must not hold back interactive work
+    with scheduler.slot(INTERACTIVE):
+        assert scheduler.stats()['interactive']['running'] == 1
+    release.set()
+    wait_until(lambda: len(admitted) == 2)
+
+def test_waiting_interactive_request_is_admitted_before_background():
+    scheduler = FetchScheduler(max_concurrent=1, reserved=0)
+    admitted, release, hold = [], threading.Event(), threading.Event()
+    start(scheduler, INTERACTIVE, admitted, hold)
+    wait_until(lambda: admitted == [INTERACTIVE])
+    start(scheduler, BACKGROUND, admitted, release)
+    wait_until(lambda: scheduler.stats()['background']['waiting'] == 1)
+    start(scheduler, INTERACTIVE, admitted, release)
+    wait_until(lambda: scheduler.stats()['interactive']['waiting'] == 1)
+    hold.set()
+    wait_until(lambda: len(admitted) == 2)
+    assert admitted == [INTERACTIVE, INTERACTIVE]
+    release.set()
+    wait_until(lambda: admitted == [INTERACTIVE, INTERACTIVE, BACKGROUND])
+
+def test_cancelled_request_stops_waiting_for_a_slot():
+    scheduler = FetchScheduler(max_concurrent=1, reserved=0)
+    admitted, release, cancel, errors = [], threading.Event(), threading.Event(), []
+    start(scheduler, INTERACTIVE, admitted, release)
+    wait_until(lambda: admitted == [INTERACTIVE])
+    waiter = start(scheduler, BACKGROUND, admitted, release, event=cancel, errors=errors)
+    wait_until(lambda: scheduler.stats()['background']['waiting'] == 1)
+    cancel.set()
+    waiter.join(5)
+    assert len(errors) == 1 and isinstance(errors[0], FetchCancelled)
+    assert scheduler.stats()['background'] == {'running': 0, 'waiting': 0, 'total': 0}
+    release.set()
+
+def test_cancelled_scope_raises_before_queueing():
+    scheduler = FetchScheduler(max_concurrent=1, reserved=0)
+    cancel = threading.Event()
+    cancel.set()
+    with cancel_scope(cancel), pytest.raises(FetchCancelled):
+        with scheduler.slot(INTERACTIVE):
+            pass
+    assert scheduler.stats()['interactive']['waiting'] == 0
+
+def test_nested_priority_only_demotes():
+    with fetch_priority(BACKGROUND):
+        with fetch_priority(INTERACTIVE):
+            assert current_priority() == BACKGROUND
+    assert current_priority() == INTERACTIVE
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hubspot_analytics.config import TEAM_MAPPING
+from hubspot_analytics.owners import OwnerDimension
+from hubspot_analytics.rules import RuleSet
+
+MEMBERS = [member for members in TEAM_MAPPING.values() for member in members]
+NAMES = MEMBERS + [member.upper() for member in MEMBERS[:3]] + ["someone", " Unassigned (5)", "Aneesha S", None]
+
+def isin_team_frames(df):
+    """The per-team filters team_frames replaces."""
+    return {team: df[df['Course Owner'].str.lower().isin([member.lower() for member in members])]
+            for team, members in TEAM_MAPPING.items()}
+
+def owner_frame(names, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Course Owner': rng.choice(np.array(names, dtype=object), 500), 'Hot': rng.integers(0, 50, 500)})
+
+@pytest.fixture
+def mapping():
+    return {str(100 + i): name for i, name in enumerate(MEMBERS + ["Aneesha S"])}
+
+@pytest.mark.parametrize('with_mapping', [False, True])
+def test_team_frames_match_the_isin_filters(mapping, with_mapping):
+    df = owner_frame(NAMES)
+    owners = OwnerDimension(mapping if with_mapping else None, rules=RuleSet())
+    expected = isin_team_frames(df)
+    frames = owners.team_frames(df)
+    assert list(frames) == list(expected)
+    for team in expected:
+        pd.testing.assert_frame_equal(frames[team].sort_index(), expected[team])
+
+def test_team_frames_join_on_owner_id(mapping):
+    owners = OwnerDimension(mapping, rules=RuleSet())
+    first_team, first_member = next(iter(TEAM_MAPPING.items()))
+    # Rows processed before an owner was renamed still land in the owner's team
+    df = pd.DataFrame({'Course Owner': ['Old Name', 'someone'], 'Owner ID': ['100', '999']})
+    frames = owners.team_frames(df)
+    assert frames[first_team]['Course Owner'].tolist() == ['Old Name']
+    assert all(frames[team].empty for team in TEAM_MAPPING if team != first_team)
+
+def test_team_frames_without_rows_or_owner_column():
+    owners = OwnerDimension(rules=RuleSet())
+    empty_team = next(iter(TEAM_MAPPING))
+    df = owner_frame([name for name in NAMES if name is None or name.lower() not in
+                      {member.lower() for member in TEAM_MAPPING[empty_team]}])
+    assert owners.team_frames(df)[empty_team].empty
+    assert all(frame.empty for frame in owners.team_frames(pd.DataFrame({'Hot': [1]})).values())
+
+def test_excluded_matches_the_rules(mapping):
+    rules = RuleSet()
+    owners = OwnerDimension(mapping, rules=rules)
+    names = pd.Series(["Aneesha S", "Sonia William", "Nisha Samuel", "someone", None])
+    assert owners.excluded(names).tolist() == [rules.excludes_owner(name) for name in names]
+    df = pd.DataFrame({'Course Owner': ["Renamed", "Nisha Samuel"], 'Owner ID': [str(100 + len(MEMBERS)), "100"]})
+    assert owners.excluded_rows(df).tolist() == [True, False]
+
+def test_unknown_owners_are_not_stored(mapping):
+    owners = OwnerDimension(mapping, rules=RuleSet())
+    owners.team_codes(pd.Series([f"stranger {i}" for i in range(1000)]))
+    assert len(owners.table()) == len(mapping)
+    assert owners.table()['owner_id'].dtype == np.int64
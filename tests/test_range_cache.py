@@ -0,0 +1,149 @@
+import threading
+from datetime import date
+
+import pytest
+
+from hubspot_analytics import range_cache
+from hubspot_analytics.range_cache import RangeCache, refetch_ranges, subtract_ranges
+
+KEY = ('portal', 'contacts', 'createdate')
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(range_cache.time, 'time', lambda: now[0])
+    return now
+
+def record(record_id, day):
+    return {'id': record_id, 'day': day}
+
+def in_range(start, end):
+    return lambda rec: start <= rec['day'] <= end
+
+def test_subtract_ranges_returns_the_gaps():
+    covered = [(date(2024, 1, 5), date(2024, 1, 10)), (date(2024, 1, 15), date(2024, 1, 20))]
+    assert subtract_ranges(date(2024, 1, 1), date(2024, 1, 31), covered) == [
+        (date(2024, 1, 1), date(2024, 1, 4)),
+        (date(2024, 1, 11), date(2024, 1, 14)),
+        (date(2024, 1, 21), date(2024, 1, 31)),
+    ]
+    assert subtract_ranges(date(2024, 1, 6), date(2024, 1, 9), covered) == []
+    assert subtract_ranges(date(2024, 1, 1), date(2024, 1, 3), []) == [(date(2024, 1, 1), date(2024, 1, 3))]
+
+def test_widened_range_only_misses_the_new_days(clock):
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 3))])
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 10)) == []
+    assert cache.missing(KEY, date(2023, 12, 25), date(2024, 1, 15)) == [
+        (date(2023, 12, 25), date(2023, 12, 31)),
+        (date(2024, 1, 11), date(2024, 1, 15)),
+    ]
+
+def test_segments_are_stitched_and_filtered_to_the_range(clock):
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 3)), record(2, date(2024, 1, 9))])
+    clock[0] += 1
+    cache.add(KEY, date(2024, 1, 11), date(2024, 1, 20), [record(3, date(2024, 1, 12))])
+    found = cache.cached_records(KEY, date(2024, 1, 5), date(2024, 1, 15), in_range(date(2024, 1, 5), date(2024, 1, 15)))
+    # Newest segment first
+    assert [rec['id'] for rec in found] == [3, 2]
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 20)) == []
+
+def test_overlapping_fetch_supersedes_cached_segments(clock):
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 3))])
+    cache.add(KEY, date(2024, 1, 11), date(2024, 1, 20), [record(2, date(2024, 1, 12))])
+    cache.add(KEY, date(2024, 1, 21), date(2024, 1, 31), [record(3, date(2024, 1, 25))])
+    clock[0] += 1
+    cache.add(KEY, date(2024, 1, 5), date(2024, 1, 15), [record(1, date(2024, 1, 3)), record(4, date(2024, 1, 14))])
+    assert cache.stats()[KEY] == [(date(2024, 1, 21), date(2024, 1, 31), 1), (date(2024, 1, 5), date(2024, 1, 15), 2)]
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 31)) == [
+        (date(2024, 1, 1), date(2024, 1, 4)),
+        (date(2024, 1, 16), date(2024, 1, 20)),
+    ]
+
+def test_segments_expire_after_the_ttl(clock):
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 3))])
+    clock[0] += 60
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 10)) == []
+    clock[0] += 1
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 10)) == [(date(2024, 1, 1), date(2024, 1, 10))]
+    assert cache.cached_records(KEY, date(2024, 1, 1), date(2024, 1, 10), lambda rec: True) == []
+    # Expired segments are dropped on the next add
+    cache.add(('other',), date(2024, 1, 1), date(2024, 1, 1), [])
+    assert KEY not in cache.stats()
+
+def test_oldest_segments_are_evicted_beyond_max_records(clock):
+    cache = RangeCache(ttl=60, max_records=3)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 1)), record(2, date(2024, 1, 2))])
+    clock[0] += 1
+    cache.add(('deals',), date(2024, 1, 1), date(2024, 1, 10), [record(3, date(2024, 1, 1)), record(4, date(2024, 1, 2))])
+    assert KEY not in cache.stats()
+    assert cache.stats()[('deals',)] == [(date(2024, 1, 1), date(2024, 1, 10), 2)]
+
+def test_refetch_ranges_ignores_cached_segments(clock):
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 3))])
+    with refetch_ranges():
+        assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 10)) == [(date(2024, 1, 1), date(2024, 1, 10))]
+        assert cache.cached_records(KEY, date(2024, 1, 1), date(2024, 1, 10), lambda rec: True) == []
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 10)) == []
+
+def test_lookup_takes_records_and_gaps_from_one_snapshot(clock, monkeypatch):
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), [record(1, date(2024, 1, 3))])
+    fresh, writers = cache._fresh, []
+
+    def racing_fresh(key):
+        segments = fresh(key)
+        if not writers:
+            # Another thread stores the rest of the range right after the segments were read
+            writer = threading.Thread(target=cache.add,
+                                      args=(KEY, date(2024, 1, 11), date(2024, 1, 20), [record(2, date(2024, 1, 12))]))
+            writer.start()
+            writers.append(writer)
+            writer.join(0.2)
+        return segments
+
+    monkeypatch.setattr(cache, '_fresh', racing_fresh)
+    records, missing = cache.lookup(KEY, date(2024, 1, 1), date(2024, 1, 20), lambda rec: True)
+    writers[0].join(5)
+    # The segment stored meanwhile is not served, so its dates must still be fetched
+    assert [rec['id'] for rec in records] == [1]
+    assert missing == [(date(2024, 1, 11), date(2024, 1, 20))]
+    records, missing = cache.lookup(KEY, date(2024, 1, 1), date(2024, 1, 20), lambda rec: True)
+    assert sorted(rec['id'] for rec in records) == [1, 2]
+    assert missing == []
+
+def test_segment_expiring_after_lookup_gives_duplicates_not_gaps(clock):
+    # Contacts matched on created or modified date appear in the segment of either date
+    source = [{'id': 1, 'days': [date(2024, 1, 3)]},
+              {'id': 2, 'days': [date(2024, 1, 4), date(2024, 1, 12)]},
+              {'id': 3, 'days': [date(2024, 1, 15)]}]
+
+    def fetch(start, end):
+        return [rec for rec in source if any(start <= day <= end for day in rec['days'])]
+
+    def in_range(rec):
+        return any(date(2024, 1, 1) <= day <= date(2024, 1, 20) for day in rec['days'])
+
+    cache = RangeCache(ttl=60)
+    cache.add(KEY, date(2024, 1, 1), date(2024, 1, 10), fetch(date(2024, 1, 1), date(2024, 1, 10)))
+    clock[0] += 59
+    records, missing = cache.lookup(KEY, date(2024, 1, 1), date(2024, 1, 20), in_range)
+    clock[0] += 2   # the served segment expires before the fetch of the gaps lands
+    for start, end in missing:
+        fetched = fetch(start, end)
+        cache.add(KEY, start, end, fetched)
+        records += fetched
+
+    seen, merged = set(), []
+    for rec in records:   # de-duplicated by ID, like the fetchers do
+        if rec['id'] not in seen:
+            seen.add(rec['id'])
+            merged.append(rec)
+    assert len(records) == 4
+    assert sorted(rec['id'] for rec in merged) == [1, 2, 3]
+    # The expired part is fetched again next time rather than treated as covered
+    assert cache.missing(KEY, date(2024, 1, 1), date(2024, 1, 20)) == [(date(2024, 1, 1), date(2024, 1, 10))]
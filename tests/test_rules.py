@@ -0,0 +1,65 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from hubspot_analytics import rules as rules_module
+from hubspot_analytics.rules import RuleSet, get_rules
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    """Path of a rules file named by HUBSPOT_RULES_FILE, starting from the built-in rules."""
+    monkeypatch.setattr(rules_module, '_rules', RuleSet())
+    monkeypatch.setattr(rules_module, '_rules_source', (None, None))
+    path = tmp_path / 'rules.json'
+    monkeypatch.setenv('HUBSPOT_RULES_FILE', str(path))
+    return path
+
+def write(path, content, mtime_offset=0):
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    stat = os.stat(path)
+    # Distinct mtimes even on filesystems with coarse timestamps
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset * 1_000_000_000))
+
+def test_rules_file_is_reloaded_when_it_changes(rules_file):
+    write(rules_file, {'excluded_deal_keywords': ['summer camp']})
+    first = get_rules()
+    assert first.excludes_deal('oet summer camp 2024')
+    assert not first.excludes_deal('vacation batch')
+    assert get_rules() is first
+
+    write(rules_file, {'excluded_deal_keywords': ['winter camp']}, mtime_offset=1)
+    second = get_rules()
+    assert second.fingerprint != first.fingerprint
+    assert second.excludes_deal('winter camp') and not second.excludes_deal('summer camp')
+
+def test_bad_rules_file_keeps_the_previous_rules(rules_file, caplog):
+    write(rules_file, {'excluded_owners': ['Someone Else']})
+    good = get_rules()
+    write(rules_file, '{not json', mtime_offset=1)
+    assert get_rules() is good
+    write(rules_file, {'excluded_owners': 'not a list'}, mtime_offset=2)
+    assert get_rules() is good
+    assert 'keeping the previous rules' in caplog.text
+
+def test_missing_rules_file_falls_back_to_the_built_in_rules(rules_file):
+    write(rules_file, {'excluded_deal_keywords': ['summer camp']})
+    assert not get_rules().excludes_deal('vacation batch')
+    os.remove(rules_file)
+    assert get_rules().fingerprint == RuleSet().fingerprint
+
+def test_column_masks_match_the_per_value_checks():
+    rules = RuleSet()
+    texts = ['oet vacation batch', 'german a1', '', 'vacation_batch', None, 'ielts']
+    assert rules.excluded_deal_mask(texts).tolist() == [True, False, False, True, False, False]
+    statuses = ['closed won', 'hot prospect', 'paid', '', 'open']
+    assert rules.customer_status_mask(statuses).tolist() == [rules.is_customer_status(s) for s in statuses]
+    assert rules.excluded_owner_mask(['Sreeja Anoop', 'Someone', None]).tolist() == [
+        rules.excludes_owner(name) for name in ['Sreeja Anoop', 'Someone', None]]
+    assert RuleSet(excluded_deal_keywords=[]).excluded_deal_mask(texts).tolist() == [False] * len(texts)
+
+def test_course_groups_prefer_the_first_keyword():
+    rules = RuleSet(course_groups={'ielts': 'IELTS', 'oet': 'OET'})
+    courses = pd.Series(['OET then IELTS', 'oet online', 'misc'])
+    assert rules.group_courses(courses).tolist() == ['IELTS', 'OET', 'misc']